@@ -10,13 +10,19 @@ This module implements sophisticated mathematical models for:
 5. Geometric manifold dynamics
 """
 
+import os
 import numpy as np
 import pandas as pd
 from scipy.fft import fft, ifft, fftfreq
 from scipy.signal import hilbert, stft, istft
-from scipy.linalg import svd, eig
+from scipy.linalg import eig
 from sklearn.decomposition import PCA
 from typing import Dict, Tuple, List
+
+try:
+    from .vcf_decomposition import decomposition_for
+except ImportError:
+    from vcf_decomposition import decomposition_for
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -154,22 +160,9 @@ class VectorVarianceDecomposition:
         """
         PCA-style variance decomposition
         Shows which 'eigendirections' explain most variance
+        (covariance eigenvalues from the shared centered SVD of the panel)
         """
-        vectors = self.compute_vector_field()
-        
-        # Center the data
-        centered = vectors - np.mean(vectors, axis=0)
-        
-        # Covariance matrix
-        cov = np.cov(centered.T)
-        
-        # Eigendecomposition
-        eigenvalues, eigenvectors = eig(cov)
-        eigenvalues = np.real(eigenvalues)
-        
-        # Sort by explained variance
-        idx = eigenvalues.argsort()[::-1]
-        eigenvalues = eigenvalues[idx]
+        eigenvalues = decomposition_for(self.panel).covariance_eigenvalues()
         
         total_var = np.sum(eigenvalues)
         explained_var = eigenvalues / total_var
@@ -185,6 +178,101 @@ class VectorVarianceDecomposition:
 # PART 2: HARMONIC COHERENCE MODELS
 # ============================================================================
 
+# Default economic frequency bands (cycles per sample)
+ECONOMIC_BANDS = {
+    'high_freq': (0.1, 0.5),           # < 10 periods
+    'business_cycle': (1/96, 1/18),    # 1.5-8 years
+    'low_freq': (0, 1/96)              # > 8 years
+}
+
+
+class BandFilterBank:
+    """
+    Reusable Butterworth band filters in second-order-section (SOS) form
+    Designs are cached per (band, fs, order), so repeated calls only filter
+    
+    Band edges are interpreted explicitly:
+    - low <= 0           -> lowpass at high
+    - high >= fs/2       -> highpass at low
+    - otherwise          -> bandpass [low, high]
+    """
+    
+    def __init__(self, order: int = 2):
+        self.order = order
+        self._cache = {}
+    
+    def design(self, band: Tuple[float, float], fs: float = 1.0) -> np.ndarray:
+        """
+        SOS coefficients for one band (cached)
+        """
+        low, high = float(band[0]), float(band[1])
+        key = (low, high, float(fs), self.order)
+        
+        sos = self._cache.get(key)
+        if sos is None:
+            from scipy.signal import butter
+            
+            nyquist = fs / 2
+            if low <= 0 and high >= nyquist:
+                raise ValueError(f"Band {band} covers the full spectrum at fs={fs}")
+            if low <= 0:
+                sos = butter(self.order, high, btype='lowpass', fs=fs, output='sos')
+            elif high >= nyquist:
+                sos = butter(self.order, low, btype='highpass', fs=fs, output='sos')
+            else:
+                sos = butter(self.order, [low, high], btype='bandpass', fs=fs, output='sos')
+            self._cache[key] = sos
+        
+        return sos
+    
+    def apply(self, data: np.ndarray, band: Tuple[float, float],
+              fs: float = 1.0) -> np.ndarray:
+        """
+        Zero-phase filter along axis 0 (time), all columns at once
+        """
+        from scipy.signal import sosfiltfilt
+        
+        return sosfiltfilt(self.design(band, fs), data, axis=0)
+    
+    def clear(self):
+        self._cache.clear()
+
+
+_FILTER_BANK = BandFilterBank()
+
+
+def _welch_coherence_tensor(data: np.ndarray, fs: float = 1.0,
+                            nperseg: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Magnitude-squared coherence for every column pair in one pass
+    Same estimator as scipy.signal.coherence (Hann window, 50% overlap,
+    constant detrend, mean averaging)
+    
+    data: (n_time, n_series)
+    Returns: freqs (F,), coherence (F, n_series, n_series)
+    """
+    from scipy.signal import get_window
+    
+    n_time = data.shape[0]
+    nperseg = min(nperseg, n_time)
+    step = nperseg - nperseg // 2
+    
+    # (n_segments, n_series, nperseg) strided view, then detrend + window
+    segments = np.lib.stride_tricks.sliding_window_view(data, nperseg, axis=0)[::step]
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    segments = segments * get_window('hann', nperseg)
+    
+    spectra = np.fft.rfft(segments, axis=-1)                        # (S, N, F)
+    cross = np.einsum('sif,sjf->fij', spectra, spectra.conj())      # (F, N, N)
+    power = np.real(np.einsum('fii->fi', cross))                    # (F, N)
+    
+    denom = power[:, :, None] * power[:, None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coh = np.abs(cross) ** 2 / denom
+    
+    return np.fft.rfftfreq(nperseg, d=1.0 / fs), coh
+
+
 class HarmonicCoherence:
     """
     Advanced harmonic analysis for coherence measurement
@@ -269,41 +357,63 @@ class HarmonicCoherence:
     
     @staticmethod
     def frequency_band_coherence(signal_a: np.ndarray, signal_b: np.ndarray,
-                                 bands: Dict[str, Tuple[float, float]] = None) -> Dict:
+                                 bands: Dict[str, Tuple[float, float]] = None,
+                                 fs: float = 1.0) -> Dict:
         """
         Coherence in specific frequency bands
         e.g., 'business_cycle': (1/96, 1/18) months
         """
-        from scipy.signal import butter, filtfilt, coherence
+        pair = np.column_stack([signal_a, signal_b])
+        matrices = HarmonicCoherence.band_coherence_matrices(pair, bands, fs)
         
-        if bands is None:
-            # Default economic frequency bands
-            bands = {
-                'high_freq': (0.1, 0.5),      # < 10 periods
-                'business_cycle': (1/96, 1/18),  # 1.5-8 years
-                'low_freq': (0, 1/96)          # > 8 years
+        return {
+            band_name: {
+                'mean_coherence': stats['mean_coherence'][0, 1],
+                'max_coherence': stats['max_coherence'][0, 1],
+                'coherence_std': stats['coherence_std'][0, 1],
+                'freq_range': stats['freq_range']
             }
+            for band_name, stats in matrices.items()
+        }
+    
+    @staticmethod
+    def band_coherence_matrices(panel, bands: Dict[str, Tuple[float, float]] = None,
+                                fs: float = 1.0,
+                                filter_bank: BandFilterBank = None) -> Dict:
+        """
+        Band-limited coherence for every pair and every band in one pass
+        Each band filters the whole panel once (SOS, axis 0); the spectra
+        of all filtered columns are then cross-multiplied together
+        
+        panel: DataFrame or (n_time, n_series) array
+        Returns: {band: {'mean_coherence', 'max_coherence', 'coherence_std':
+                  (n_series, n_series) arrays or DataFrames, 'freq_range'}}
+        """
+        if bands is None:
+            bands = ECONOMIC_BANDS
+        if filter_bank is None:
+            filter_bank = _FILTER_BANK
+        
+        columns = panel.columns if isinstance(panel, pd.DataFrame) else None
+        data = np.asarray(panel, dtype=float)
         
         results = {}
         
-        for band_name, (low, high) in bands.items():
-            # Bandpass filter
-            if low == 0:
-                b, a = butter(2, high, btype='low', fs=1.0)
-            else:
-                b, a = butter(2, [low, high], btype='band', fs=1.0)
-            
-            filtered_a = filtfilt(b, a, signal_a)
-            filtered_b = filtfilt(b, a, signal_b)
-            
-            # Coherence in this band
-            f, Cxy = coherence(filtered_a, filtered_b, fs=1.0)
+        for band_name, band in bands.items():
+            filtered = filter_bank.apply(data, band, fs)
+            f, coh = _welch_coherence_tensor(filtered, fs=fs)
             
-            results[band_name] = {
-                'mean_coherence': np.mean(Cxy),
-                'max_coherence': np.max(Cxy),
-                'coherence_std': np.std(Cxy)
+            stats = {
+                'mean_coherence': np.nanmean(coh, axis=0),
+                'max_coherence': np.nanmax(coh, axis=0),
+                'coherence_std': np.nanstd(coh, axis=0)
             }
+            if columns is not None:
+                stats = {k: pd.DataFrame(v, index=columns, columns=columns)
+                         for k, v in stats.items()}
+            stats['freq_range'] = tuple(band)
+            
+            results[band_name] = stats
         
         return results
 
@@ -337,11 +447,10 @@ class DynamicModeDecomposition:
         X = self.panel.values.T  # (n_series, n_time)
         
         # Split into snapshots
-        X1 = X[:, :-1]
         X2 = X[:, 1:]
         
-        # SVD of X1
-        U, s, Vt = svd(X1, full_matrices=False)
+        # SVD of X1 = X[:, :-1] (cached per panel, reused across ranks)
+        U, s, Vt = decomposition_for(self.panel).snapshot_svd()
         
         if rank:
             U = U[:, :rank]
@@ -428,10 +537,22 @@ class DynamicModeDecomposition:
 # PART 4: MULTI-SCALE COHERENCE
 # ============================================================================
 
+def _eemd_trial(args: Tuple[np.ndarray, int, float, int]) -> np.ndarray:
+    """
+    One EEMD noise realization (module-level so it pickles into worker processes)
+    Returns: (max_imf + 1, n_time) array, last row is the residual trend
+    """
+    signal, max_imf, noise_std, seed = args
+    rng = np.random.default_rng(seed)
+    noisy = signal + noise_std * rng.standard_normal(len(signal))
+    return MultiScaleCoherence._emd_fixed(noisy, max_imf)
+
+
 class MultiScaleCoherence:
     """
     Analyze coherence across different time scales
-    Uses empirical mode decomposition (EMD)
+    Uses empirical mode decomposition (EMD) or its noise-assisted
+    ensemble variant (EEMD) for long / noisy daily series
     """
     
     @staticmethod
@@ -440,14 +561,15 @@ class MultiScaleCoherence:
         Decompose signal into intrinsic mode functions (IMFs)
         Each IMF represents a different time scale
         """
-        from scipy.signal import hilbert
+        signal = np.asarray(signal, dtype=float)
+        x = np.arange(len(signal))
         
         imfs = []
         residual = signal.copy()
         
         for _ in range(max_imf):
             # Simple EMD implementation (sifting process)
-            imf = MultiScaleCoherence._sift(residual)
+            imf = MultiScaleCoherence._sift(residual, x=x)
             
             if imf is None:
                 break
@@ -462,24 +584,92 @@ class MultiScaleCoherence:
         return imfs
     
     @staticmethod
-    def _sift(signal: np.ndarray, max_iter: int = 10) -> np.ndarray:
+    def ensemble_empirical_mode_decomposition(signal: np.ndarray, max_imf: int = 5,
+                                              n_ensembles: int = 100,
+                                              noise_width: float = 0.2,
+                                              n_jobs: int = None,
+                                              seed: int = None) -> List[np.ndarray]:
+        """
+        Ensemble EMD (Wu & Huang, 2009)
+        Averages the IMFs of many white-noise-perturbed copies of the signal,
+        which suppresses mode mixing on noisy daily data.
+        
+        n_ensembles: number of noise realizations
+        noise_width: noise std as a fraction of the signal std
+        n_jobs: worker processes (None = all cores, 1 = run serially)
+        seed: makes the ensemble reproducible regardless of n_jobs
+        """
+        signal = np.asarray(signal, dtype=float)
+        noise_std = noise_width * np.std(signal)
+        
+        # One child seed per realization -> same result serial or parallel
+        seeds = np.random.SeedSequence(seed).generate_state(n_ensembles)
+        tasks = [(signal, max_imf, noise_std, int(s)) for s in seeds]
+        
+        if n_jobs == 1:
+            trials = map(_eemd_trial, tasks)
+            total = np.sum(list(trials), axis=0)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            workers = n_jobs or os.cpu_count() or 1
+            chunksize = max(1, n_ensembles // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                total = np.zeros((max_imf + 1, len(signal)))
+                for trial in pool.map(_eemd_trial, tasks, chunksize=chunksize):
+                    total += trial
+        
+        mean_imfs = total / n_ensembles
+        
+        # Drop IMF slots no realization filled, keep the trend
+        imfs = [imf for imf in mean_imfs[:-1] if np.any(imf)]
+        imfs.append(mean_imfs[-1])
+        return imfs
+    
+    @staticmethod
+    def _emd_fixed(signal: np.ndarray, max_imf: int) -> np.ndarray:
+        """
+        EMD into a fixed-shape array so ensemble members can be summed
+        Unfilled IMF rows stay zero; last row is the residual
+        """
+        out = np.zeros((max_imf + 1, len(signal)))
+        imfs = MultiScaleCoherence.empirical_mode_decomposition(signal, max_imf)
+        # Too few extrema (short / monotone / flat input) -> residual only
+        if len(imfs) > 1:
+            out[:len(imfs) - 1] = imfs[:-1]
+        out[-1] = imfs[-1]
+        return out
+    
+    @staticmethod
+    def _find_extrema(h: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Strict local maxima / minima from sign changes of the first difference
+        """
+        d = np.diff(h)
+        peaks = np.flatnonzero((d[:-1] > 0) & (d[1:] < 0)) + 1
+        troughs = np.flatnonzero((d[:-1] < 0) & (d[1:] > 0)) + 1
+        return peaks, troughs
+    
+    @staticmethod
+    def _sift(signal: np.ndarray, max_iter: int = 10,
+              x: np.ndarray = None) -> np.ndarray:
         """
         EMD sifting iteration
+        x: optional precomputed sample grid, shared across IMFs
         """
         from scipy.interpolate import CubicSpline
         
         h = signal.copy()
+        n = len(h)
+        if x is None:
+            x = np.arange(n)
+        
+        # Work buffers reused across sifting iterations
+        mean_env = np.empty(n)
+        h_new = np.empty(n)
         
         for _ in range(max_iter):
             # Find extrema
-            peaks = []
-            troughs = []
-            
-            for i in range(1, len(h) - 1):
-                if h[i] > h[i-1] and h[i] > h[i+1]:
-                    peaks.append(i)
-                elif h[i] < h[i-1] and h[i] < h[i+1]:
-                    troughs.append(i)
+            peaks, troughs = MultiScaleCoherence._find_extrema(h)
             
             if len(peaks) < 3 or len(troughs) < 3:
                 return None
@@ -489,29 +679,39 @@ class MultiScaleCoherence:
             lower_env = CubicSpline(troughs, h[troughs], extrapolate=True)
             
             # Mean envelope
-            x = np.arange(len(h))
-            mean_env = (upper_env(x) + lower_env(x)) / 2
+            np.add(upper_env(x), lower_env(x), out=mean_env)
+            mean_env *= 0.5
             
-            h_new = h - mean_env
+            np.subtract(h, mean_env, out=h_new)
             
-            # Check stopping criterion
-            if np.sum((h - h_new)**2) / np.sum(h**2) < 0.01:
+            # Check stopping criterion (h - h_new == mean_env)
+            if np.dot(mean_env, mean_env) / np.dot(h, h) < 0.01:
                 return h_new
             
-            h = h_new
+            h, h_new = h_new, h
         
         return h
     
     @staticmethod
     def scale_coherence(signal_a: np.ndarray, signal_b: np.ndarray, 
-                       max_scales: int = 5) -> pd.DataFrame:
+                       max_scales: int = 5, method: str = 'emd',
+                       **ensemble_kwargs) -> pd.DataFrame:
         """
         Compute coherence at each time scale (IMF level)
+        method: 'emd' or 'eemd' (ensemble_kwargs are passed to the EEMD)
         """
         from scipy.signal import coherence
         
-        imfs_a = MultiScaleCoherence.empirical_mode_decomposition(signal_a, max_scales)
-        imfs_b = MultiScaleCoherence.empirical_mode_decomposition(signal_b, max_scales)
+        if method == 'emd':
+            imfs_a = MultiScaleCoherence.empirical_mode_decomposition(signal_a, max_scales)
+            imfs_b = MultiScaleCoherence.empirical_mode_decomposition(signal_b, max_scales)
+        elif method == 'eemd':
+            imfs_a = MultiScaleCoherence.ensemble_empirical_mode_decomposition(
+                signal_a, max_scales, **ensemble_kwargs)
+            imfs_b = MultiScaleCoherence.ensemble_empirical_mode_decomposition(
+                signal_b, max_scales, **ensemble_kwargs)
+        else:
+            raise ValueError(f"Unknown method: {method}")
         
         results = []
         
@@ -0,0 +1,864 @@
+"""
+VCF Geometry Panel
+==================
+
+Rolling geometry metrics for a normalized metric panel (theta, phi,
+divergence, resonance, stress index, MRF, MVSS), ported from the archived
+core-math engine (`vcf_core_math_engine.py`) with the per-date Python loops
+replaced by rolling primitives and batched transforms.
+
+Rolling Correlation Engine:
+---------------------------
+The archived engine rebuilt an N×N correlation matrix from scratch for every
+date (`window_data.corr()`), i.e. O(T·W·N²) work plus pandas overhead per row.
+`RollingCorrelation` instead keeps prefix sums of the columns and of their
+cross-products:
+
+    S1[t] = Σ_{s<t} x(s)            S2[t] = Σ_{s<t} x(s) x(s)ᵀ
+
+so the moments of any window [t-W+1, t] are two subtractions:
+
+    Σx  = S1[t+1] - S1[t+1-W]
+    Σxxᵀ = S2[t+1] - S2[t+1-W]
+    cov = (Σxxᵀ - Σx Σxᵀ / W) / (W - 1)
+
+so rolling correlation statistics for all dates cost O(T·N²) in total.
+S1 and the diagonal of S2 are kept for the whole panel; the full N×N
+cross-product sums are accumulated per block of dates (plus one window of
+history), so memory is O((block_size + W)·N²) instead of O(T·N²).
+
+Conventions:
+------------
+- Engine outputs follow pandas `.rolling(window)`: row t covers rows
+  t-W+1 … t and is NaN until the window is full.
+- Panel metrics follow the archived engine: the value at date i is computed
+  from the lookback rows *before* i, and the first `lookback` values are
+  back-filled from the first computed one.
+"""
+
+import time
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import hilbert
+
+
+# ---------------------------------------------------------
+# 1. Rolling Correlation Engine
+# ---------------------------------------------------------
+
+# Default size of one (dates × N × N) block: 4M float64 values = 32 MB
+BLOCK_ELEMENTS = 2 ** 22
+
+class RollingCorrelation:
+    """
+    Rolling means, covariances and correlations from prefix sums.
+
+    Build once per panel, then query any window length. Means and standard
+    deviations come from whole-panel prefix sums; covariances and the
+    statistics that reduce over the N×N matrix (mean off-diagonal
+    correlation, correlation change) are evaluated in blocks of dates, so
+    memory is bounded by block_size rather than by a (T × N × N) tensor.
+    """
+
+    def __init__(self, data: Union[pd.DataFrame, np.ndarray],
+                 block_size: int = None):
+        """
+        Parameters:
+        -----------
+        data : pd.DataFrame or np.ndarray
+            (T × N) panel without NaNs (fill before passing)
+        block_size : int, optional
+            Number of dates per block for N×N statistics (default: at most
+            2048, and small enough that one T×N×N block stays near 32 MB)
+        """
+        values = np.asarray(data, dtype=float)
+        if values.ndim != 2:
+            raise ValueError("RollingCorrelation expects a 2-D (T × N) panel")
+
+        self.n_time, self.n_series = values.shape
+        if block_size is None:
+            block_size = min(2048, max(64, BLOCK_ELEMENTS // max(self.n_series, 1) ** 2))
+        self.block_size = block_size
+
+        # Covariance is shift-invariant; centering keeps the prefix sums
+        # small and avoids cancellation on level series (prices, indices)
+        self._means = values.mean(axis=0)
+        centered = values - self._means
+
+        self._centered = centered
+
+        self._s1 = np.zeros((self.n_time + 1, self.n_series))
+        np.cumsum(centered, axis=0, out=self._s1[1:])
+
+        # Diagonal of S2 (sums of squares); cross-products are per block
+        self._sq = np.zeros((self.n_time + 1, self.n_series))
+        np.cumsum(centered ** 2, axis=0, out=self._sq[1:])
+
+        # Per-column scale used to decide when a window is constant
+        self._scale = np.maximum(np.abs(centered).max(axis=0), 1.0) ** 2
+
+    def _check_window(self, window: int):
+        if window < 2:
+            raise ValueError("window must be at least 2")
+
+    def _valid_range(self, window: int, start: int, stop: int) -> Tuple[int, int]:
+        return max(start, window - 1), min(stop, self.n_time)
+
+    def block_cov(self, window: int, start: int, stop: int,
+                  ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Window means and covariances for the windows ending at rows
+        start … stop-1 (one block of cov(); memory is O((stop - start) · N²)).
+
+        Returns:
+        --------
+        means : np.ndarray (stop - start × N)
+        cov : np.ndarray (stop - start × N × N)
+        """
+        self._check_window(window)
+        if start < window - 1 or stop > self.n_time or stop <= start:
+            raise ValueError("block must hold full windows ending inside the panel")
+
+        hi = np.arange(start + 1, stop + 1)
+        lo = hi - window
+
+        sum_x = self._s1[hi] - self._s1[lo]
+
+        # Cross-product prefix sums over rows lo[0] … stop-1 only
+        rows = self._centered[lo[0]:stop]
+        s2 = np.zeros((len(rows) + 1, self.n_series, self.n_series))
+        np.multiply(rows[:, :, None], rows[:, None, :], out=s2[1:])
+        np.cumsum(s2[1:], axis=0, out=s2[1:])
+        sum_xx = s2[window:] - s2[:-window]
+
+        cov = (sum_xx - sum_x[:, :, None] * sum_x[:, None, :] / window) / (window - ddof)
+        return sum_x / window, cov
+
+    def _block_corr(self, window: int, start: int, stop: int) -> np.ndarray:
+        """Window correlations (NaN for constant columns, like DataFrame.corr)."""
+        _, cov = self.block_cov(window, start, stop)
+        var = np.diagonal(cov, axis1=1, axis2=2).copy()
+        var[var <= 1e-12 * self._scale] = np.nan
+        std = np.sqrt(var)
+        corr = cov / (std[:, :, None] * std[:, None, :])
+        return np.clip(corr, -1.0, 1.0)
+
+    def _blocks(self, window: int):
+        first, last = self._valid_range(window, 0, self.n_time)
+        for start in range(first, last, self.block_size):
+            yield start, min(start + self.block_size, last)
+
+    def mean(self, window: int) -> np.ndarray:
+        """
+        Rolling column means.
+
+        Returns:
+        --------
+        np.ndarray (T × N), NaN until the window is full
+        """
+        self._check_window(window)
+        out = np.full((self.n_time, self.n_series), np.nan)
+        first = window - 1
+        if first < self.n_time:
+            hi = np.arange(first + 1, self.n_time + 1)
+            out[first:] = (self._s1[hi] - self._s1[hi - window]) / window + self._means
+        return out
+
+    def std(self, window: int, ddof: int = 1) -> np.ndarray:
+        """
+        Rolling column standard deviations.
+
+        Returns:
+        --------
+        np.ndarray (T × N), NaN until the window is full
+        """
+        self._check_window(window)
+        out = np.full((self.n_time, self.n_series), np.nan)
+        first = window - 1
+        if first < self.n_time:
+            hi = np.arange(first + 1, self.n_time + 1)
+            sum_x = self._s1[hi] - self._s1[hi - window]
+            sum_sq = self._sq[hi] - self._sq[hi - window]
+            var = (sum_sq - sum_x ** 2 / window) / (window - ddof)
+            # Constant windows leave a rounding residue; report them as exactly 0
+            var[var <= 1e-12 * self._scale] = 0.0
+            out[first:] = np.sqrt(var)
+        return out
+
+    def cov(self, window: int, ddof: int = 1) -> np.ndarray:
+        """
+        Rolling covariance matrices.
+
+        Returns:
+        --------
+        np.ndarray (T × N × N), NaN until the window is full
+        """
+        self._check_window(window)
+        out = np.full((self.n_time, self.n_series, self.n_series), np.nan)
+        for start, stop in self._blocks(window):
+            out[start:stop] = self.block_cov(window, start, stop, ddof)[1]
+        return out
+
+    def corr(self, window: int) -> np.ndarray:
+        """
+        Rolling correlation matrices.
+
+        Returns:
+        --------
+        np.ndarray (T × N × N), NaN until the window is full
+        """
+        self._check_window(window)
+        out = np.full((self.n_time, self.n_series, self.n_series), np.nan)
+        for start, stop in self._blocks(window):
+            out[start:stop] = self._block_corr(window, start, stop)
+        return out
+
+    def mean_offdiag_corr(self, window: int) -> np.ndarray:
+        """
+        Rolling mean of the upper-triangle (pairwise) correlations.
+
+        Returns:
+        --------
+        np.ndarray (T,), NaN until the window is full
+        """
+        self._check_window(window)
+        out = np.full(self.n_time, np.nan)
+        iu = np.triu_indices(self.n_series, k=1)
+        if len(iu[0]) == 0:
+            return out
+
+        with np.errstate(invalid='ignore'):
+            for start, stop in self._blocks(window):
+                pairs = self._block_corr(window, start, stop)[:, iu[0], iu[1]]
+                valid = ~np.isnan(pairs)
+                count = valid.sum(axis=1)
+                total = np.where(valid, pairs, 0.0).sum(axis=1)
+                out[start:stop] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+        return out
+
+    def corr_change(self, window: int, recent: int) -> np.ndarray:
+        """
+        Mean absolute change between the full-window correlation matrix and
+        the correlation matrix of its most recent `recent` rows.
+
+        Matches `np.abs(corr_full - corr_recent).mean().mean()` in pandas
+        (column means over the full N×N matrix, NaNs skipped).
+
+        Returns:
+        --------
+        np.ndarray (T,), NaN until the full window is available
+        """
+        self._check_window(window)
+        self._check_window(recent)
+        out = np.full(self.n_time, np.nan)
+
+        with np.errstate(invalid='ignore'):
+            for start, stop in self._blocks(max(window, recent)):
+                diff = np.abs(self._block_corr(window, start, stop)
+                              - self._block_corr(recent, start, stop))
+                valid = ~np.isnan(diff)
+                col_count = valid.sum(axis=1)
+                col_mean = np.where(valid, diff, 0.0).sum(axis=1) / np.maximum(col_count, 1)
+                col_mean[col_count == 0] = np.nan
+                n_cols = (~np.isnan(col_mean)).sum(axis=1)
+                out[start:stop] = np.where(
+                    n_cols > 0,
+                    np.nansum(col_mean, axis=1) / np.maximum(n_cols, 1),
+                    np.nan,
+                )
+        return out
+
+
+# ---------------------------------------------------------
+# 2. Helpers
+# ---------------------------------------------------------
+
+def _numeric_panel(df: pd.DataFrame) -> pd.DataFrame:
+    """Numeric columns, forward-filled, remaining gaps set to 0."""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    return df[numeric_cols].ffill().fillna(0)
+
+
+def _lagged(values: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    Shift trailing-window statistics to the engine's "rows before i"
+    convention and back-fill the first `lookback` entries.
+    """
+    n = len(values)
+    out = np.zeros(n)
+    if n <= lookback:
+        return out
+    out[lookback:] = values[lookback - 1:n - 1]
+    out[:lookback] = out[lookback]
+    return out
+
+
+# ---------------------------------------------------------
+# 3. Divergence & Stress Controls
+# ---------------------------------------------------------
+
+def compute_divergence(df, lookback=63, engine=None):
+    """
+    Divergence detection between metrics.
+
+    Measures when different market components move in opposite directions,
+    indicating potential instability or regime change.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    lookback : int
+        Rolling window for correlation computation
+    engine : RollingCorrelation, optional
+        Pre-built engine for `df` (shared with other metrics)
+
+    Returns:
+    --------
+    np.array : Divergence score (0 = convergent, 1 = divergent)
+    """
+    data = _numeric_panel(df)
+
+    if data.shape[1] < 2:
+        return np.zeros(len(df))
+
+    if engine is None:
+        engine = RollingCorrelation(data.values)
+
+    # Divergence = (1 - mean pairwise correlation) / 2, in [0, 1]
+    mean_corr = engine.mean_offdiag_corr(lookback)
+    return _lagged((1 - mean_corr) / 2, lookback)
+
+
+def compute_stress_index(df, lookback=63, z_threshold=2.5, engine=None):
+    """
+    Stress index combining multiple stress indicators.
+
+    Detects:
+    - Z-score outliers in individual metrics
+    - Correlation breakdown
+    - Volatility spikes
+    - Extreme divergence
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    lookback : int
+        Rolling window for stress computation
+    z_threshold : float
+        Z-score threshold for outlier detection
+    engine : RollingCorrelation, optional
+        Pre-built engine for `df` (shared with other metrics)
+
+    Returns:
+    --------
+    np.array : Composite stress index [0, 1]
+    """
+    data = _numeric_panel(df)
+    n_time, n_cols = data.shape
+    recent = lookback // 4
+
+    if n_time <= lookback or n_cols == 0:
+        return np.zeros(len(df))
+
+    if engine is None:
+        engine = RollingCorrelation(data.values)
+
+    values = data.values
+
+    # Window statistics ending at i-1, aligned to date i
+    def lag(stat):
+        out = np.full_like(stat, np.nan)
+        out[1:] = stat[:-1]
+        return out
+
+    rolling_mean = lag(engine.mean(lookback))
+    rolling_std = lag(engine.std(lookback))
+    # A constant window's mean is its last value; the prefix-sum mean carries
+    # a rounding residue that would be divided by 1e-10 below
+    rolling_mean = np.where(rolling_std == 0, lag(values), rolling_mean)
+    recent_std = lag(engine.std(recent)) if recent >= 2 else np.full_like(rolling_std, np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 1. Z-score outlier stress
+        z_scores = np.abs((values - rolling_mean) / (rolling_std + 1e-10))
+        outliers = (z_scores > z_threshold).sum(axis=1)
+        outlier_stress = outliers / n_cols
+
+        # 2. Correlation breakdown stress
+        if recent >= 2:
+            corr_change = lag(engine.corr_change(lookback, recent))
+        else:
+            corr_change = np.full(n_time, np.nan)
+        corr_stress = np.minimum(corr_change * 2, 1)
+
+        # 3. Volatility spike stress
+        ratios = recent_std / (rolling_std + 1e-10)
+        n_valid = (~np.isnan(ratios)).sum(axis=1)
+        vol_ratio = np.where(n_valid > 0,
+                             np.nansum(ratios, axis=1) / np.maximum(n_valid, 1),
+                             np.nan)
+        vol_stress = np.minimum(np.maximum(vol_ratio - 1, 0), 1)
+
+        # 4. Extreme movement stress
+        extreme_stress = np.minimum(outliers / n_cols, 1)
+
+    # Composite stress (equal-weighted average)
+    stress = (outlier_stress + corr_stress + vol_stress + extreme_stress) / 4
+
+    stress[:lookback] = stress[lookback]
+    return stress
+
+
+# ---------------------------------------------------------
+# 4. Angular Geometry (theta, phi, resonance)
+# ---------------------------------------------------------
+
+@lru_cache(maxsize=16)
+def _hilbert_endpoint_kernel(length: int) -> np.ndarray:
+    """
+    Complex weights g such that hilbert(x)[-1] == g · x for len(x) == length.
+
+    The analytic signal is linear in x, so its last sample is a fixed
+    weighted sum of the window. Applying g to every window at once is a
+    batched Hilbert transform that only produces the sample we need.
+    """
+    return hilbert(np.eye(length), axis=0)[-1]
+
+
+def _windows(values: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    Read-only (T-lookback, N, lookback) view; entry k holds the rows
+    k … k+lookback-1, i.e. the window used for date k+lookback.
+    """
+    return sliding_window_view(values[:-1], lookback, axis=0)
+
+
+def compute_theta(df, lookback=63, engine=None, block_size=None):
+    """
+    Angular positioning based on macro seasonality geometry.
+
+    Computes phase angle from Hilbert transform of principal component,
+    representing position in the market cycle.
+
+    Each window's first principal axis comes from a batched symmetric
+    eigen-decomposition of the rolling covariances; its scores are then
+    projected and Hilbert-transformed for all windows at once.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    lookback : int
+        Window for phase computation
+    engine : RollingCorrelation, optional
+        Pre-built engine for `df` (shared with other metrics)
+    block_size : int, optional
+        Windows per batched eigen-decomposition (default: the engine's)
+
+    Returns:
+    --------
+    np.array : Angular position in radians [0, 2π]
+
+    Note:
+    -----
+    The principal axis sign follows sklearn's convention (largest-magnitude
+    loading positive), so results match the archived sklearn-based loop.
+    """
+    data = _numeric_panel(df)
+
+    if len(data) < lookback or data.shape[1] == 0:
+        return np.zeros(len(df))
+
+    values = data.values
+    n_time = len(values)
+    theta = np.full(n_time, np.nan)
+
+    if n_time > lookback:
+        if engine is None:
+            engine = RollingCorrelation(values)
+
+        block_size = block_size or engine.block_size
+        windows = _windows(values, lookback)
+        kernel = _hilbert_endpoint_kernel(lookback)
+        # Window for date i ends at row i-1
+        means = engine.mean(lookback)[lookback - 1:n_time - 1]
+
+        for start in range(0, len(windows), block_size):
+            stop = min(start + block_size, len(windows))
+            block = windows[start:stop]
+
+            cov = engine.block_cov(lookback, start + lookback - 1,
+                                   stop + lookback - 1)[1]
+            _, eigvecs = np.linalg.eigh(cov)
+            axis = eigvecs[:, :, -1]
+            pivot = np.abs(axis).argmax(axis=1)
+            axis *= np.sign(axis[np.arange(len(axis)), pivot])[:, None]
+
+            # PC1 scores of each window, then phase of its last sample
+            scores = np.einsum('bnl,bn->bl', block, axis)
+            scores -= np.einsum('bn,bn->b', means[start:stop], axis)[:, None]
+            phase = np.angle(scores @ kernel)
+
+            block_theta = (phase + np.pi) % (2 * np.pi)
+
+            # Windows without variance keep the previous angle
+            flat = block.reshape(len(block), -1)
+            block_theta[flat.std(axis=1) < 1e-10] = np.nan
+
+            theta[start + lookback:stop + lookback] = block_theta
+
+    # Carry angles through flat windows (0 before the first valid one)
+    theta = pd.Series(theta).ffill().fillna(0).values
+
+    if lookback > 0 and n_time > lookback:
+        theta[:lookback] = theta[lookback]
+
+    return theta
+
+
+def compute_phi(df, lookback=21, theta=None):
+    """
+    Curvature / second-order geometric effects.
+
+    Measures the rate of change of theta (angular acceleration),
+    indicating regime shifts and inflection points.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    lookback : int
+        Window for curvature computation
+    theta : np.array, optional
+        Pre-computed theta (avoids recomputing the rolling PCA)
+
+    Returns:
+    --------
+    np.array : Curvature measure
+    """
+    if theta is None:
+        theta = compute_theta(df, lookback=63)
+
+    # Compute first derivative (angular velocity)
+    dtheta = np.gradient(theta)
+
+    # Compute second derivative (angular acceleration / curvature)
+    phi = np.gradient(dtheta)
+
+    # Smooth with rolling window
+    phi_smooth = pd.Series(phi).rolling(window=lookback, min_periods=1).mean()
+
+    return phi_smooth.values
+
+
+def compute_resonance(df, lookback=126, block_size=2048):
+    """
+    Resonance score measuring harmonic alignment between inputs.
+
+    High resonance occurs when multiple metrics oscillate in phase,
+    suggesting coordinated market behavior.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    lookback : int
+        Window for frequency analysis
+
+    Returns:
+    --------
+    np.array : Resonance score [0, 1]
+    """
+    data = _numeric_panel(df)
+    values = data.values
+    n_time, n_cols = values.shape
+
+    if n_cols < 2 or n_time <= lookback:
+        return np.zeros(len(df))
+
+    windows = _windows(values, lookback)
+    kernel = _hilbert_endpoint_kernel(lookback)
+
+    resonance = np.zeros(n_time)
+
+    for start in range(0, len(windows), block_size):
+        stop = min(start + block_size, len(windows))
+
+        block = windows[start:stop]
+
+        # Instantaneous phase at the end of every window, all series at once
+        phases = np.angle(block @ kernel)
+
+        # Flat series in a window carry no phase and are left out
+        mask = block.std(axis=-1) >= 1e-10
+        count = mask.sum(axis=1)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Mean resultant length (circular statistics)
+            mean_cos = np.where(mask, np.cos(phases), 0.0).sum(axis=1) / count
+            mean_sin = np.where(mask, np.sin(phases), 0.0).sum(axis=1) / count
+            resultant_length = np.sqrt(mean_cos ** 2 + mean_sin ** 2)
+
+        resonance[start + lookback:stop + lookback] = np.where(count >= 2, resultant_length, 0.0)
+
+    if lookback > 0:
+        resonance[:lookback] = resonance[lookback]
+
+    return resonance
+
+
+# ---------------------------------------------------------
+# 5. MRF + MVSS Block
+# ---------------------------------------------------------
+
+def compute_mrf(df, weights=None):
+    """
+    Unified Market Risk Factor based on normalized metrics + weights.
+
+    Constructs a composite risk measure from all available metrics,
+    with optional custom weighting.
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    weights : dict, optional
+        Custom weights for each metric
+
+    Returns:
+    --------
+    np.array : Market Risk Factor
+    """
+    data = _numeric_panel(df)
+    numeric_cols = data.columns
+
+    if weights is None:
+        # Equal weighting
+        weights = {col: 1 / len(numeric_cols) for col in numeric_cols}
+
+    # Ensure weights sum to 1
+    weight_sum = sum(weights.values())
+    w = np.array([weights.get(col, 0.0) / weight_sum for col in numeric_cols])
+
+    return data.values @ w
+
+
+def _window_sums(prefix: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Sum of the underlying values over [lo, hi) from a zero-led prefix sum."""
+    return prefix[hi] - prefix[lo]
+
+
+def compute_mvss(df, mrf=None, lookback=252):
+    """
+    Market Vector Stability Score (MVSS).
+
+    Sortino-like stability score measuring:
+        true signal response / false signal noise
+
+    Higher MVSS indicates more stable, reliable market signals.
+
+    All window statistics (mean change, downside deviation, lag-1
+    autocorrelation) come from prefix sums of the MRF changes, so the
+    whole series costs O(T).
+
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Panel with normalized metrics
+    mrf : np.array, optional
+        Pre-computed MRF values
+    lookback : int
+        Window for stability computation
+
+    Returns:
+    --------
+    np.array : MVSS values
+    """
+    if mrf is None:
+        mrf = compute_mrf(df)
+
+    mrf = np.asarray(mrf, dtype=float)
+    n_time = len(mrf)
+    mvss = np.zeros(n_time)
+
+    if n_time <= lookback or lookback < 3:
+        return mvss
+
+    # d[j] = mrf[j] - mrf[j-1]; the window for date i (rows i-L … i-1)
+    # holds the changes d[i-L+1 … i-1]
+    d = np.zeros(n_time)
+    d[1:] = np.diff(mrf)
+
+    def prefix(x):
+        out = np.zeros(len(x) + 1)
+        np.cumsum(x, out=out[1:])
+        return out
+
+    neg = d < 0
+    down = np.where(neg, d, 0.0)
+
+    p_d, p_d2 = prefix(d), prefix(d * d)
+    p_neg, p_down, p_down2 = prefix(neg.astype(float)), prefix(down), prefix(down * down)
+
+    # Lag-1 pairs (d[j], d[j-1])
+    cur = np.zeros(n_time)
+    prev = np.zeros(n_time)
+    cur[2:] = d[2:]
+    prev[2:] = d[1:-1]
+    p_c, p_p = prefix(cur), prefix(prev)
+    p_cc, p_pp, p_cp = prefix(cur * cur), prefix(prev * prev), prefix(cur * prev)
+
+    i = np.arange(lookback, n_time)
+
+    # Window changes: d[i-L+1 … i-1]
+    lo, hi = i - lookback + 1, i
+    n = lookback - 1
+    mean_return = _window_sums(p_d, lo, hi) / n
+
+    # Downside deviation (sample std of negative changes)
+    n_down = _window_sums(p_neg, lo, hi)
+    s_down = _window_sums(p_down, lo, hi)
+    ss_down = _window_sums(p_down2, lo, hi)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        down_var = (ss_down - s_down ** 2 / n_down) / (n_down - 1)
+        downside_dev = np.sqrt(np.maximum(down_var, 0.0))
+    downside_dev = np.where(n_down == 0, 1e-10, downside_dev)
+    downside_dev = np.where(n_down == 1, np.nan, downside_dev)
+
+    sortino = mean_return / (downside_dev + 1e-10)
+
+    # Lag-1 autocorrelation of the window changes: pairs j = i-L+2 … i-1
+    lo_p = i - lookback + 2
+    m = lookback - 2
+    sc, sp = _window_sums(p_c, lo_p, hi), _window_sums(p_p, lo_p, hi)
+    scc, spp = _window_sums(p_cc, lo_p, hi), _window_sums(p_pp, lo_p, hi)
+    scp = _window_sums(p_cp, lo_p, hi)
+
+    cov_cp = scp - sc * sp / m
+    var_c = scc - sc ** 2 / m
+    var_p = spp - sp ** 2 / m
+    scale = np.maximum(_window_sums(p_d2, lo, hi), 1e-300)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        autocorr = cov_cp / np.sqrt(var_c * var_p)
+    degenerate = (var_c <= 1e-12 * scale) | (var_p <= 1e-12 * scale)
+    autocorr = np.where(degenerate | np.isnan(autocorr), 0.0, np.clip(autocorr, -1, 1))
+
+    # Composite stability score, normalized to [0, 1] using tanh
+    stability = 0.7 * sortino + 0.3 * autocorr
+    mvss[lookback:] = (np.tanh(stability) + 1) / 2
+
+    mvss[:lookback] = mvss[lookback]
+
+    return mvss
+
+
+# ---------------------------------------------------------
+# 6. Build Final Geometry Panel
+# ---------------------------------------------------------
+
+GEOMETRY_DEFAULTS = {
+    'theta_lookback': 63,
+    'phi_lookback': 21,
+    'divergence_lookback': 63,
+    'resonance_lookback': 126,
+    'stress_lookback': 63,
+    'z_threshold': 2.5,
+    'mvss_lookback': 252,
+    'weights': None,
+}
+
+# stage -> (dependencies, function of the stage context)
+GEOMETRY_STAGES = {
+    'data': ([], lambda ctx: _numeric_panel(ctx['panel'])),
+    'engine': (['data'], lambda ctx: RollingCorrelation(ctx['data'].values)),
+    'theta': (['data', 'engine'], lambda ctx: compute_theta(
+        ctx['data'], ctx['params']['theta_lookback'], engine=ctx['engine'])),
+    'phi': (['theta'], lambda ctx: compute_phi(
+        None, ctx['params']['phi_lookback'], theta=ctx['theta'])),
+    'divergence': (['data', 'engine'], lambda ctx: compute_divergence(
+        ctx['data'], ctx['params']['divergence_lookback'], engine=ctx['engine'])),
+    'resonance': (['data'], lambda ctx: compute_resonance(
+        ctx['data'], ctx['params']['resonance_lookback'])),
+    'stress_index': (['data', 'engine'], lambda ctx: compute_stress_index(
+        ctx['data'], ctx['params']['stress_lookback'], ctx['params']['z_threshold'],
+        engine=ctx['engine'])),
+    'mrf': (['data'], lambda ctx: compute_mrf(ctx['data'], ctx['params']['weights'])),
+    'mvss': (['mrf'], lambda ctx: compute_mvss(
+        None, mrf=ctx['mrf'], lookback=ctx['params']['mvss_lookback'])),
+}
+
+GEOMETRY_METRICS = ['theta', 'phi', 'divergence', 'resonance', 'stress_index', 'mrf', 'mvss']
+
+
+def _stage_order(targets: List[str]) -> List[str]:
+    """Dependency-first order of the stages needed for `targets`."""
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        if name not in GEOMETRY_STAGES:
+            raise ValueError(f"Unknown geometry stage: {name}")
+        seen.add(name)
+        for dep in GEOMETRY_STAGES[name][0]:
+            visit(dep)
+        order.append(name)
+
+    for target in targets:
+        visit(target)
+    return order
+
+
+def build_geometry_panel(clean_panel, metrics=None, verbose=True, **params):
+    """
+    Construct complete geometry panel with all derived metrics.
+
+    Metrics are evaluated as a stage graph: each stage runs once, after its
+    dependencies, and shares their results (theta feeds phi, one rolling
+    correlation engine feeds theta/divergence/stress, mrf feeds
+    mvss). Every metric is computed from the input metric columns only.
+
+    Parameters:
+    -----------
+    clean_panel : pd.DataFrame
+        Panel with normalized metrics (non-numeric columns are carried over)
+    metrics : list, optional
+        Subset of GEOMETRY_METRICS to compute (default: all)
+    verbose : bool
+        Print per-stage progress and timings
+    **params :
+        Overrides for GEOMETRY_DEFAULTS (lookbacks, z_threshold, weights)
+
+    Returns:
+    --------
+    pd.DataFrame : input panel plus one column per metric
+    """
+    unknown = set(params) - set(GEOMETRY_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown geometry parameters: {sorted(unknown)}")
+
+    targets = list(metrics) if metrics is not None else GEOMETRY_METRICS
+    ctx = {'panel': clean_panel, 'params': {**GEOMETRY_DEFAULTS, **params}}
+
+    if verbose:
+        print("Computing geometric metrics...")
+
+    for stage in _stage_order(targets):
+        start = time.perf_counter()
+        ctx[stage] = GEOMETRY_STAGES[stage][1](ctx)
+        if verbose:
+            print(f"  - {stage} ({time.perf_counter() - start:.2f}s)")
+
+    out = clean_panel.copy()
+    for metric in targets:
+        out[metric] = ctx[metric]
+
+    return out
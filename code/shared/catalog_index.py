@@ -0,0 +1,340 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+# ======================================================
+# Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
+# ======================================================
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+REGISTRY_PATH = BASE_DIR / "registry" / "vcf_metric_registry.json"
+MASTER_CSV = BASE_DIR / "vcf_data_registry_output" / "vcf_data_registry_master.csv"
+CATALOG_DB = BASE_DIR / "vcf_data_registry_output" / "vcf_catalog.sqlite"
+
+# ======================================================
+# Catalog database layout
+# ======================================================
+# catalog     one row per master-registry row (all columns + popularity).
+#             Rows are grouped by source, smallest catalog first, and by
+#             descending popularity within a source (FRED reports 0-100,
+#             other providers 0), so id order is a relevance prior.
+# sources     first / last id of each source: a source filter becomes an
+#             id range, which FTS5 seeks to instead of scanning
+# title_fts   FTS5 over series_code / series_name  (ranked search)
+# text_fts    FTS5 over series_code / series_name / notes  (fallback)
+# meta        size / mtime of the CSV the database was built from
+#
+# Both FTS5 tables are external-content: the text lives only in catalog.
+#
+# Ranking: FTS5 has no top-k pruning, so bm25 over every match of a very
+# common term costs time proportional to its match count. Each query scores
+# only the first CANDIDATES matches in id order (small catalogs, then the
+# most popular series) and returns the best `limit`. Title matches come
+# first; matches found only with the notes fill the remaining slots.
+
+COLUMNS = ["source", "dataset", "series_code", "series_name", "frequency",
+           "units", "notes", "api_endpoint", "key_required", "raw_metadata"]
+
+# bm25 column weights: a hit in the title counts most, the long notes least
+TITLE_WEIGHTS = {"series_code": 5.0, "series_name": 10.0}
+TEXT_WEIGHTS = {"series_code": 5.0, "series_name": 10.0, "notes": 1.0}
+CANDIDATES = 1000
+
+# Release lags assumed for new registry entries, by frequency (days)
+DEFAULT_RELEASE_LAGS = {"daily": 1, "weekly": 7, "monthly": 45, "quarterly": 120, "annual": 365}
+
+SCHEMA = f"""
+CREATE TABLE staging ({", ".join(f"{c} TEXT" for c in COLUMNS)});
+CREATE TABLE catalog (
+    id INTEGER PRIMARY KEY,
+    {", ".join(f"{c} TEXT" for c in COLUMNS)},
+    popularity INTEGER
+);
+CREATE TABLE sources (source TEXT PRIMARY KEY COLLATE NOCASE, lo INTEGER, hi INTEGER);
+CREATE VIRTUAL TABLE title_fts USING fts5(
+    {", ".join(TITLE_WEIGHTS)}, content='catalog', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE VIRTUAL TABLE text_fts USING fts5(
+    {", ".join(TEXT_WEIGHTS)}, content='catalog', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+# ======================================================
+# Build
+# ======================================================
+def _source_stamp(csv_path) -> str:
+    stat = os.stat(csv_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def is_fresh(master_csv=None, db_path=None) -> bool:
+    """True if the database exists and was built from this exact CSV."""
+    db_path = Path(db_path or CATALOG_DB)
+    if not db_path.exists():
+        return False
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+    return row is not None and row[0] == _source_stamp(master_csv or MASTER_CSV)
+
+
+def build_catalog_index(master_csv=None, db_path=None, force: bool = False,
+                        chunksize: int = 50_000) -> int:
+    """Index the master registry CSV; returns the number of rows indexed.
+
+    The CSV is streamed in chunks, the database is built in a temp file and
+    renamed into place. Skipped (returns -1) when the database is fresh.
+    """
+    master_csv = Path(master_csv or MASTER_CSV)
+    db_path = Path(db_path or CATALOG_DB)
+    if not force and is_fresh(master_csv, db_path):
+        return -1
+
+    tmp_path = Path(str(db_path) + ".tmp")
+    tmp_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+
+        n_rows = 0
+        insert = f"INSERT INTO staging VALUES ({', '.join('?' * len(COLUMNS))})"
+        for chunk in pd.read_csv(master_csv, dtype=str, keep_default_na=False, chunksize=chunksize):
+            chunk = chunk.reindex(columns=COLUMNS, fill_value="")
+            conn.executemany(insert, chunk.itertuples(index=False, name=None))
+            n_rows += len(chunk)
+
+        # Smallest source first, most popular first within a source
+        popularity = ("CASE WHEN json_valid(raw_metadata) "
+                      "THEN CAST(COALESCE(json_extract(raw_metadata, '$.popularity'), 0) AS INTEGER) "
+                      "ELSE 0 END")
+        conn.execute(f"""
+            INSERT INTO catalog ({", ".join(COLUMNS)}, popularity)
+            SELECT {", ".join(f"s.{c}" for c in COLUMNS)}, {popularity} AS p
+            FROM staging s
+            JOIN (SELECT upper(source) AS key, count(*) AS n FROM staging GROUP BY key) sizes
+              ON sizes.key = upper(s.source)
+            ORDER BY sizes.n, sizes.key, p DESC, s.rowid""")
+        conn.execute("DROP TABLE staging")
+        conn.execute("INSERT INTO sources SELECT source, min(id), max(id) FROM catalog "
+                     "GROUP BY upper(source)")
+
+        for table in ("title_fts", "text_fts"):
+            conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+            conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+        conn.execute("CREATE INDEX catalog_code ON catalog(series_code)")
+        conn.execute("INSERT INTO meta VALUES ('source', ?)", (_source_stamp(master_csv),))
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    return n_rows
+
+
+# ======================================================
+# Search
+# ======================================================
+def fts_query(text: str) -> str:
+    """Plain keywords → FTS5 query: every word must match, `word*` is a prefix.
+
+    Words are quoted, so punctuation in user input ("S&P 500") can't break
+    the FTS5 syntax.
+    """
+    terms = re.findall(r"\w+\*?", text or "")
+    return " ".join(f'"{t[:-1]}"*' if t.endswith("*") else f'"{t}"' for t in terms)
+
+
+class CatalogIndex:
+    """Ranked keyword search over the indexed master registry.
+
+        >>> catalog = CatalogIndex()
+        >>> hits = catalog.search("consumer price index", source="FRED", frequency="Monthly")
+        >>> catalog.add_to_registry(hits.head(2), category="Macro", tags="inflation macro")
+    """
+
+    FIELDS = "c.source, c.dataset, c.series_code, c.series_name, c.frequency, c.units, c.notes"
+
+    def __init__(self, db_path=None):
+        self.db_path = Path(db_path or CATALOG_DB)
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"Catalog index missing: {self.db_path} (run build_catalog_index)")
+        self.conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True,
+                                    check_same_thread=False)
+        self.sources = {source.lower(): (lo, hi) for source, lo, hi
+                        in self.conn.execute("SELECT source, lo, hi FROM sources")}
+
+    def close(self):
+        self.conn.close()
+
+    def search(self, query: str = None, source=None, frequency=None, units=None,
+               limit: int = 20) -> pd.DataFrame:
+        """Best matches for `query`, optionally filtered (case-insensitive).
+
+        source / frequency / units: a value or a list of values. Series whose
+        code or title contain every word come first, ordered by bm25 (lower
+        score = better); series that match only with their notes follow in
+        id order (score NaN). Without a query, rows come back in id order.
+        """
+        as_list = lambda v: None if v is None else ([v] if isinstance(v, str) else list(v))
+        if source is None:
+            ranges = [None]
+        else:
+            ranges = [self.sources[s.lower()] for s in as_list(source) if s.lower() in self.sources]
+
+        exact, exact_params = [], []
+        for column, values in (("frequency", as_list(frequency)), ("units", as_list(units))):
+            if values is not None:
+                exact.append(f"c.{column} COLLATE NOCASE IN ({', '.join('?' * len(values))})")
+                exact_params.extend(values)
+
+        match = fts_query(query)
+        if not match:
+            rows = self._select(None, None, ranges, exact, exact_params, limit)
+        else:
+            rows = self._select("title_fts", match, ranges, exact, exact_params, limit)
+            if len(rows) < limit:
+                # Fill up with series that match only together with their notes
+                seen = ", ".join(str(row[0]) for row in rows)
+                rows += self._select("text_fts", match, ranges,
+                                     exact + ([f"c.id NOT IN ({seen})"] if seen else []),
+                                     exact_params, limit - len(rows))
+
+        columns = [f[2:] for f in self.FIELDS.split(", ")] + ["score"]
+        return pd.DataFrame([row[1:] for row in rows], columns=columns)
+
+    def _select(self, table, match, ranges, exact, exact_params, limit) -> list:
+        """Rows matching `match` in one FTS table (or all rows if table is None).
+
+        title_fts: per id range, the first CANDIDATES matches in id order
+        are scored and the best `limit` kept. Otherwise the first `limit`
+        matches in id order.
+        """
+        if table == "title_fts":
+            weights = ", ".join(str(w) for w in TITLE_WEIGHTS.values())
+            score, order, n_first = f"bm25(title_fts, {weights})", "score", CANDIDATES
+        else:
+            score, order, n_first = "NULL", "id", int(limit)
+        source = f"{table} JOIN catalog c ON c.id = {table}.rowid" if table else "catalog c"
+        rowid = f"{table}.rowid" if table else "c.id"
+
+        parts, params = [], []
+        for id_range in ranges:
+            where = ([f"{table} MATCH ?"] if table else []) + exact
+            if id_range is not None:
+                where.append(f"{rowid} BETWEEN {id_range[0]} AND {id_range[1]}")
+            parts.append(f"SELECT * FROM (SELECT c.id, {self.FIELDS}, {score} AS score FROM {source} "
+                         f"WHERE {' AND '.join(where) or '1'} ORDER BY {rowid} LIMIT {n_first})")
+            params.extend(([match] if table else []) + exact_params)
+
+        if not parts:
+            return []
+        sql = " UNION ALL ".join(parts) + f" ORDER BY {order} LIMIT ?"
+        return self.conn.execute(sql, params + [limit]).fetchall()
+
+    def get(self, source: str, series_code: str) -> dict:
+        """Full catalog row (including raw_metadata) for one series, or None."""
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM catalog "
+            f"WHERE series_code = ? AND source = ? COLLATE NOCASE LIMIT 1",
+            (series_code, source))
+        row = cursor.fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    # --------------------------------------------------
+    # Registry
+    # --------------------------------------------------
+    def add_to_registry(self, hits, category: str, registry_path=None, tags: str = "",
+                        normalization: str = "zscore_rolling", direction: str = "+",
+                        metric_ids=None, overwrite: bool = False) -> list:
+        """Add search hits to vcf_metric_registry.json; returns the ids added.
+
+        hits: DataFrame from search() or a list of dicts with source /
+        series_code. Entries get the registry's usual fields; the release lag
+        defaults by frequency (DEFAULT_RELEASE_LAGS). Series already in the
+        registry (same source + ticker) are skipped, as are taken metric ids
+        unless overwrite=True. metric_ids optionally names the new entries.
+        """
+        registry_path = Path(registry_path or REGISTRY_PATH)
+        with open(registry_path, "r") as f:
+            registry = json.load(f)
+
+        records = hits.to_dict("records") if isinstance(hits, pd.DataFrame) else list(hits)
+        existing = {(str(m.get("source", "")).upper(), str(m.get("ticker", "")))
+                    for m in registry.values()}
+
+        added = []
+        for i, hit in enumerate(records):
+            row = self.get(hit["source"], hit["series_code"]) or hit
+            source, ticker = str(row["source"]), str(row["series_code"])
+            metric_id = metric_ids[i] if metric_ids else re.sub(r"\W+", "_", ticker).strip("_").upper()
+
+            if (source.upper(), ticker) in existing:
+                print(f"⚠ {source} {ticker} already in registry, skipping")
+                continue
+            if metric_id in registry and not overwrite:
+                print(f"⚠ {metric_id} already in registry, skipping")
+                continue
+
+            frequency = str(row.get("frequency") or "")
+            notes = " ".join(str(row.get("notes") or "").split())
+            registry[metric_id] = {
+                "display_name": row.get("series_name") or ticker,
+                "category": category,
+                "source": source,
+                "ticker": ticker,
+                "frequency": frequency,
+                "release_lag_days": DEFAULT_RELEASE_LAGS.get(frequency.lower().split(",")[0], 0),
+                "tags": tags,
+                "normalization": normalization,
+                "direction": direction,
+                "description": notes[:300],
+            }
+            existing.add((source.upper(), ticker))
+            added.append(metric_id)
+
+        if added:
+            tmp_path = Path(str(registry_path) + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(registry, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, registry_path)
+        return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the indicator catalog.")
+    parser.add_argument("query", nargs="*", help="Keywords (word* for prefix)")
+    parser.add_argument("--source")
+    parser.add_argument("--frequency")
+    parser.add_argument("--units")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rebuild", action="store_true", help="Re-index the master CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_rows = build_catalog_index(force=args.rebuild)
+    if n_rows >= 0:
+        print(f"✔ Indexed {n_rows:,} catalog rows in {time.perf_counter() - start:.1f} s → {CATALOG_DB}")
+
+    catalog = CatalogIndex()
+    start = time.perf_counter()
+    hits = catalog.search(" ".join(args.query), source=args.source, frequency=args.frequency,
+                          units=args.units, limit=args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    with pd.option_context("display.max_colwidth", 60, "display.width", 200):
+        print(hits.drop(columns=["notes"]).to_string(index=False))
+    print(f"\n{len(hits)} hits in {elapsed:.1f} ms")
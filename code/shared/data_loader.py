@@ -1,9 +1,21 @@
 import os
 import json
+import time
+import random
+import shutil
+import argparse
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from fredapi import Fred
-import yfinance as yf
+
+from io_utils import read_raw_csv
+from http_cache import HttpCache
+from vintage_store import VintageStore
 
 # ======================================================
 # Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
@@ -15,6 +27,84 @@ DATA_RAW = BASE_DIR / "data_raw"
 # Ensure folders exist
 DATA_RAW.mkdir(exist_ok=True, parents=True)
 
+# Provider endpoints (point them at a local stand-in server for tests)
+FRED_API_URL = os.getenv("FRED_API_URL", "https://api.stlouisfed.org/fred")
+YAHOO_CHART_URL = os.getenv("YAHOO_CHART_URL", "https://query1.finance.yahoo.com/v8/finance/chart")
+
+# Requests per second allowed per provider (FRED allows 120 / minute)
+RATE_LIMITS = {"FRED": 2.0, "YAHOO": 2.0}
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+
+# Stored observations re-requested on each refresh to detect revisions
+OVERLAP_ROWS = {"daily": 10, "weekly": 8, "monthly": 6, "quarterly": 4}
+
+# Shared on-disk response cache (None disables it)
+HTTP_CACHE = HttpCache()
+
+# Point-in-time log of every fetched observation (None disables it)
+VINTAGE_STORE = VintageStore()
+
+# ======================================================
+# HTTP: per-provider rate limits + retries with backoff
+# ======================================================
+class RateLimiter:
+    """Space requests at least 1/rate seconds apart (thread-safe)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+_LIMITERS = {provider: RateLimiter(rate) for provider, rate in RATE_LIMITS.items()}
+
+
+def _exchange(url: str, provider: str, headers: dict):
+    """One GET with the provider's rate limit; retry 429 / 5xx / network errors.
+
+    Returns (status, headers, body); a 304 reply is returned, not raised.
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (VCF data loader)", **headers})
+    for attempt in range(MAX_RETRIES + 1):
+        _LIMITERS[provider].acquire()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, e.headers, b""
+            if e.code != 429 and e.code < 500 or attempt == MAX_RETRIES:
+                raise
+            retry_after = e.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = None
+        if delay is None:
+            delay = BACKOFF_SECONDS * 2 ** attempt * (1 + random.random())
+        time.sleep(delay)
+
+
+def http_get(url: str, provider: str, cached: bool = True) -> bytes:
+    """GET through HTTP_CACHE (fresh hits skip the network and the rate limit).
+
+    cached=False always asks the provider, then stores the reply.
+    """
+    if HTTP_CACHE is None:
+        return _exchange(url, provider, {})[2]
+    return HTTP_CACHE.fetch(url, lambda headers: _exchange(url, provider, headers),
+                            provider, refresh=not cached)[1]
+
 # ======================================================
 # Load Registry
 # ======================================================
@@ -28,64 +118,318 @@ def load_registry():
 # FRED fetcher
 # ======================================================
 fred_api_key = os.getenv("FRED_API_KEY")
-fred = Fred(api_key=fred_api_key)
 
-def fetch_fred_series(ticker: str) -> pd.DataFrame:
-    s = fred.get_series(ticker)
-    df = s.to_frame("value")
-    df.index.name = "date"
+def _fred_observations(params: dict, cached: bool):
+    """All pages of /series/observations: (observations, bytes downloaded)."""
+    params = {"api_key": fred_api_key or "", "file_type": "json", **params}
+    observations, n_bytes = [], 0
+    while True:
+        params["offset"] = len(observations)
+        url = f"{FRED_API_URL}/series/observations?{urllib.parse.urlencode(params)}"
+        body = http_get(url, "FRED", cached)
+        n_bytes += len(body)
+
+        payload = json.loads(body)
+        page = payload.get("observations", [])
+        observations.extend(page)
+        if not page or len(observations) >= int(payload.get("count", 0)):
+            break
+    return observations, n_bytes
+
+
+def fetch_fred_series(ticker: str, start=None, cached: bool = True) -> pd.DataFrame:
+    """FRED observations via the REST API, optionally from `start` onward.
+
+    Pages through results; df.attrs["bytes"] holds the bytes downloaded
+    (or served from the HTTP cache). cached=False bypasses stored replies.
+    """
+    params = {"series_id": ticker}
+    if start is not None:
+        params["observation_start"] = pd.Timestamp(start).strftime("%Y-%m-%d")
+    observations, n_bytes = _fred_observations(params, cached)
+
+    df = pd.DataFrame(
+        # FRED marks missing observations with "."
+        {"value": pd.to_numeric([o["value"] for o in observations], errors="coerce")},
+        index=pd.DatetimeIndex([o["date"] for o in observations], name="date"),
+    )
+    df.attrs["bytes"] = n_bytes
+    return df
+
+
+def fetch_fred_vintages(ticker: str, cached: bool = True) -> pd.DataFrame:
+    """Every ALFRED vintage of a FRED series.
+
+    One row per (date, vintage) with the value and the realtime_start /
+    realtime_end strings bounding when it was current ('9999-12-31' =
+    still current).
+    """
+    params = {"series_id": ticker, "realtime_start": "1776-07-04", "realtime_end": "9999-12-31"}
+    observations, n_bytes = _fred_observations(params, cached)
+
+    df = pd.DataFrame(
+        {"value": pd.to_numeric([o["value"] for o in observations], errors="coerce"),
+         "realtime_start": [o["realtime_start"] for o in observations],
+         "realtime_end": [o["realtime_end"] for o in observations]},
+        index=pd.DatetimeIndex([o["date"] for o in observations], name="date"),
+    )
+    df.attrs["bytes"] = n_bytes
     return df
 
 # ======================================================
 # Yahoo fetcher
 # ======================================================
-def fetch_yahoo_series(ticker: str) -> pd.DataFrame:
-    df = yf.download(ticker, progress=False)
+def fetch_yahoo_series(ticker: str, start=None, cached: bool = True) -> pd.DataFrame:
+    """Daily history from Yahoo's chart endpoint (the API yfinance wraps).
 
-    if df.empty:
+    Uses adjusted closes when available; df.attrs["bytes"] holds the bytes
+    downloaded. cached=False bypasses stored replies.
+    """
+    period1 = 0 if start is None else int(pd.Timestamp(start).timestamp())
+    # period2 = end of the next UTC day, so repeated calls share a cache key
+    params = {"period1": period1, "period2": (int(time.time()) // 86400 + 2) * 86400,
+              "interval": "1d", "events": "div,splits", "includeAdjustedClose": "true"}
+    url = f"{YAHOO_CHART_URL}/{urllib.parse.quote(ticker)}?{urllib.parse.urlencode(params)}"
+    body = http_get(url, "YAHOO", cached)
+
+    chart = json.loads(body)["chart"]
+    if chart.get("error") or not chart.get("result"):
+        raise ValueError(f"Yahoo returned no data for {ticker}: {chart.get('error')}")
+    result = chart["result"][0]
+    timestamps = result.get("timestamp") or []
+    if not timestamps:
         raise ValueError(f"Yahoo returned no data for {ticker}")
 
     # Clean price column
-    if "Adj Close" in df.columns:
-        df = df[["Adj Close"]].rename(columns={"Adj Close": "value"})
+    indicators = result["indicators"]
+    if indicators.get("adjclose"):
+        prices = indicators["adjclose"][0]["adjclose"]
     else:
-        df = df[["Close"]].rename(columns={"Close": "value"})
+        prices = indicators["quote"][0]["close"]
+
+    # Bar timestamps are UTC seconds; shift to exchange time for the date
+    offset = result.get("meta", {}).get("gmtoffset", 0)
+    dates = pd.to_datetime(np.asarray(timestamps) + offset, unit="s").normalize()
 
-    df.index.name = "date"
+    # Yahoo sends null for missing bars
+    df = pd.DataFrame({"value": np.array(prices, dtype=float)},
+                      index=pd.DatetimeIndex(dates, name="date"))
     df = df[~df.index.duplicated(keep="last")]
+    df.attrs["bytes"] = len(body)
     return df
 
+
+FETCHERS = {"FRED": fetch_fred_series, "YAHOO": fetch_yahoo_series}
+
+# ======================================================
+# Incremental refresh
+# ======================================================
+def write_metric(df: pd.DataFrame, out_path: Path):
+    # 🚨 THE FIX — always write a clean date column
+    # Written to a temp file and renamed, so readers never see a partial CSV
+    tmp_path = Path(str(out_path) + ".tmp")
+    df[["value"]].reset_index().rename(columns={"index": "date"}).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+
+
+def append_metric(rows: pd.Series, out_path: Path):
+    """Atomically append rows to a date,value CSV (copy, append, rename)."""
+    tmp_path = Path(str(out_path) + ".tmp")
+    shutil.copyfile(out_path, tmp_path)
+    rows.to_frame("value").to_csv(tmp_path, mode="a", header=False)
+    os.replace(tmp_path, out_path)
+
+
+def record_vintages(metric_id: str, df: pd.DataFrame):
+    """Log fetched observations in VINTAGE_STORE as known from today."""
+    if VINTAGE_STORE is not None:
+        VINTAGE_STORE.record_snapshot(metric_id, df["value"])
+
+
+def read_stored(out_path: Path):
+    """Stored 'value' series, or None if there is nothing usable on disk."""
+    if not out_path.exists():
+        return None
+    stored = read_raw_csv(out_path)
+    if "value" not in stored.columns or stored.empty:
+        return None
+    return stored["value"]
+
+
+def refresh_metric(metric_id: str, meta: dict, raw_dir=None, full: bool = False) -> dict:
+    """Bring one metric's CSV up to date, downloading only new observations.
+
+    The last OVERLAP_ROWS stored observations are re-requested:
+      - unchanged overlap  → new rows are appended to the CSV
+      - revised overlap    → the window is replaced from the fetched data
+      - revised first row  → the revision may reach further back, so the
+                             full history is re-downloaded
+    Returns {"mode", "rows", "bytes"}.
+    """
+    src = meta["source"].upper()
+    fetch = FETCHERS[src]
+    out_path = Path(raw_dir or DATA_RAW) / f"{metric_id}.csv"
+
+    stored = None if full else read_stored(out_path)
+    if stored is None:
+        df = fetch(meta["ticker"], cached=not full)
+        record_vintages(metric_id, df)
+        write_metric(df, out_path)
+        return {"mode": "full", "rows": len(df), "bytes": df.attrs.get("bytes")}
+
+    overlap = OVERLAP_ROWS.get(meta.get("frequency", "").lower(), 10)
+    window_start = stored.index[-min(overlap, len(stored))]
+
+    delta = fetch(meta["ticker"], start=window_start)
+    record_vintages(metric_id, delta)
+    fetched = delta["value"]
+
+    window = stored[stored.index >= window_start]
+    revised = ~np.isclose(window.values, fetched.reindex(window.index).values,
+                          rtol=1e-9, atol=0.0, equal_nan=True)
+    new_rows = fetched[fetched.index > stored.index[-1]]
+
+    if revised.any():
+        if revised[0]:
+            # A cached full history would predate the revision
+            df = fetch(meta["ticker"], cached=False)
+            record_vintages(metric_id, df)
+            write_metric(df, out_path)
+            return {"mode": "full (revision)", "rows": len(df),
+                    "bytes": (delta.attrs.get("bytes") or 0) + (df.attrs.get("bytes") or 0)}
+
+        merged = pd.concat([stored[stored.index < window_start], fetched])
+        write_metric(merged.to_frame("value"), out_path)
+        return {"mode": "revised", "rows": len(new_rows), "bytes": delta.attrs.get("bytes")}
+
+    if new_rows.empty:
+        return {"mode": "current", "rows": 0, "bytes": delta.attrs.get("bytes")}
+
+    with open(out_path, "r") as f:
+        clean_layout = f.readline().strip() == "date,value"
+    if clean_layout:
+        append_metric(new_rows, out_path)
+    else:
+        # Legacy multi-column export: rewrite in the clean layout
+        write_metric(pd.concat([stored, new_rows]).to_frame("value"), out_path)
+    return {"mode": "append", "rows": len(new_rows), "bytes": delta.attrs.get("bytes")}
+
 # ======================================================
 # Main loader
 # ======================================================
-def load_all_metrics():
-    registry = load_registry()
+def load_all_metrics(full: bool = False, max_workers: int = 8, registry=None, raw_dir=None) -> dict:
+    """Refresh every registry metric; max_workers caps concurrent fetches.
 
-    print("\n🚀 Starting full VCF data load...\n")
+    Provider rate limits (RATE_LIMITS) apply across all workers. Each CSV is
+    written atomically as soon as its fetch completes. max_workers=1 runs
+    sequentially. Returns {metric_id: result dict or exception}.
+    """
+    registry = registry if registry is not None else load_registry()
+    raw_dir = Path(raw_dir or DATA_RAW)
 
+    print(f"\n🚀 Starting VCF data refresh ({max_workers} workers)...\n")
+
+    jobs = {}
     for metric_id, meta in registry.items():
         src = meta["source"].upper()
-        ticker = meta["ticker"]
+        if src not in FETCHERS:
+            print(f"⚠ Unsupported source '{src}' for {metric_id}, skipping…")
+            continue
+        jobs[metric_id] = meta
+
+    results = {}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(refresh_metric, metric_id, meta, raw_dir, full): metric_id
+                   for metric_id, meta in jobs.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            metric_id = futures[future]
+            meta = jobs[metric_id]
+            try:
+                result = results[metric_id] = future.result()
+            except Exception as e:
+                results[metric_id] = e
+                print(f"⚠ [{done}/{len(jobs)}] Failed to refresh {metric_id}: {e}")
+                continue
+
+            size = "" if result["bytes"] is None else f", {result['bytes'] / 1024:.1f} KB"
+            print(f"✔ [{done}/{len(jobs)}] {metric_id} ({meta['source'].upper()}): "
+                  f"{result['mode']}, {result['rows']} rows{size}")
 
-        print(f"📡 Fetching {metric_id}: {meta['display_name']} ({src})")
+    failed = sum(isinstance(r, Exception) for r in results.values())
+    print(f"\n🏁 Refreshed {len(results) - failed}/{len(jobs)} metrics "
+          f"in {time.perf_counter() - start:.1f} s → {raw_dir}")
+    if HTTP_CACHE is not None:
+        print(f"🗄 HTTP cache: {HTTP_CACHE.summary()}")
+    return results
 
-        if src == "FRED":
-            df = fetch_fred_series(ticker)
-        elif src == "YAHOO":
-            df = fetch_yahoo_series(ticker)
+# ======================================================
+# Vintage backfill
+# ======================================================
+def backfill_vintage(metric_id: str, meta: dict, store=None, raw_dir=None) -> dict:
+    """Seed the vintage log of one metric with its release history.
+
+    FRED series get every ALFRED vintage. Other sources (and FRED series
+    without vintages) are approximated from the stored CSV: each value is
+    taken as known from its date + release_lag_days. Returns
+    {"mode", "records"}.
+    """
+    store = store or VINTAGE_STORE
+    if meta["source"].upper() == "FRED":
+        try:
+            df = fetch_fred_vintages(meta["ticker"])
+        except urllib.error.HTTPError as e:
+            print(f"⚠ No ALFRED vintages for {metric_id} ({e.code}), using release lags")
         else:
-            print(f"⚠ Unsupported source '{src}', skipping…")
-            continue
+            n = store.append(metric_id, df.index.values, df["value"].values,
+                             df["realtime_start"].values, df["realtime_end"].values)
+            return {"mode": "alfred", "records": n}
 
-        out_path = DATA_RAW / f"{metric_id}.csv"
+    stored = read_stored(Path(raw_dir or DATA_RAW) / f"{metric_id}.csv")
+    if stored is None:
+        return {"mode": "missing", "records": 0}
+    lag = pd.Timedelta(days=int(meta.get("release_lag_days", 0)))
+    n = store.append(metric_id, stored.index.values, stored.values, (stored.index + lag).values)
+    return {"mode": "release lag", "records": n}
 
-        # 🚨 THE FIX — always write a clean date column
-        df.reset_index().rename(columns={"index": "date"}).to_csv(out_path, index=False)
 
-        print(f"✔ Saved → {out_path} ({len(df)} rows)\n")
+def backfill_vintages(registry=None, store=None, raw_dir=None, max_workers: int = 8) -> dict:
+    """backfill_vintage() for every registry metric, concurrently."""
+    registry = registry if registry is not None else load_registry()
+    store = store or VINTAGE_STORE
+
+    print(f"\n🚀 Backfilling vintages for {len(registry)} metrics → {store.root}\n")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(backfill_vintage, metric_id, meta, store, raw_dir): metric_id
+                   for metric_id, meta in registry.items()}
+        for future in as_completed(futures):
+            metric_id = futures[future]
+            try:
+                result = results[metric_id] = future.result()
+            except Exception as e:
+                results[metric_id] = e
+                print(f"⚠ Failed to backfill {metric_id}: {e}")
+                continue
+            print(f"✔ {metric_id}: {result['records']:,} vintages ({result['mode']})")
+    return results
 
 # ======================================================
 # Execute script
 # ======================================================
 if __name__ == "__main__":
-    load_all_metrics()
+    parser = argparse.ArgumentParser(description="Refresh data_raw from FRED / Yahoo.")
+    parser.add_argument("--full", action="store_true", help="Re-download complete histories")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent fetches (1 = sequential)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache")
+    parser.add_argument("--vintages", action="store_true",
+                        help="Backfill the point-in-time vintage store instead of refreshing")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        HTTP_CACHE = None
+
+    if args.vintages:
+        backfill_vintages(max_workers=args.workers)
+    else:
+        load_all_metrics(full=args.full, max_workers=args.workers)
@@ -0,0 +1,224 @@
+import os
+import time
+import sqlite3
+import threading
+import urllib.parse
+from pathlib import Path
+
+# ======================================================
+# Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
+# ======================================================
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+CACHE_PATH = BASE_DIR / "data_cache" / "http_cache.sqlite"
+
+# Seconds a stored response is served without asking the provider again.
+# After that it is revalidated (ETag / Last-Modified) before reuse.
+DEFAULT_TTLS = {
+    "FRED": 6 * 3600,
+    "YAHOO": 3600,
+    "WORLDBANK": 7 * 86400,
+    "BEA": 7 * 86400,
+    "BLS": 7 * 86400,
+    "OECD": 7 * 86400,
+    "IMF": 7 * 86400,
+    "DEFAULT": 3600,
+}
+MAX_BYTES = 512 * 1024 ** 2
+
+# Credentials are dropped from cache keys (and never written to disk)
+SECRET_PARAMS = {"api_key", "userid", "registrationkey"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    provider TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL,
+    accessed_at REAL,
+    size INTEGER,
+    body BLOB
+);
+CREATE INDEX IF NOT EXISTS responses_lru ON responses(accessed_at);
+"""
+
+
+# ======================================================
+# Cache keys
+# ======================================================
+def cache_key(url: str, params=None) -> str:
+    """Canonical URL for a request: query params merged, sorted, secrets removed."""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    query += [(k, str(v)) for k, v in (params or {}).items() if v is not None]
+    query = sorted((k, v) for k, v in query if k.lower() not in SECRET_PARAMS)
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query), fragment=""))
+
+
+class CacheEntry:
+    """A stored response as found by HttpCache.lookup()."""
+
+    def __init__(self, url, body, etag, last_modified, fresh):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+    @property
+    def validators(self) -> dict:
+        """Headers that turn the next request into a conditional one."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# ======================================================
+# Persistent response cache
+# ======================================================
+class HttpCache:
+    """On-disk HTTP response cache shared by the provider fetchers.
+
+    Responses are stored in one SQLite file keyed by cache_key(url, params).
+    A response younger than its provider's TTL is served without a request;
+    an older one is revalidated with If-None-Match / If-Modified-Since, and
+    a 304 reply refreshes it in place. When the stored bodies exceed
+    max_bytes the least recently used responses are evicted.
+
+    fetch() wraps a blocking `send(headers) -> (status, headers, body)`
+    callable; async callers use lookup() and update() around their own
+    request. stats() reports hits / revalidated / misses / evictions.
+    Safe to share between threads; the database opens on first use.
+    """
+
+    def __init__(self, path=None, max_bytes: int = MAX_BYTES, ttls: dict = None):
+        self.path = Path(path or CACHE_PATH)
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **{k.upper(): v for k, v in (ttls or {}).items()}}
+        self.counts = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self.lock = threading.Lock()
+        self.conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.path.parent.mkdir(exist_ok=True, parents=True)
+            self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def ttl(self, provider: str) -> float:
+        return self.ttls.get((provider or "default").upper(), self.ttls["DEFAULT"])
+
+    def lookup(self, url: str, provider: str = "default", params=None):
+        """The stored response for a request, or None. Fresh entries count as hits."""
+        key = cache_key(url, params)
+        now = time.time()
+        with self.lock:
+            row = self._db().execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            body, etag, last_modified, stored_at = row
+            fresh = now - stored_at < self.ttl(provider)
+            if fresh:
+                self.counts["hits"] += 1
+                with self.conn:
+                    self.conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, key))
+        return CacheEntry(key, body, etag, last_modified, fresh)
+
+    def update(self, url: str, status: int, headers, body: bytes, provider: str = "default",
+               params=None, entry: CacheEntry = None):
+        """Record the reply to a (possibly conditional) request.
+
+        Returns (status, body): a 304 for a stored entry comes back as
+        (200, stored body). Only 200 replies are stored.
+        """
+        key = cache_key(url, params)
+        now = time.time()
+        etag = headers.get("ETag") if headers is not None else None
+        last_modified = headers.get("Last-Modified") if headers is not None else None
+
+        if status == 304 and entry is not None:
+            with self.lock:
+                self.counts["revalidated"] += 1
+                with self._db():
+                    self.conn.execute(
+                        "UPDATE responses SET stored_at = ?, accessed_at = ?, "
+                        "etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) "
+                        "WHERE url = ?", (now, now, etag, last_modified, key))
+            return 200, entry.body
+
+        if status != 200:
+            return status, body
+
+        no_store = "no-store" in ((headers.get("Cache-Control") or "") if headers is not None else "")
+        with self.lock:
+            self.counts["misses"] += 1
+            if no_store or len(body) > self.max_bytes:
+                return status, body
+            with self._db():
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, (provider or "default").upper(), etag, last_modified,
+                     now, now, len(body), sqlite3.Binary(body)))
+                self._evict()
+        return status, body
+
+    def _evict(self) -> None:
+        """Drop least recently used responses until the bodies fit max_bytes."""
+        excess = self.conn.execute("SELECT TOTAL(size) FROM responses").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for url, size in self.conn.execute("SELECT url, size FROM responses ORDER BY accessed_at"):
+            victims.append((url,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self.counts["evictions"] += len(victims)
+
+    def fetch(self, url: str, send, provider: str = "default", params=None, refresh: bool = False):
+        """Serve a request from the cache, revalidating or calling send() as needed.
+
+        send(headers) performs the request with the given extra headers and
+        returns (status, response headers, body); it should raise for
+        errors other than 304. refresh=True ignores the stored copy (the
+        reply is still stored). Returns (status, body).
+        """
+        entry = None if refresh else self.lookup(url, provider, params)
+        if entry is not None and entry.fresh:
+            return 200, entry.body
+        status, headers, body = send(entry.validators if entry is not None else {})
+        return self.update(url, status, headers, body, provider, params, entry)
+
+    def stats(self) -> dict:
+        """Counters since this object was created, plus the stored size."""
+        with self.lock:
+            entries, size = self._db().execute(
+                "SELECT COUNT(*), TOTAL(size) FROM responses").fetchone()
+            return {**self.counts, "entries": entries, "bytes": int(size)}
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"{s['hits']} hits, {s['revalidated']} revalidated, {s['misses']} misses, "
+                f"{s['evictions']} evicted ({s['entries']} entries, {s['bytes'] / 1024 ** 2:.1f} MB)")
+
+    def clear(self) -> None:
+        with self.lock, self._db():
+            self.conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+if __name__ == "__main__":
+    print(f"✔ HTTP cache {CACHE_PATH}: {HttpCache().summary()}")
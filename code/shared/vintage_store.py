@@ -0,0 +1,302 @@
+import os
+import time
+import argparse
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
+# ======================================================
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+DATA_VINTAGES = BASE_DIR / "data_vintages"
+
+# ======================================================
+# Vintage log format
+# ======================================================
+# One append-only .vcfvin file per metric, a sequence of columnar segments:
+#
+#   MAGIC (8 bytes) | row count n (uint64)
+#   date          int64[n]   observation date (days since epoch)
+#   value         float64[n]
+#   realtime_start int64[n]  first day the value was known
+#   realtime_end   int64[n]  first day it no longer was (OPEN_END = still current)
+#
+# Every fetch appends one segment; nothing is rewritten except by compact().
+# A torn trailing segment (crash mid-append) is ignored and overwritten by
+# the next append.
+
+MAGIC = b"VCFVIN1\x00"
+SUFFIX = ".vcfvin"
+OPEN_END = int(np.datetime64("9999-12-31", "D").astype(np.int64))
+
+# Index keys pack (observation group, realtime_start) into one int64
+_DAY_BITS = 22
+_DAY_BASE = int(np.datetime64("1700-01-01", "D").astype(np.int64))
+
+
+def to_days(dates) -> np.ndarray:
+    """Dates (strings, Timestamps, datetime64) → int64 days since epoch.
+
+    Goes through datetime64[D], so FRED's '9999-12-31' does not overflow.
+    """
+    return np.atleast_1d(np.asarray(dates, dtype="datetime64[D]")).astype(np.int64)
+
+
+def _day(when) -> int:
+    return int(to_days(when)[0])
+
+
+def _index(days: np.ndarray) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(days.astype("datetime64[D]").astype("datetime64[ns]"), name="date")
+
+
+# ======================================================
+# Read / append segments
+# ======================================================
+def read_log(path):
+    """All records of a vintage file in append order.
+
+    Returns (date, value, realtime_start, realtime_end, valid_bytes); the
+    last item is the length of the intact prefix of the file.
+    """
+    columns = [[], [], [], []]
+    offset = 0
+    if Path(path).exists():
+        raw = np.fromfile(path, dtype=np.uint8)
+        while offset + 16 <= len(raw):
+            if raw[offset:offset + 8].tobytes() != MAGIC:
+                break
+            n = int(raw[offset + 8:offset + 16].view(np.uint64)[0])
+            end = offset + 16 + 32 * n
+            if end > len(raw):
+                break  # torn segment
+            body = raw[offset + 16:end]
+            for i, dtype in enumerate((np.int64, np.float64, np.int64, np.int64)):
+                columns[i].append(body[8 * n * i:8 * n * (i + 1)].view(dtype))
+            offset = end
+
+    date, value, start, end = (np.concatenate(c) if c else np.empty(0, dtype)
+                               for c, dtype in zip(columns, (np.int64, np.float64, np.int64, np.int64)))
+    return date, value, start, end, offset
+
+
+def _write_segment(f, date, value, start, end) -> None:
+    f.write(MAGIC)
+    f.write(np.uint64(len(date)).tobytes())
+    for column, dtype in ((date, np.int64), (value, np.float64), (start, np.int64), (end, np.int64)):
+        f.write(np.ascontiguousarray(column, dtype=dtype).tobytes())
+
+
+# ======================================================
+# As-of index
+# ======================================================
+class VintageIndex:
+    """Sorted view of one metric's vintage log for as-of lookups.
+
+    Records are ordered by (observation date, realtime_start); a record
+    appended later replaces an earlier one with the same pair. as_of(D)
+    finds, for every observation dated on or before D, the last vintage
+    with realtime_start <= D using one vectorized searchsorted, and keeps
+    it if its realtime_end is after D.
+    """
+
+    def __init__(self, date, value, start, end):
+        order = np.lexsort((np.arange(len(date)), start, date))
+        date, value, start, end = date[order], value[order], start[order], end[order]
+
+        # Later appends win for the same (date, realtime_start)
+        last = np.r_[(date[1:] != date[:-1]) | (start[1:] != start[:-1]), True][:len(date)]
+        date, value, start, end = date[last], value[last], start[last], end[last]
+
+        new_group = np.r_[True, date[1:] != date[:-1]][:len(date)]
+        self.group = np.cumsum(new_group) - 1
+        self.dates = date[new_group]
+        self.key = (self.group << _DAY_BITS) | (start - _DAY_BASE)
+        self.value, self.start, self.end = value, start, end
+
+    def __len__(self):
+        return len(self.value)
+
+    def as_of(self, day: int):
+        """(observation days, values) known on `day` (int days since epoch)."""
+        n = np.searchsorted(self.dates, day, side="right")
+        groups = np.arange(n)
+        hit = np.searchsorted(self.key, (groups << _DAY_BITS) | (day - _DAY_BASE), side="right") - 1
+        pos = hit.clip(min=0)
+        # A hit in another group means no vintage of this observation had started yet
+        known = (hit >= 0) & (self.group[pos] == groups) & (self.end[pos] > day) if n else hit >= 0
+        return self.dates[:n][known], self.value[pos[known]]
+
+
+# ======================================================
+# Store
+# ======================================================
+class VintageStore:
+    """Point-in-time store: every observation with the period it was known.
+
+        >>> store = VintageStore()
+        >>> store.append("GDP_US", dates, values, realtime_start, realtime_end)
+        >>> store.record_snapshot("SPY_US", spy_series)          # known from today
+        >>> market_data = store.as_of("2008-10-15")               # {metric: Series}
+        >>> state = create_state_matrix(market_data, calendar="M")
+        >>> panel = store.panel_as_of("2008-10-15", calendar=month_ends)
+
+    Indexes are built on first use and cached until the metric's file grows,
+    so a walk-forward loop over hundreds of dates costs one searchsorted
+    per metric per date.
+    """
+
+    def __init__(self, root=None):
+        self.root = Path(root or DATA_VINTAGES)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def path(self, metric_id: str) -> Path:
+        return self.root / f"{metric_id}{SUFFIX}"
+
+    def metric_ids(self) -> list:
+        return sorted(p.stem for p in self.root.glob(f"*{SUFFIX}"))
+
+    # -------------------- writing --------------------
+    def append(self, metric_id: str, dates, values, realtime_start, realtime_end=None) -> int:
+        """Append vintages; records already in the log are skipped.
+
+        realtime_start / realtime_end: one date or one per record
+        (realtime_end None = still current). Returns the records written.
+        """
+        date = to_days(dates)
+        value = np.asarray(values, dtype=float)
+        start = np.broadcast_to(to_days(realtime_start), date.shape)
+        end = np.broadcast_to(OPEN_END if realtime_end is None else to_days(realtime_end), date.shape)
+
+        with self._lock:
+            path = self.path(metric_id)
+            old_date, old_value, old_start, old_end, valid = read_log(path)
+            if len(old_date):
+                seen = pd.MultiIndex.from_arrays([old_date, old_value.view(np.int64), old_start, old_end])
+                new = ~pd.MultiIndex.from_arrays([date, value.view(np.int64), start, end]).isin(seen)
+                date, value, start, end = date[new], value[new], start[new], end[new]
+            if not len(date):
+                return 0
+
+            self.root.mkdir(exist_ok=True, parents=True)
+            with open(path, "r+b" if path.exists() else "wb") as f:
+                f.truncate(valid)  # drop a torn trailing segment
+                f.seek(valid)
+                _write_segment(f, date, value, start, end)
+            self._indexes.pop(metric_id, None)
+        return len(date)
+
+    def record_snapshot(self, metric_id: str, series: pd.Series, as_of=None) -> int:
+        """Record a fetched series as known from `as_of` (default today).
+
+        Only observations that are new or differ from what the store
+        already knew on that day are appended.
+        """
+        as_of = pd.Timestamp.today().normalize() if as_of is None else pd.Timestamp(as_of)
+        series = series[series.index.notna()]
+        date = to_days(series.index)
+        value = series.to_numpy(dtype=float)
+
+        known_days, known_values = self.index(metric_id).as_of(_day(as_of))
+        pos = np.searchsorted(known_days, date).clip(max=max(len(known_days) - 1, 0))
+        same = np.zeros(len(date), bool)
+        if len(known_days):
+            same = (known_days[pos] == date) & ((known_values[pos] == value)
+                                                 | (np.isnan(known_values[pos]) & np.isnan(value)))
+        changed = ~same
+        return self.append(metric_id, date.astype("datetime64[D]")[changed], value[changed], as_of)
+
+    def compact(self, metric_id: str) -> int:
+        """Rewrite a log as one segment without duplicates (atomic). Returns rows."""
+        with self._lock:
+            path = self.path(metric_id)
+            idx = VintageIndex(*read_log(path)[:4])
+            tmp_path = Path(str(path) + ".tmp")
+            with open(tmp_path, "wb") as f:
+                _write_segment(f, idx.dates[idx.group], idx.value, idx.start, idx.end)
+            os.replace(tmp_path, path)
+            self._indexes.pop(metric_id, None)
+        return len(idx)
+
+    # -------------------- querying --------------------
+    def index(self, metric_id: str) -> VintageIndex:
+        """Cached as-of index of one metric (rebuilt when its file changes)."""
+        path = self.path(metric_id)
+        size = path.stat().st_size if path.exists() else 0
+        cached = self._indexes.get(metric_id)
+        if cached is None or cached[0] != size:
+            cached = self._indexes[metric_id] = (size, VintageIndex(*read_log(path)[:4]))
+        return cached[1]
+
+    def series_as_of(self, metric_id: str, when) -> pd.Series:
+        """One metric as it was known on `when` (observations dated <= when)."""
+        days, values = self.index(metric_id).as_of(_day(when))
+        return pd.Series(values, index=_index(days), name=metric_id)
+
+    def as_of(self, when, metric_ids=None) -> dict:
+        """{metric_id: Series} as known on `when`; metrics with no data yet are left out."""
+        metric_ids = self.metric_ids() if metric_ids is None else metric_ids
+        out = {}
+        for metric_id in metric_ids:
+            series = self.series_as_of(metric_id, when)
+            if len(series):
+                out[metric_id] = series
+        return out
+
+    def panel_as_of(self, when, metric_ids=None, calendar=None) -> pd.DataFrame:
+        """Date × metric panel as known on `when`.
+
+        Without a calendar the rows are the union of observation dates. With
+        one, each row takes the latest known observation on or before that
+        date; calendar dates after `when` are dropped. A pandas frequency
+        string spans the data up to `when`; in a walk-forward loop pass the
+        full calendar once instead, which is cheaper than regenerating it.
+        """
+        day = _day(when)
+        metric_ids = self.metric_ids() if metric_ids is None else list(metric_ids)
+        known = {m: self.index(m).as_of(day) for m in metric_ids}
+        known = {m: (d, v) for m, (d, v) in known.items() if len(d)}
+        if not known:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+
+        if calendar is None:
+            rows = np.unique(np.concatenate([d for d, _ in known.values()]))
+        else:
+            if isinstance(calendar, str):
+                first = min(d[0] for d, _ in known.values())
+                calendar = pd.date_range(pd.Timestamp(first, unit="D"), pd.Timestamp(day, unit="D"),
+                                         freq=calendar)
+            rows = to_days(calendar)
+            rows = rows[:np.searchsorted(rows, day, side="right")]
+
+        out = np.full((len(rows), len(known)), np.nan)
+        for j, (d, v) in enumerate(known.values()):
+            if calendar is None:
+                out[np.searchsorted(rows, d), j] = v
+            else:
+                pos = np.searchsorted(d, rows, side="right") - 1
+                out[pos >= 0, j] = v[pos[pos >= 0]]
+        return pd.DataFrame(out, index=_index(rows), columns=list(known))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the point-in-time vintage store.")
+    parser.add_argument("--as-of", default=None, help="Print the panel as known on this date")
+    parser.add_argument("--compact", action="store_true", help="Rewrite every log as one segment")
+    args = parser.parse_args()
+
+    store = VintageStore()
+    start = time.perf_counter()
+    for metric_id in store.metric_ids():
+        if args.compact:
+            store.compact(metric_id)
+        idx = store.index(metric_id)
+        print(f"✔ {metric_id}: {len(idx):,} vintages of {len(idx.dates):,} observations")
+    print(f"✔ Indexed {len(store.metric_ids())} metrics in {time.perf_counter() - start:.2f} s → {store.root}")
+
+    if args.as_of:
+        print(store.panel_as_of(args.as_of).tail(12))
@@ -30,13 +30,27 @@ This is **catalog/metadata** only, not the actual time series observations.
 """
 
 import os
+import sys
+import csv
 import json
 import time
-from typing import Dict, Any, List
+import random
+import asyncio
+import hashlib
+import itertools
+import threading
+import http.client
+import urllib.parse
+from queue import Full, Queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
 
 import requests
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "code", "shared"))
+from http_cache import HttpCache  # noqa: E402
+
 # =========================
 # CONFIG
 # =========================
@@ -50,6 +64,33 @@ OUTPUT_DIR = "vcf_data_registry_output"
 REQUEST_TIMEOUT = 20
 SLEEP_BETWEEN_REQUESTS = 0.2  # be nice to APIs
 
+# FRED category crawl (point FRED_API_URL at a local stand-in server for tests)
+FRED_API_URL = os.getenv("FRED_API_URL", "https://api.stlouisfed.org/fred")
+FRED_CONCURRENCY = 8       # keep-alive connections / concurrent category workers
+FRED_RATE_LIMIT = 2.0      # requests per second (FRED allows 120 / minute)
+FRED_PAGE_LIMIT = 1000     # series per /category/series page (FRED maximum)
+CHECKPOINT_SECONDS = 10.0  # how often crawl progress is saved
+PAGE_QUEUE_SIZE = 8        # pages buffered between provider fetchers and the writer
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+
+# Shared on-disk response cache (None disables it); see code/shared/http_cache.py
+HTTP_CACHE: Optional[HttpCache] = HttpCache()
+
+# Columns shared by every provider catalog and the master registry
+CATALOG_COLUMNS = [
+    "source",
+    "dataset",
+    "series_code",
+    "series_name",
+    "frequency",
+    "units",
+    "notes",
+    "api_endpoint",
+    "key_required",
+    "raw_metadata",
+]
+
 
 # =========================
 # Helper functions
@@ -59,11 +100,23 @@ def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def get_json(url: str, params: Dict[str, Any] | None = None) -> Dict[str, Any]:
-    """Generic GET JSON with error handling."""
-    resp = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
-    resp.raise_for_status()
-    return resp.json()
+def get_json(url: str, params: Dict[str, Any] | None = None,
+             provider: str = "default") -> Dict[str, Any]:
+    """Generic GET JSON with error handling, served from HTTP_CACHE when fresh."""
+    def send(headers):
+        resp = requests.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        if resp.status_code != 304:
+            resp.raise_for_status()
+        return resp.status_code, resp.headers, resp.content
+
+    if HTTP_CACHE is None:
+        return json.loads(send({})[2])
+    return json.loads(HTTP_CACHE.fetch(url, send, provider, params)[1])
+
+
+def pages_to_df(pages: Iterable[List[Dict[str, Any]]]) -> pd.DataFrame:
+    """Collect a provider's pages of rows into one DataFrame."""
+    return pd.DataFrame([row for page in pages for row in page])
 
 
 def save_df(df: pd.DataFrame, name: str) -> str:
@@ -78,111 +131,363 @@ def save_df(df: pd.DataFrame, name: str) -> str:
 # FRED catalog builder
 # =========================
 
-def fetch_fred_series_catalog() -> pd.DataFrame:
+class TokenBucket:
+    """Async token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ConnectionPool:
     """
-    Recursively crawls FRED categories starting from root category_id=0 and collects series metadata.
+    Keep-alive HTTP(S) connections to one API host, shared by async workers.
 
-    Uses:
-      - /fred/category/children
-      - /fred/category/series
+    Each request checks a connection out, runs the blocking exchange in a
+    worker thread and returns the connection for reuse, so the TCP/TLS
+    handshake happens once per connection instead of once per request.
+    429 / 5xx / network errors are retried with jittered backoff. With a
+    cache, fresh responses skip the network and stale ones are revalidated.
+    """
 
-    Docs: https://fred.stlouisfed.org/docs/api/fred/series.html
+    def __init__(self, base_url: str, size: int, limiter: TokenBucket,
+                 cache: Optional[HttpCache] = None, provider: str = "FRED"):
+        parts = urllib.parse.urlsplit(base_url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.prefix = parts.path.rstrip("/")
+        self.limiter = limiter
+        self.cache = cache
+        self.provider = provider
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.connections = [conn_cls(parts.netloc, timeout=REQUEST_TIMEOUT) for _ in range(size)]
+        for conn in self.connections:
+            self.idle.put_nowait(conn)
+
+    @staticmethod
+    def _exchange(conn, url: str, headers: Dict[str, str]):
+        conn.request("GET", url, headers={"Accept": "application/json", **headers})
+        resp = conn.getresponse()
+        return resp.status, resp.msg, resp.read()
+
+    async def get_json(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        url = f"{self.prefix}/{endpoint}?{urllib.parse.urlencode(params)}"
+        entry = None
+        if self.cache is not None:
+            entry = await asyncio.to_thread(self.cache.lookup, self.origin + url, self.provider)
+            if entry is not None and entry.fresh:
+                return json.loads(entry.body)
+        validators = entry.validators if entry is not None else {}
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.limiter.acquire()
+            conn = await self.idle.get()
+            headers = None
+            try:
+                status, headers, body = await asyncio.to_thread(self._exchange, conn, url, validators)
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()  # reconnects on next use
+                if attempt == MAX_RETRIES:
+                    raise
+                status, error = None, e
+            finally:
+                self.idle.put_nowait(conn)
+
+            if self.cache is not None and status in (200, 304):
+                status, body = await asyncio.to_thread(
+                    self.cache.update, self.origin + url, status, headers, body, self.provider, None, entry)
+            if status == 200:
+                return json.loads(body)
+            if status is not None:
+                error = RuntimeError(f"HTTP {status} for {endpoint} {params.get('category_id', '')}")
+                if status != 429 and status < 500 or attempt == MAX_RETRIES:
+                    raise error
+            retry_after = headers.get("Retry-After") if headers is not None else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else \
+                BACKOFF_SECONDS * 2 ** attempt * (1 + random.random())
+            await asyncio.sleep(delay)
+        raise error
+
+    def close(self) -> None:
+        for conn in self.connections:
+            conn.close()
+
+
+class FredCatalogCrawler:
+    """
+    Concurrent, resumable crawl of the FRED category tree.
+
+    Workers take categories from a shared queue and fetch each category's
+    children and first series page together, then the remaining pages
+    concurrently (the first page reports the total count). Rows are
+    appended to the output CSV as pages arrive and deduplicated on
+    series_code with a set of seen ids, so memory holds ids, not rows.
+
+    Progress is checkpointed next to the output (<output>.checkpoint.json):
+    the discovered / finished category ids and the CSV size at that point.
+    A run that finds a checkpoint truncates the CSV back to the recorded
+    size and re-crawls the unfinished categories; a finished crawl removes
+    the checkpoint. Setting `stop` ends the crawl once the categories in
+    flight are done; the rest stay in the checkpoint.
+
+    Responses go through `cache` (default HTTP_CACHE; None disables it).
     """
-    if not FRED_API_KEY or "YOUR_FRED_API_KEY" in FRED_API_KEY:
-        print("[WARN] FRED_API_KEY not set; skipping FRED catalog.")
-        return pd.DataFrame()
 
-    base = "https://api.stlouisfed.org/fred"
-    from collections import deque
+    def __init__(self, api_key: str, out_path: str, base_url: str = FRED_API_URL,
+                 concurrency: int = FRED_CONCURRENCY, rate: float = FRED_RATE_LIMIT,
+                 page_limit: int = FRED_PAGE_LIMIT,
+                 sink: Optional[Callable[[List[list]], None]] = None,
+                 stop: Optional[threading.Event] = None,
+                 cache: Optional[HttpCache] = HTTP_CACHE):
+        self.api_key = api_key
+        self.out_path = out_path
+        self.checkpoint_path = out_path + ".checkpoint.json"
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.rate = rate
+        self.page_limit = page_limit
+        self.sink = sink
+        self.stop = stop
+        self.cache = cache
+        self._checkpoint_lock = threading.Lock()
+
+        self.discovered = {0}  # root category
+        self.done = set()
+        self.seen_series = set()
+        self.failed = 0
+
+    # ---------- checkpoint ----------
+    def _restore(self) -> bool:
+        """Load a previous checkpoint; False when starting a fresh crawl."""
+        if not (os.path.exists(self.checkpoint_path) and os.path.exists(self.out_path)):
+            return False
+        with open(self.checkpoint_path, "r") as f:
+            state = json.load(f)
+        with open(self.out_path, "r+b") as f:
+            f.truncate(state["rows_bytes"])  # drop rows written after the checkpoint
+        self.discovered = set(state["discovered"])
+        self.done = set(state["done"])
+
+        # Rebuild the seen ids (and replay stored rows to the sink) page by page
+        with open(self.out_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            while True:
+                rows = list(itertools.islice(reader, self.page_limit))
+                if not rows:
+                    break
+                self.seen_series.update(row[2] for row in rows)
+                if self.sink is not None:
+                    self.sink(rows)
+        return True
+
+    async def _checkpoint(self, out) -> None:
+        """Snapshot progress on the event loop; fsync and write it in a thread."""
+        out.flush()
+        state = {"discovered": sorted(self.discovered), "done": sorted(self.done),
+                 "rows_bytes": out.tell()}
+        await asyncio.to_thread(self._save_checkpoint, out.fileno(), state)
+
+    def _save_checkpoint(self, fd: int, state: Dict[str, Any]) -> None:
+        with self._checkpoint_lock:
+            os.fsync(fd)  # rows up to rows_bytes reach disk before the state naming them
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    # ---------- crawl ----------
+    def _write_page(self, writer, page: Dict[str, Any]) -> None:
+        rows = []
+        for s in page.get("seriess", []):
+            code = s.get("id")
+            if code in self.seen_series:
+                continue
+            self.seen_series.add(code)
+            rows.append([
+                "FRED",
+                "FRED",
+                code,
+                s.get("title"),
+                s.get("frequency"),
+                s.get("units"),
+                s.get("notes"),
+                "https://api.stlouisfed.org/fred/series/observations",
+                True,
+                json.dumps(s),
+            ])
+        writer.writerows(rows)
+        if self.sink is not None and rows:
+            self.sink(rows)
+
+    async def _crawl_category(self, pool: ConnectionPool, cid: int, queue, writer) -> bool:
+        """Fetch one category; True when its children and every page were stored."""
+        params = {"category_id": cid, "api_key": self.api_key, "file_type": "json"}
+        paged = dict(params, limit=self.page_limit)
+
+        children, first = await asyncio.gather(
+            pool.get_json("category/children", params),
+            pool.get_json("category/series", dict(paged, offset=0)),
+            return_exceptions=True,
+        )
+        complete = True
 
-    visited_categories = set()
-    q = deque([0])  # root category
-    series_rows: List[Dict[str, Any]] = []
+        if isinstance(children, Exception):
+            # Not fatal; just log (retried on resume)
+            print(f"[FRED] Error fetching children for category {cid}: {children}")
+            complete = False
+        else:
+            for c in children.get("categories", []):
+                if c["id"] not in self.discovered:
+                    self.discovered.add(c["id"])
+                    queue.put_nowait(c["id"])
+
+        if isinstance(first, Exception):
+            print(f"[FRED] Error fetching series for category {cid}, offset 0: {first}")
+            return False
+        self._write_page(writer, first)
+
+        n_first = len(first.get("seriess", []))
+        if "count" in first:
+            offsets = range(self.page_limit, int(first["count"]), self.page_limit)
+            pages = [pool.get_json("category/series", dict(paged, offset=o)) for o in offsets]
+            for offset, page in zip(offsets, await asyncio.gather(*pages, return_exceptions=True)):
+                if isinstance(page, Exception):
+                    print(f"[FRED] Error fetching series for category {cid}, offset {offset}: {page}")
+                    complete = False
+                else:
+                    self._write_page(writer, page)
+        else:
+            # No total count reported: page sequentially until a short page
+            offset = 0
+            while n_first == self.page_limit:
+                offset += self.page_limit
+                try:
+                    page = await pool.get_json("category/series", dict(paged, offset=offset))
+                except Exception as e:
+                    print(f"[FRED] Error fetching series for category {cid}, offset {offset}: {e}")
+                    return False
+                self._write_page(writer, page)
+                n_first = len(page.get("seriess", []))
+        return complete
+
+    async def run(self) -> str:
+        ensure_dir(os.path.dirname(self.out_path) or ".")
+        resumed = self._restore()
+        pending = sorted(self.discovered - self.done)
+        print(f"[FRED] {'Resuming' if resumed else 'Starting'} category crawl: "
+              f"{len(pending):,} categories queued, {len(self.seen_series):,} series stored")
+
+        pool = ConnectionPool(self.base_url, self.concurrency, TokenBucket(self.rate), cache=self.cache)
+        queue: asyncio.Queue = asyncio.Queue()
+        for cid in pending:
+            queue.put_nowait(cid)
+
+        with open(self.out_path, "a" if resumed else "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out, lineterminator="\n")
+            if not resumed:
+                writer.writerow(CATALOG_COLUMNS)
+            last_checkpoint = time.monotonic()
+
+            async def worker():
+                nonlocal last_checkpoint
+                while True:
+                    cid = await queue.get()
+                    try:
+                        if self.stop is not None and self.stop.is_set():
+                            continue  # left for the next run
+                        try:
+                            complete = await self._crawl_category(pool, cid, queue, writer)
+                        except Exception as e:
+                            print(f"[FRED] Error crawling category {cid}: {e}")
+                            complete = False
+                        if complete:
+                            self.done.add(cid)
+                        else:
+                            self.failed += 1
+                        if time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+                            last_checkpoint = time.monotonic()
+                            await self._checkpoint(out)
+                            print(f"[FRED] {len(self.done):,}/{len(self.discovered):,} categories, "
+                                  f"{len(self.seen_series):,} series")
+                    finally:
+                        queue.task_done()  # after the checkpoint, so join() waits for it
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await queue.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                pool.close()
+                await self._checkpoint(out)
+
+        if self.done >= self.discovered:
+            os.remove(self.checkpoint_path)
+        else:
+            print(f"[FRED] {len(self.discovered - self.done):,} categories incomplete; "
+                  f"run again to resume")
+        print(f"[FRED] Crawled {len(self.done):,} categories, {len(self.seen_series):,} series")
+        return self.out_path
 
-    while q:
-        cid = q.popleft()
-        if cid in visited_categories:
-            continue
-        visited_categories.add(cid)
 
-        # Fetch child categories
-        try:
-            children_data = get_json(
-                f"{base}/category/children",
-                params={
-                    "category_id": cid,
-                    "api_key": FRED_API_KEY,
-                    "file_type": "json",
-                },
-            )
-            children = children_data.get("categories", [])
-            for c in children:
-                q.append(c["id"])
-        except Exception as e:
-            # Not fatal; just log
-            print(f"[FRED] Error fetching children for category {cid}: {e}")
+def fetch_fred_series_catalog(resume: bool = True,
+                              sink: Optional[Callable[[List[list]], None]] = None,
+                              stop: Optional[threading.Event] = None) -> Optional[str]:
+    """
+    Recursively crawls FRED categories starting from root category_id=0 and collects series metadata.
 
-        # Fetch series for this category (paged)
-        offset = 0
-        limit = 1000
-        while True:
-            try:
-                series_data = get_json(
-                    f"{base}/category/series",
-                    params={
-                        "category_id": cid,
-                        "api_key": FRED_API_KEY,
-                        "file_type": "json",
-                        "limit": limit,
-                        "offset": offset,
-                    },
-                )
-                sers = series_data.get("seriess", [])
-                if not sers:
-                    break
+    Uses:
+      - /fred/category/children
+      - /fred/category/series
 
-                for s in sers:
-                    series_rows.append(
-                        {
-                            "source": "FRED",
-                            "dataset": "FRED",
-                            "series_code": s.get("id"),
-                            "series_name": s.get("title"),
-                            "frequency": s.get("frequency"),
-                            "units": s.get("units"),
-                            "notes": s.get("notes"),
-                            "api_endpoint": "https://api.stlouisfed.org/fred/series/observations",
-                            "key_required": True,
-                            "raw_metadata": json.dumps(s),
-                        }
-                    )
-
-                if len(sers) < limit:
-                    break
-                offset += limit
-                time.sleep(SLEEP_BETWEEN_REQUESTS)
-            except Exception as e:
-                print(f"[FRED] Error fetching series for category {cid}, offset {offset}: {e}")
-                break
+    Rows stream to OUTPUT_DIR/fred_catalog.csv (one row per series_code).
+    An interrupted crawl resumes from its checkpoint unless resume=False.
+    sink, if given, also receives every stored page of rows (lists in
+    CATALOG_COLUMNS order), including rows restored from a checkpoint.
+    Setting stop ends the crawl early (resumable). Returns the CSV path,
+    or None when no API key is set.
 
-        time.sleep(SLEEP_BETWEEN_REQUESTS)
+    Docs: https://fred.stlouisfed.org/docs/api/fred/series.html
+    """
+    if not FRED_API_KEY or "YOUR_FRED_API_KEY" in FRED_API_KEY:
+        print("[WARN] FRED_API_KEY not set; skipping FRED catalog.")
+        return None
 
-    df = pd.DataFrame(series_rows).drop_duplicates(subset=["series_code"])
-    return df
+    crawler = FredCatalogCrawler(FRED_API_KEY, os.path.join(OUTPUT_DIR, "fred_catalog.csv"),
+                                 base_url=FRED_API_URL, sink=sink, stop=stop, cache=HTTP_CACHE)
+    if not resume and os.path.exists(crawler.checkpoint_path):
+        os.remove(crawler.checkpoint_path)
+    return asyncio.run(crawler.run())
 
 
 # =========================
 # World Bank indicator catalog
 # =========================
 
-def fetch_worldbank_indicator_catalog() -> pd.DataFrame:
+def iter_worldbank_pages() -> Iterator[List[Dict[str, Any]]]:
     """
     Pulls the full list of World Bank Indicators.
+    One list of rows is yielded per API page.
 
     Endpoint: http://api.worldbank.org/v2/indicator?format=json&per_page=20000&page=1...
     Docs: World Bank Indicators API  [oai_citation:0‡World Bank Data Help Desk](https://datahelpdesk.worldbank.org/knowledgebase/articles/889392-about-the-indicators-api-documentation?utm_source=chatgpt.com)
     """
-    rows: List[Dict[str, Any]] = []
     base_url = "http://api.worldbank.org/v2/indicator"
     per_page = 20000
     page = 1
@@ -192,11 +497,13 @@ def fetch_worldbank_indicator_catalog() -> pd.DataFrame:
         js = get_json(
             base_url,
             params={"format": "json", "per_page": per_page, "page": page},
+            provider="WorldBank",
         )
         if not isinstance(js, list) or len(js) < 2:
             break
 
         meta, indicators = js
+        rows: List[Dict[str, Any]] = []
         for ind in indicators:
             rows.append(
                 {
@@ -212,6 +519,7 @@ def fetch_worldbank_indicator_catalog() -> pd.DataFrame:
                     "raw_metadata": json.dumps(ind),
                 }
             )
+        yield rows
 
         pages = meta.get("pages", 1)
         if page >= pages:
@@ -219,17 +527,15 @@ def fetch_worldbank_indicator_catalog() -> pd.DataFrame:
         page += 1
         time.sleep(SLEEP_BETWEEN_REQUESTS)
 
-    df = pd.DataFrame(rows)
-    return df
-
 
 # =========================
 # BEA dataset / parameter catalog
 # =========================
 
-def fetch_bea_catalog() -> pd.DataFrame:
+def iter_bea_pages() -> Iterator[List[Dict[str, Any]]]:
     """
     Fetches BEA datasets and their parameters (metadata level, not full series list).
+    One list of rows is yielded per dataset.
 
     Uses:
       - method=GetDataSetList
@@ -239,7 +545,7 @@ def fetch_bea_catalog() -> pd.DataFrame:
     """
     if not BEA_API_KEY or "YOUR_BEA_API_KEY" in BEA_API_KEY:
         print("[WARN] BEA_API_KEY not set; skipping BEA catalog.")
-        return pd.DataFrame()
+        return
 
     base = "https://apps.bea.gov/api/data"
 
@@ -251,11 +557,10 @@ def fetch_bea_catalog() -> pd.DataFrame:
             "method": "GetDataSetList",
             "ResultFormat": "JSON",
         },
+        provider="BEA",
     )
     datasets = ds_json.get("BEAAPI", {}).get("Results", {}).get("Dataset", [])
 
-    rows: List[Dict[str, Any]] = []
-
     for ds in datasets:
         dataset_name = ds.get("DatasetName")
         print(f"[BEA] Fetching parameters for dataset {dataset_name} ...")
@@ -268,12 +573,14 @@ def fetch_bea_catalog() -> pd.DataFrame:
                     "DataSetName": dataset_name,
                     "ResultFormat": "JSON",
                 },
+                provider="BEA",
             )
             params_list = (
                 params_json.get("BEAAPI", {})
                 .get("Results", {})
                 .get("Parameter", [])
             )
+            rows: List[Dict[str, Any]] = []
             for p in params_list:
                 rows.append(
                     {
@@ -289,27 +596,26 @@ def fetch_bea_catalog() -> pd.DataFrame:
                         "raw_metadata": json.dumps(p),
                     }
                 )
+            yield rows
         except Exception as e:
             print(f"[BEA] Error fetching parameters for {dataset_name}: {e}")
 
         time.sleep(SLEEP_BETWEEN_REQUESTS)
 
-    df = pd.DataFrame(rows)
-    return df
-
 
 # =========================
 # BLS survey catalog (not full series catalog)
 # =========================
 
-def fetch_bls_survey_catalog() -> pd.DataFrame:
+def iter_bls_pages() -> Iterator[List[Dict[str, Any]]]:
     """
     Pulls the list of all BLS surveys via the /surveys endpoint.
+    The survey list arrives as one page.
 
     Full series catalog is not directly exposed; this at least maps survey codes to names.  [oai_citation:2‡Bureau of Labor Statistics](https://www.bls.gov/developers/api_signature_v2.htm?utm_source=chatgpt.com)
     """
     url = "https://api.bls.gov/publicAPI/v2/surveys"
-    js = get_json(url)
+    js = get_json(url, provider="BLS")
     surveys = js.get("Results", {}).get("survey", [])
 
     rows: List[Dict[str, Any]] = []
@@ -329,22 +635,22 @@ def fetch_bls_survey_catalog() -> pd.DataFrame:
             }
         )
 
-    df = pd.DataFrame(rows)
-    return df
+    yield rows
 
 
 # =========================
 # OECD dataflows catalog (SDMX)
 # =========================
 
-def fetch_oecd_dataflows_catalog() -> pd.DataFrame:
+def iter_oecd_pages() -> Iterator[List[Dict[str, Any]]]:
     """
     Fetches the list of OECD SDMX dataflows.
+    The dataflow list arrives as one page.
 
     Endpoint (SDMX dataflow list): https://sdmx.oecd.org/public/rest/dataflow  [oai_citation:3‡OECD SDMX](https://sdmx.oecd.org/public/rest/dataflow?utm_source=chatgpt.com)
     """
     url = "https://sdmx.oecd.org/public/rest/dataflow"
-    js = get_json(url)
+    js = get_json(url, provider="OECD")
     # SDMX structure: "dataflows" -> "dataflow"
     flows = js.get("dataflows", {}).get("dataflow", [])
 
@@ -373,22 +679,22 @@ def fetch_oecd_dataflows_catalog() -> pd.DataFrame:
             }
         )
 
-    df = pd.DataFrame(rows)
-    return df
+    yield rows
 
 
 # =========================
 # IMF dataflows catalog (SDMX)
 # =========================
 
-def fetch_imf_dataflows_catalog() -> pd.DataFrame:
+def iter_imf_pages() -> Iterator[List[Dict[str, Any]]]:
     """
     Fetches IMF dataflows (dataset list) via SDMX JSON.
+    The dataflow list arrives as one page.
 
     Endpoint: http://dataservices.imf.org/REST/SDMX_JSON.svc/Dataflow  [oai_citation:4‡artt.dev](https://artt.dev/en/blog/2023/imf-api/?utm_source=chatgpt.com)
     """
     url = "http://dataservices.imf.org/REST/SDMX_JSON.svc/Dataflow"
-    js = get_json(url)
+    js = get_json(url, provider="IMF")
     flows = js.get("Structure", {}).get("Dataflows", {}).get("Dataflow", [])
 
     rows: List[Dict[str, Any]] = []
@@ -416,8 +722,31 @@ def fetch_imf_dataflows_catalog() -> pd.DataFrame:
             }
         )
 
-    df = pd.DataFrame(rows)
-    return df
+    yield rows
+
+
+# =========================
+# DataFrame wrappers
+# =========================
+
+def fetch_worldbank_indicator_catalog() -> pd.DataFrame:
+    return pages_to_df(iter_worldbank_pages())
+
+
+def fetch_bea_catalog() -> pd.DataFrame:
+    return pages_to_df(iter_bea_pages())
+
+
+def fetch_bls_survey_catalog() -> pd.DataFrame:
+    return pages_to_df(iter_bls_pages())
+
+
+def fetch_oecd_dataflows_catalog() -> pd.DataFrame:
+    return pages_to_df(iter_oecd_pages())
+
+
+def fetch_imf_dataflows_catalog() -> pd.DataFrame:
+    return pages_to_df(iter_imf_pages())
 
 
 # =========================
@@ -427,18 +756,7 @@ def fetch_imf_dataflows_catalog() -> pd.DataFrame:
 def build_master_registry(dfs: List[pd.DataFrame]) -> pd.DataFrame:
     """Concatenate, align columns, and return a unified master registry DataFrame."""
     # Ensure consistent columns
-    base_cols = [
-        "source",
-        "dataset",
-        "series_code",
-        "series_name",
-        "frequency",
-        "units",
-        "notes",
-        "api_endpoint",
-        "key_required",
-        "raw_metadata",
-    ]
+    base_cols = CATALOG_COLUMNS
     aligned = []
     for df in dfs:
         if df is None or df.empty:
@@ -457,49 +775,234 @@ def build_master_registry(dfs: List[pd.DataFrame]) -> pd.DataFrame:
 
 
 # =========================
-# Main
+# Streaming master registry
 # =========================
 
-def main():
-    print("=== VCF Data Registry Pack ===")
-    print(f"Output directory: {OUTPUT_DIR}")
-    ensure_dir(OUTPUT_DIR)
+# Provider name -> (page generator, per-provider catalog CSV)
+PROVIDER_PAGES = {
+    "WorldBank": (iter_worldbank_pages, "worldbank_catalog.csv"),
+    "BEA": (iter_bea_pages, "bea_catalog.csv"),
+    "BLS": (iter_bls_pages, "bls_catalog.csv"),
+    "OECD": (iter_oecd_pages, "oecd_dataflows_catalog.csv"),
+    "IMF": (iter_imf_pages, "imf_dataflows_catalog.csv"),
+}
 
-    # Fetch catalogs
-    fred_df = fetch_fred_series_catalog()
-    if not fred_df.empty:
-        save_df(fred_df, "fred_catalog.csv")
 
-    wb_df = fetch_worldbank_indicator_catalog()
-    if not wb_df.empty:
-        save_df(wb_df, "worldbank_catalog.csv")
+class RegistryWriter:
+    """
+    Writes the master registry incrementally as pages of rows arrive.
+
+    Rows are deduplicated on (source, dataset, series_code) against a set
+    of 16-byte key hashes, so memory grows by one digest per row rather
+    than holding the rows. Pages tagged with a file name are also written
+    to that provider's catalog, as <name>.tmp (created on its first page,
+    so empty catalogs are skipped as before). finish() renames it into
+    place once the provider is done; fail() deletes it, so the previous
+    catalog survives, and close() copies the failed provider's previous
+    rows into the new master. The master is written to a temp file and
+    renamed on close(); abort() discards it and keeps the old master.
+    """
 
-    bea_df = fetch_bea_catalog()
-    if not bea_df.empty:
-        save_df(bea_df, "bea_catalog.csv")
+    def __init__(self, out_dir: Optional[str] = None,
+                 master_name: str = "vcf_data_registry_master.csv"):
+        self.out_dir = out_dir or OUTPUT_DIR
+        ensure_dir(self.out_dir)
+        self.master_path = os.path.join(self.out_dir, master_name)
+        self._master_file = open(self.master_path + ".tmp", "w", newline="", encoding="utf-8")
+        self._master = csv.writer(self._master_file, lineterminator="\n")
+        self._master.writerow(CATALOG_COLUMNS)
+        self._catalogs = {}  # file name -> (file, writer, rows)
+        self.failed: List[Tuple[str, Optional[str]]] = []  # (provider, catalog file name)
+        self.keys = set()
+        self.sources: Dict[str, int] = {}
+
+    @staticmethod
+    def record(row) -> list:
+        """A row dict as a list in CATALOG_COLUMNS order (lists pass through)."""
+        if isinstance(row, dict):
+            return [row.get(col, "") for col in CATALOG_COLUMNS]
+        return row
+
+    def write(self, rows: List[list], file_name: Optional[str] = None) -> None:
+        if file_name is not None:
+            if file_name not in self._catalogs:
+                f = open(os.path.join(self.out_dir, file_name + ".tmp"), "w", newline="", encoding="utf-8")
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(CATALOG_COLUMNS)
+                self._catalogs[file_name] = [f, writer, 0]
+            catalog = self._catalogs[file_name]
+            catalog[1].writerows(rows)
+            catalog[2] += len(rows)
+        self._add(rows)
+
+    def _add(self, rows: Iterable[list]) -> int:
+        """Write unseen rows to the master; returns how many were new."""
+        added = 0
+        for row in rows:
+            key = hashlib.blake2b("\x1f".join(map(str, row[:3])).encode(), digest_size=16).digest()
+            if key in self.keys:
+                continue
+            self.keys.add(key)
+            self._master.writerow(row)
+            self.sources[row[0]] = self.sources.get(row[0], 0) + 1
+            added += 1
+        return added
+
+    def finish(self, file_name: Optional[str]) -> None:
+        """A provider finished cleanly: move its catalog into place."""
+        catalog = self._catalogs.pop(file_name, None)
+        if catalog is None:
+            return
+        f, _, n_rows = catalog
+        f.close()
+        path = os.path.join(self.out_dir, file_name)
+        os.replace(path + ".tmp", path)
+        print(f"[OK] Saved {file_name} with {n_rows:,} rows")
+
+    def fail(self, name: str, file_name: Optional[str]) -> None:
+        """A provider failed: drop its partial catalog and keep its previous rows."""
+        catalog = self._catalogs.pop(file_name, None)
+        if catalog is not None:
+            catalog[0].close()
+            os.remove(os.path.join(self.out_dir, file_name + ".tmp"))
+        self.failed.append((name, file_name))
+
+    def _keep_previous(self, name: str, file_name: Optional[str]) -> None:
+        """
+        Copy a failed provider's rows from its previous catalog or, without
+        one, the previous master's rows whose source is the provider name.
+        """
+        catalog_path = os.path.join(self.out_dir, file_name) if file_name else None
+        if catalog_path and os.path.exists(catalog_path):
+            path, keep = catalog_path, None
+        elif os.path.exists(self.master_path):
+            path, keep = self.master_path, name
+        else:
+            print(f"[WARN] {name} failed and has no previous rows to keep")
+            return
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            added = self._add(row for row in reader
+                              if row and (keep is None or row[0] == keep))
+        print(f"[WARN] {name} failed; kept {added:,} previous rows from {os.path.basename(path)}")
+
+    def abort(self) -> None:
+        for file_name, (f, _, _) in self._catalogs.items():
+            f.close()
+            os.remove(os.path.join(self.out_dir, file_name + ".tmp"))
+        self._master_file.close()
+        os.remove(self.master_path + ".tmp")
+
+    def close(self) -> str:
+        for name, file_name in self.failed:
+            self._keep_previous(name, file_name)
+        self._master_file.close()
+        os.replace(self.master_path + ".tmp", self.master_path)
+
+        by_source = ", ".join(f"{k} {v:,}" for k, v in self.sources.items())
+        print(f"[OK] Saved {os.path.basename(self.master_path)} with {len(self.keys):,} rows"
+              + (f" ({by_source})" if by_source else ""))
+        return self.master_path
+
+
+def build_registry(providers: Optional[Dict[str, Any]] = None, fred: bool = True) -> str:
+    """
+    Run the provider fetchers concurrently, streaming into the master registry.
+
+    Each provider runs in its own thread and hands pages of rows to a
+    bounded queue; this thread drains it into a RegistryWriter. Total time
+    is that of the slowest provider, and only a few pages are held in
+    memory at once. A provider that fails is logged and the others carry
+    on; its previous catalog is left in place and its previous rows are
+    kept in the master. If writing fails, the providers are stopped and
+    the error is raised. Returns the master registry path.
+    """
+    providers = PROVIDER_PAGES if providers is None else providers
+    pages: Queue = Queue(maxsize=PAGE_QUEUE_SIZE)
+    stop = threading.Event()
+    writer = RegistryWriter()
+
+    def put(item) -> bool:
+        """Queue an item for the writer; False once the writer has stopped."""
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    # Pages are (rows, file name); a provider ends with (None, name, file name, ok)
+    def produce(name, iter_pages, file_name):
+        ok = False
+        try:
+            for page in iter_pages():
+                if page and not put(([RegistryWriter.record(row) for row in page], file_name)):
+                    break
+            ok = True
+        except Exception as e:
+            print(f"[{name}] Error fetching catalog: {e}")
+        finally:
+            put((None, name, file_name, ok))  # this provider is finished
 
-    bls_df = fetch_bls_survey_catalog()
-    if not bls_df.empty:
-        save_df(bls_df, "bls_catalog.csv")
+    def produce_fred():
+        ok = False
+        try:
+            # fred_catalog.csv is written by the crawler itself
+            fetch_fred_series_catalog(sink=lambda rows: put((rows, None)), stop=stop)
+            ok = True
+        except Exception as e:
+            print(f"[FRED] Error fetching catalog: {e}")
+        finally:
+            put((None, "FRED", None, ok))
+
+    n_jobs = len(providers) + bool(fred)
+    with ThreadPoolExecutor(max_workers=max(n_jobs, 1)) as pool:
+        if fred:
+            pool.submit(produce_fred)
+        for name, (iter_pages, file_name) in providers.items():
+            pool.submit(produce, name, iter_pages, file_name)
+
+        remaining = n_jobs
+        try:
+            while remaining:
+                item = pages.get()
+                if item[0] is not None:
+                    writer.write(*item)
+                    continue
+                _, name, file_name, ok = item
+                if ok:
+                    writer.finish(file_name)
+                else:
+                    writer.fail(name, file_name)
+                remaining -= 1
+        except BaseException:
+            stop.set()  # unblock the providers so the pool can shut down
+            writer.abort()
+            raise
+    return writer.close()
 
-    oecd_df = fetch_oecd_dataflows_catalog()
-    if not oecd_df.empty:
-        save_df(oecd_df, "oecd_dataflows_catalog.csv")
 
-    imf_df = fetch_imf_dataflows_catalog()
-    if not imf_df.empty:
-        save_df(imf_df, "imf_dataflows_catalog.csv")
+# =========================
+# Main
+# =========================
 
-    # Build master registry
-    master = build_master_registry(
-        [fred_df, wb_df, bea_df, bls_df, oecd_df, imf_df]
-    )
-    save_df(master, "vcf_data_registry_master.csv")
+def main():
+    print("=== VCF Data Registry Pack ===")
+    print(f"Output directory: {OUTPUT_DIR}")
+    ensure_dir(OUTPUT_DIR)
+
+    # Fetch all catalogs concurrently and stream the master registry
+    start = time.perf_counter()
+    build_registry()
 
-    print("\n=== Done ===")
+    print(f"\n=== Done in {time.perf_counter() - start:.1f} s ===")
+    if HTTP_CACHE is not None:
+        print(f"HTTP cache: {HTTP_CACHE.summary()}")
     print("You can now open vcf_data_registry_output/vcf_data_registry_master.csv")
     print("in Excel / Google Sheets and start tagging pillars, etc.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
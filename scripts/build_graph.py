@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from functools import partial
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+import normalize_metrics
+import build_macro_panel
+import geometry_engine
+
+# ======================================================
+# Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
+# ======================================================
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+ROOT_DIR = Path(__file__).resolve().parent.parent   # vcf_main.py and the math modules
+STATE_NAME = Path(".vcf_build") / "state.json"
+
+VCF_MAIN_SOURCES = ["vcf_main.py", "vcf_normalization.py", "vcf_coherence.py", "vcf_geometry.py"]
+
+
+# ======================================================
+# Content hashes
+# ======================================================
+def hash_file(path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Task:
+    """One build step: action() turns `inputs` (+ params) into `outputs`."""
+
+    def __init__(self, name, action, inputs=(), outputs=(), params=None, always=False):
+        self.name = name
+        self.action = action
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.params = params or {}
+        self.always = always   # e.g. network fetches: run whenever selected
+
+
+# ======================================================
+# Build graph
+# ======================================================
+class BuildGraph:
+    """Content-hash build graph: rebuild only what changed, in parallel.
+
+    A task's signature hashes its params and the contents of its inputs.
+    It runs when the signature differs from the last successful build or
+    an output is missing or was modified since; otherwise it is "fresh".
+    A task that rebuilds into byte-identical outputs leaves everything
+    downstream fresh. Tasks run as soon as the tasks producing their inputs
+    finish, up to max_workers at a time; a failure skips its dependents.
+
+    File hashes are cached by size + mtime, so unchanged files are not
+    re-read. State lives in one JSON file, saved after every task.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = Path(state_path)
+        self.tasks = {}
+        self.errors = {}
+        self.state = {"files": {}, "tasks": {}}
+        if self.state_path.exists():
+            with open(self.state_path, "r") as f:
+                self.state = json.load(f)
+
+    def add(self, name, action, inputs=(), outputs=(), params=None, always=False) -> Task:
+        task = self.tasks[name] = Task(name, action, inputs, outputs, params, always)
+        return task
+
+    # -------------------- hashing --------------------
+    def digest(self, path):
+        """Content hash of a file (None if missing), cached by size + mtime."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = str(path)
+        cached = self.state["files"].get(key)
+        if cached and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+        value = hash_file(path)
+        self.state["files"][key] = [stat.st_size, stat.st_mtime_ns, value]
+        return value
+
+    def signature(self, task: Task) -> str:
+        blob = json.dumps({"params": task.params,
+                           "inputs": {str(p): self.digest(p) for p in task.inputs}},
+                          sort_keys=True, default=str)
+        return hashlib.blake2b(blob.encode(), digest_size=16).hexdigest()
+
+    def is_stale(self, task: Task, signature: str) -> bool:
+        record = self.state["tasks"].get(task.name)
+        if task.always or record is None or record["signature"] != signature:
+            return True
+        return any(self.digest(p) is None or self.digest(p) != record["outputs"].get(str(p))
+                   for p in task.outputs)
+
+    def _save(self) -> None:
+        self.state_path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = Path(str(self.state_path) + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    # -------------------- structure --------------------
+    def dependencies(self) -> dict:
+        """{task name: names of the tasks producing its inputs}."""
+        producers = {str(p): task.name for task in self.tasks.values() for p in task.outputs}
+        return {name: {producers[str(p)] for p in task.inputs if str(p) in producers}
+                for name, task in self.tasks.items()}
+
+    def selection(self, targets=None) -> dict:
+        """Dependencies restricted to `targets` and everything upstream of them."""
+        deps = self.dependencies()
+        if targets is None:
+            return deps
+        unknown = set(targets) - set(deps)
+        if unknown:
+            raise KeyError(f"Unknown build targets: {sorted(unknown)}")
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(deps[name])
+        return {name: deps[name] for name in deps if name in selected}
+
+    # -------------------- execution --------------------
+    def plan(self, targets=None, force: bool = False) -> dict:
+        """What run() would do, without running anything: {name: status}."""
+        deps = self.selection(targets)
+        status = {}
+        while len(status) < len(deps):
+            for name in deps:
+                if name in status or not deps[name] <= set(status):
+                    continue
+                task = self.tasks[name]
+                if any(status[d] != "fresh" for d in deps[name]):
+                    status[name] = "stale (upstream)"
+                else:
+                    stale = force or self.is_stale(task, self.signature(task))
+                    status[name] = "stale" if stale else "fresh"
+        return status
+
+    def run(self, targets=None, max_workers: int = 8, force: bool = False) -> dict:
+        """Build `targets` (default: everything). Returns {name: status}.
+
+        status: "built", "fresh", "failed" (the exception is kept in
+        self.errors) or "skipped" (an upstream task failed).
+        """
+        deps = self.selection(targets)
+        waiting = {name: set(d) for name, d in deps.items()}
+        status, self.errors = {}, {}
+        start = time.perf_counter()
+
+        def finish(name, result):
+            status[name] = result
+            for pending in waiting.values():
+                pending.discard(name)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while waiting or running:
+                for name in [n for n, pending in waiting.items() if not pending]:
+                    del waiting[name]
+                    task = self.tasks[name]
+                    if any(status[d] in ("failed", "skipped") for d in deps[name]):
+                        finish(name, "skipped")
+                        continue
+                    signature = self.signature(task)
+                    if not force and not self.is_stale(task, signature):
+                        finish(name, "fresh")
+                        continue
+                    print(f"🔨 {name}")
+                    running[pool.submit(task.action)] = (name, signature)
+
+                if not running:
+                    if waiting and all(waiting.values()):
+                        raise RuntimeError(f"Dependency cycle among {sorted(waiting)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, signature = running.pop(future)
+                    task = self.tasks[name]
+                    error = future.exception()
+                    missing = [str(p) for p in task.outputs if not p.exists()]
+                    if error is None and missing:
+                        error = FileNotFoundError(f"{name} did not write {missing}")
+                    if error is not None:
+                        self.errors[name] = error
+                        print(f"⚠ {name} failed: {error}")
+                        finish(name, "failed")
+                        continue
+                    self.state["tasks"][name] = {
+                        "signature": signature,
+                        "outputs": {str(p): self.digest(p) for p in task.outputs},
+                    }
+                    self._save()
+                    finish(name, "built")
+
+        self._save()
+        counts = {s: sum(v == s for v in status.values()) for s in ("built", "fresh", "failed", "skipped")}
+        print(f"🏁 Build: {counts['built']} built, {counts['fresh']} fresh, {counts['failed']} failed, "
+              f"{counts['skipped']} skipped in {time.perf_counter() - start:.1f} s")
+        return status
+
+
+# ======================================================
+# Stage actions
+# ======================================================
+def write_csv(df: pd.DataFrame, path: Path, **kwargs):
+    """Atomic to_csv: readers never see a partial file."""
+    tmp_path = Path(str(path) + ".tmp")
+    df.to_csv(tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def normalize_one(metric_id: str, info: dict, raw_dir: Path, out_path: Path):
+    """normalize_metrics for one metric (recipes are per column, so results
+    match the batched run). Metrics with no data get an empty file."""
+    raw = {metric_id: normalize_metrics.load_raw_metric(metric_id, str(raw_dir))}
+    results = normalize_metrics.normalize_metrics({metric_id: info}, raw)
+    df = results.get(metric_id, pd.DataFrame(columns=["value", "norm"],
+                                              index=pd.DatetimeIndex([], name="date")))
+    write_csv(df, out_path)
+
+
+def assemble_normalized_panel(paths: dict, out_path: Path):
+    results = {}
+    for metric_id, path in paths.items():
+        df = pd.read_csv(path, index_col=0, parse_dates=True)
+        if not df.empty:
+            results[metric_id] = df
+    write_csv(normalize_metrics.assemble_panel(results), out_path)
+
+
+def run_vcf_main(panel_path: Path, out_dir: Path):
+    """VCFPipeline analysis of the macro panel; exports to out_dir."""
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    from vcf_main import VCFPipeline
+
+    panel = pd.read_csv(panel_path, index_col="date", parse_dates=True)
+    market_data = {m: panel[m].dropna() for m in panel.columns}
+    pipeline = VCFPipeline()
+    pipeline.export_results(pipeline.run_analysis(market_data), output_dir=str(out_dir))
+
+
+# ======================================================
+# The VCF pipeline
+# ======================================================
+def pipeline_graph(base_dir=None, fetch: bool = False, freq: str = "M", registry=None) -> BuildGraph:
+    """data_loader → normalize_metrics → build_macro_panel → geometry_engine → vcf_main.
+
+    One fetch (with fetch=True) and one normalize task per metric, then the
+    normalized panel, the macro panel, geometry and the VCF analysis. Each
+    stage's source file is one of its inputs, so code edits rebuild it.
+    """
+    base_dir = Path(base_dir or BASE_DIR)
+    registry_path = base_dir / "registry" / "vcf_metric_registry.json"
+    raw_dir, clean_dir = base_dir / "data_raw", base_dir / "data_clean"
+    clean_dir.mkdir(exist_ok=True, parents=True)
+    if registry is None:
+        with open(registry_path, "r") as f:
+            registry = json.load(f)
+
+    graph = BuildGraph(base_dir / STATE_NAME)
+    if fetch:
+        import data_loader
+
+    normalized = {}
+    for metric_id, info in registry.items():
+        raw_path = raw_dir / f"{metric_id}.csv"
+        can_fetch = fetch and info["source"].upper() in data_loader.FETCHERS
+        if can_fetch:
+            graph.add(f"fetch:{metric_id}",
+                      partial(data_loader.refresh_metric, metric_id, info, raw_dir),
+                      outputs=[raw_path], params=info, always=True)
+        elif not raw_path.exists():
+            continue
+
+        out_path = clean_dir / f"{metric_id}_normalized.csv"
+        graph.add(f"normalize:{metric_id}", partial(normalize_one, metric_id, info, raw_dir, out_path),
+                  inputs=[raw_path, normalize_metrics.__file__], outputs=[out_path], params=info)
+        normalized[metric_id] = out_path
+
+    panel_path = clean_dir / "normalized_panel.csv"
+    graph.add("normalized_panel", partial(assemble_normalized_panel, normalized, panel_path),
+              inputs=[*normalized.values(), normalize_metrics.__file__], outputs=[panel_path])
+
+    macro_ids = [m for m in build_macro_panel.select_macro_metrics(registry) if m in normalized]
+    macro_path = clean_dir / f"macro_{build_macro_panel.TARGETS[freq][1]}_panel.csv"
+    graph.add("macro_panel",
+              partial(build_macro_panel.build_macro_panel, base_dir, clean_dir, macro_path, freq, macro_ids),
+              inputs=[normalized[m] for m in macro_ids] + [build_macro_panel.__file__],
+              outputs=[macro_path], params={"freq": freq, "metrics": macro_ids})
+
+    geometry_dir = base_dir / "geometry"
+    graph.add("geometry", partial(geometry_engine.run_geometry, panel_path, registry_path, geometry_dir),
+              inputs=[panel_path, registry_path, geometry_engine.__file__],
+              outputs=[geometry_dir / "vcf_geometry_long_macro.csv"])
+
+    output_dir = base_dir / "vcf_output"
+    graph.add("vcf_main", partial(run_vcf_main, macro_path, output_dir),
+              inputs=[macro_path] + [ROOT_DIR / name for name in VCF_MAIN_SOURCES],
+              outputs=[output_dir / "state_matrix.csv", output_dir / "regimes.csv"])
+    return graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stale VCF pipeline artifacts.")
+    parser.add_argument("targets", nargs="*", help="Tasks to build (default: all), e.g. geometry normalize:GDP_US")
+    parser.add_argument("--base-dir", default=None, help="Project root (default: VCF_BASE_DIR or cwd)")
+    parser.add_argument("--fetch", action="store_true", help="Refresh data_raw from the providers first")
+    parser.add_argument("--freq", default="M", choices=sorted(build_macro_panel.TARGETS), help="Macro panel frequency")
+    parser.add_argument("--workers", type=int, default=8, help="Tasks run in parallel")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="Show what is stale and exit")
+    args = parser.parse_args()
+
+    graph = pipeline_graph(args.base_dir, fetch=args.fetch, freq=args.freq)
+    targets = args.targets or None
+    if args.dry_run:
+        for name, status in graph.plan(targets, force=args.force).items():
+            print(f"{'✔' if status == 'fresh' else '•'} {name}: {status}")
+    else:
+        graph.run(targets, max_workers=args.workers, force=args.force)
@@ -1,68 +1,137 @@
 import os
 import json
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
 # ----- Paths -----
-BASE_DIR = r"C:\Users\rudde\VCF_Research"
-REGISTRY_PATH = os.path.join(BASE_DIR, "registry", "vcf_metric_registry.json")
-CLEAN_DIR = os.path.join(BASE_DIR, "data_clean")
-OUTPUT_PATH = os.path.join(CLEAN_DIR, "macro_monthly_panel.csv")
-
-print("\n🏗  Building VCF macro MONTHLY panel (FRED only)...")
-
-# ----- Load registry -----
-with open(REGISTRY_PATH, "r") as f:
-    registry = json.load(f)
-
-# Keep ONLY FRED-based macro series (skip VIX / SPY / XLU automatically)
-macro_ids = []
-for metric_id, info in registry.items():
-    src = info.get("source", "").upper()
-    cat = info.get("category", "").lower()
-    if src == "FRED" and cat in {"macro", "labor", "liquidity", "rates"}:
-        macro_ids.append(metric_id)
-
-print(f"✔ Using FRED macro metrics: {macro_ids}")
-
-panel = None
-
-# ----- Build monthly panel -----
-for metric_id in macro_ids:
-    file_path = os.path.join(CLEAN_DIR, f"{metric_id}_normalized.csv")
-    if not os.path.exists(file_path):
+# Default to the working directory (override with VCF_BASE_DIR or --base-dir)
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+
+# Target frequency -> (pandas period code, output name)
+# Buckets match resample("M" / "W" / "Q").last(): month-end, week ending
+# Sunday, quarter-end.
+TARGETS = {
+    "M": ("M", "monthly"),
+    "W": ("W-SUN", "weekly"),
+    "Q": ("Q-DEC", "quarterly"),
+}
+
+MACRO_CATEGORIES = {"macro", "labor", "liquidity", "rates"}
+
+
+def select_macro_metrics(registry: dict) -> list:
+    """Keep ONLY FRED-based macro series (skip VIX / SPY / XLU automatically)."""
+    macro_ids = []
+    for metric_id, info in registry.items():
+        src = info.get("source", "").upper()
+        cat = info.get("category", "").lower()
+        if src == "FRED" and cat in MACRO_CATEGORIES:
+            macro_ids.append(metric_id)
+    return macro_ids
+
+
+def read_metric_values(metric_id: str, clean_dir: Path):
+    """Read the 'value' column of a normalized metric as a date-sorted Series."""
+    file_path = Path(clean_dir) / f"{metric_id}_normalized.csv"
+    if not file_path.exists():
         print(f"⚠ Skipping {metric_id} – normalized file not found: {file_path}")
-        continue
+        return None
 
     df = pd.read_csv(file_path, parse_dates=["date"])
     if df.empty:
         print(f"⚠ Skipping {metric_id} – no rows in file.")
-        continue
-
-    df = df.set_index("date").sort_index()
+        return None
 
-    # Whatever the value column is called, map it to the metric_id
     # Always use ONLY the 'value' column for macro panel
     if "value" not in df.columns:
         print(f"⚠ Skipping {metric_id} – no 'value' column found.")
-        continue
+        return None
+
+    series = df.set_index("date")["value"].sort_index(kind="stable")
+    return series.dropna()
+
+
+def bucket_panel(series_by_id: dict, freq: str = "M") -> pd.DataFrame:
+    """Scatter each series' last value per period into one period × metric array.
+
+    Period codes come from one vectorized to_period() per series; the panel
+    spans the union of periods and rows where every metric is NaN are dropped.
+    """
+    period_freq, _ = TARGETS[freq]
+    # NaN observations are skipped, as in resample().last()
+    series_by_id = {m: s.dropna() for m, s in series_by_id.items()}
+    codes = {m: s.index.to_period(period_freq).asi8 for m, s in series_by_id.items()}
+    codes = {m: c for m, c in codes.items() if len(c)}
+    if not codes:
+        return pd.DataFrame()
+
+    first = min(c[0] for c in codes.values())
+    last = max(c[-1] for c in codes.values())
+    panel = np.full((last - first + 1, len(codes)), np.nan)
+
+    for j, (metric_id, code) in enumerate(codes.items()):
+        # Last observation in each period (index is sorted)
+        is_last = np.r_[code[1:] != code[:-1], True]
+        panel[code[is_last] - first, j] = series_by_id[metric_id].values[is_last]
+
+    periods = pd.period_range(
+        pd.Period(ordinal=first, freq=period_freq), periods=len(panel), freq=period_freq)
+    dates = periods.to_timestamp(how="end").normalize()
+    dates.name = "date"
+
+    result = pd.DataFrame(panel, index=dates, columns=list(codes))
+    return result[~np.isnan(panel).all(axis=1)]
+
+
+def build_macro_panel(base_dir=None, clean_dir=None, output_path=None,
+                      freq: str = "M", metric_ids=None, max_workers: int = 8):
+    """Build the FRED macro panel at month-end (M), week-end (W) or quarter-end (Q).
+
+    Metric files are read concurrently; the panel is assembled in a single
+    scatter and written once.
+    """
+    if freq not in TARGETS:
+        raise ValueError(f"Unknown target frequency {freq!r}; use one of {list(TARGETS)}")
+
+    base_dir = Path(base_dir or BASE_DIR)
+    clean_dir = Path(clean_dir or base_dir / "data_clean")
+    output_path = Path(output_path or clean_dir / f"macro_{TARGETS[freq][1]}_panel.csv")
+
+    print(f"\n🏗  Building VCF macro {TARGETS[freq][1].upper()} panel (FRED only)...")
+
+    if metric_ids is None:
+        with open(base_dir / "registry" / "vcf_metric_registry.json", "r") as f:
+            registry = json.load(f)
+        metric_ids = select_macro_metrics(registry)
+
+    print(f"✔ Using FRED macro metrics: {metric_ids}")
 
-    df = df[["value"]].rename(columns={"value": metric_id})
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        loaded = pool.map(lambda m: read_metric_values(m, clean_dir), metric_ids)
+        series_by_id = {m: s for m, s in zip(metric_ids, loaded) if s is not None}
 
+    panel = bucket_panel(series_by_id, freq)
 
-    # Resample to month-end (works even if it's already monthly)
-    df_m = df.resample("M").last()
+    # Save
+    panel.to_csv(output_path, index_label="date")
 
-    if panel is None:
-        panel = df_m
-    else:
-        panel = panel.join(df_m, how="outer")
+    print(f"\n🎉 Macro {TARGETS[freq][1]} panel COMPLETE.")
+    print(f"   Saved to: {output_path}")
+    print(f"   Rows: {len(panel):,}  |  Columns: {list(panel.columns)}\n")
+    return panel
 
-# Drop rows where *all* macro series are NaN
-panel = panel.dropna(how="all")
 
-# Save
-panel.to_csv(OUTPUT_PATH, index_label="date")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the VCF macro panel from normalized FRED metrics.")
+    parser.add_argument("--base-dir", default=None, help="Project root (default: VCF_BASE_DIR or cwd)")
+    parser.add_argument("--clean-dir", default=None, help="Directory with *_normalized.csv files")
+    parser.add_argument("--output", default=None, help="Output CSV path")
+    parser.add_argument("--freq", default="M", choices=sorted(TARGETS), help="Target frequency")
+    args = parser.parse_args()
 
-print(f"\n🎉 Macro monthly panel COMPLETE.")
-print(f"   Saved to: {OUTPUT_PATH}")
-print(f"   Rows: {len(panel):,}  |  Columns: {list(panel.columns)}\n")
+    build_macro_panel(base_dir=args.base_dir, clean_dir=args.clean_dir,
+                      output_path=args.output, freq=args.freq)
@@ -0,0 +1,328 @@
+import os
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Dynamic Paths — WORKS BOTH IN COLAB AND ON PC
+# ======================================================
+BASE_DIR = Path(os.environ.get("VCF_BASE_DIR", os.getcwd()))
+DATA_RAW = BASE_DIR / "data_raw"
+DATA_STORE = BASE_DIR / "data_store"
+REGISTRY_PATH = BASE_DIR / "registry" / "vcf_metric_registry.json"
+
+# ======================================================
+# Columnar store format
+# ======================================================
+# One .vcfcol file per metric:
+#
+#   MAGIC (8 bytes) | header length (uint64) | JSON header (padded to 64 B)
+#   dates  int64[n]        nanoseconds since epoch, sorted
+#   values float64[k, n]   one contiguous block per column
+#
+# The header records the column names, row count and the source CSV's
+# size/mtime, so stale files are rebuilt automatically. Reads memory-map
+# the arrays (no parsing, no copy).
+
+MAGIC = b"VCFCOL1\x00"
+ALIGN = 64
+SUFFIX = ".vcfcol"
+
+
+def _padded(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+# ======================================================
+# CSV schema detection
+# ======================================================
+def read_raw_csv(csv_path) -> pd.DataFrame:
+    """Parse a raw CSV into a date-indexed float DataFrame.
+
+    Handles both layouts found in data_raw/:
+      - date,value                       (FRED / registry loaders)
+      - date,Close,High,...  + a second  (yfinance multi-index export)
+        row of tickers: ",^GSPC,^GSPC,..."
+    Unparseable dates are dropped, values coerced to float (NaN kept).
+    """
+    with open(csv_path, "r") as f:
+        header = f.readline().strip().split(",")
+        second = f.readline().strip().split(",")
+
+    # yfinance: second row has an empty date cell and non-numeric tickers
+    skip = []
+    if len(second) > 1 and second[0] == "" and not _is_number(second[1]):
+        skip = [1]
+
+    df = pd.read_csv(csv_path, skiprows=skip)
+    date_col = "date" if "date" in df.columns else df.columns[0]
+
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    df = df.drop(columns=[date_col]).apply(pd.to_numeric, errors="coerce")
+    df.index = pd.DatetimeIndex(dates, name="date")
+    df = df[df.index.notna()]
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    return df.astype(float)
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+# ======================================================
+# Write / read
+# ======================================================
+def write_store_file(df: pd.DataFrame, path, source=None):
+    """Write a date-indexed float DataFrame as one columnar store file."""
+    dates = np.ascontiguousarray(df.index.values.astype("datetime64[ns]").view(np.int64))
+    values = np.ascontiguousarray(df.to_numpy(dtype=float).T)
+
+    header = {"columns": [str(c) for c in df.columns], "rows": len(df)}
+    if source is not None:
+        stat = os.stat(source)
+        header["source"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    blob = json.dumps(header).encode()
+    blob += b" " * (_padded(len(MAGIC) + 8 + len(blob)) - len(MAGIC) - 8 - len(blob))
+
+    tmp_path = Path(str(path) + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(blob)).tobytes())
+        f.write(blob)
+        f.write(dates.tobytes())
+        f.write(values.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path) -> dict:
+    """Header of a store file, plus the byte offset of the date array."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a VCF columnar store file: {path}")
+        length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(length))
+    header["offset"] = len(MAGIC) + 8 + length
+    return header
+
+
+def read_store_file(path):
+    """Memory-map a store file.
+
+    Returns (dates datetime64[ns] (n,), values float64 (k, n), columns).
+    Both arrays are read-only views of the file.
+    """
+    header = read_header(path)
+    n, k = header["rows"], len(header["columns"])
+    if n == 0:
+        return np.empty(0, "datetime64[ns]"), np.empty((k, 0)), header["columns"]
+
+    dates = np.memmap(path, dtype=np.int64, mode="r", offset=header["offset"], shape=(n,))
+    values = np.memmap(path, dtype=np.float64, mode="r",
+                       offset=header["offset"] + 8 * n, shape=(k, n))
+    return dates.view("datetime64[ns]"), values, header["columns"]
+
+
+def read_series(metric_id: str, column: str = None, store_dir=None) -> pd.Series:
+    """One column of a stored metric as a Series (default 'value', else 'Close')."""
+    dates, values, columns = read_store_file(store_path(metric_id, store_dir))
+    if column is None:
+        column = "value" if "value" in columns else ("Close" if "Close" in columns else columns[0])
+    return pd.Series(values[columns.index(column)], index=pd.DatetimeIndex(dates, name="date"),
+                     name=column, copy=False)
+
+
+def store_path(metric_id: str, store_dir=None) -> Path:
+    return Path(store_dir or DATA_STORE) / f"{metric_id}{SUFFIX}"
+
+
+def is_fresh(csv_path, path) -> bool:
+    """True if the store file exists and was built from this exact CSV."""
+    if not Path(path).exists():
+        return False
+    try:
+        source = read_header(path).get("source") or {}
+    except ValueError:
+        return False
+    stat = os.stat(csv_path)
+    return source.get("size") == stat.st_size and source.get("mtime_ns") == stat.st_mtime_ns
+
+
+# ======================================================
+# Build / load the universe
+# ======================================================
+def build_store(raw_dir=None, store_dir=None, force: bool = False) -> dict:
+    """Convert every CSV in raw_dir to the columnar store (stale files only).
+
+    Returns {metric_id: "converted" | "fresh"}.
+    """
+    raw_dir = Path(raw_dir or DATA_RAW)
+    store_dir = Path(store_dir or DATA_STORE)
+    store_dir.mkdir(exist_ok=True, parents=True)
+
+    status = {}
+    for csv_path in sorted(raw_dir.glob("*.csv")):
+        metric_id = csv_path.stem
+        path = store_path(metric_id, store_dir)
+        if not force and is_fresh(csv_path, path):
+            status[metric_id] = "fresh"
+            continue
+        write_store_file(read_raw_csv(csv_path), path, source=csv_path)
+        status[metric_id] = "converted"
+    return status
+
+
+def load_universe(store_dir=None) -> dict:
+    """Memory-map every metric in the store: {metric_id: (dates, values, columns)}."""
+    store_dir = Path(store_dir or DATA_STORE)
+    return {path.stem: read_store_file(path) for path in sorted(store_dir.glob(f"*{SUFFIX}"))}
+
+
+# ======================================================
+# Lazy registry-backed panel
+# ======================================================
+class LazyPanel:
+    """Query over stored metrics that reads only what it returns.
+
+    select() filters metrics by registry fields, between() narrows the date
+    range; both return new LazyPanel objects and read nothing. to_frame()
+    memory-maps each selected column, binary-searches its date index for
+    the range and copies only those rows, so memory scales with the query.
+
+        >>> panel = LazyPanel.from_registry()
+        >>> rates = panel.select(tags="rates").between("2000", "2025").to_frame()
+        >>> liquidity = panel.select(category="Liquidity").to_frame()
+
+    Metrics come either from per-metric store files (default) or from the
+    columns of one wide store file (panel_file, e.g. a converted
+    normalized_panel.csv).
+    """
+
+    def __init__(self, registry: dict, store_dir=None, panel_file=None,
+                 metric_ids=None, start=None, end=None):
+        self.registry = registry
+        self.store_dir = Path(store_dir or DATA_STORE)
+        self.panel_file = Path(panel_file) if panel_file else None
+        self.metric_ids = list(registry) if metric_ids is None else list(metric_ids)
+        self.start, self.end = start, end
+
+    @classmethod
+    def from_registry(cls, registry_path=None, store_dir=None, panel_file=None):
+        with open(registry_path or REGISTRY_PATH, "r") as f:
+            registry = json.load(f)
+        return cls(registry, store_dir=store_dir, panel_file=panel_file)
+
+    def _derive(self, **changes) -> "LazyPanel":
+        state = dict(registry=self.registry, store_dir=self.store_dir,
+                     panel_file=self.panel_file, metric_ids=self.metric_ids,
+                     start=self.start, end=self.end)
+        state.update(changes)
+        return LazyPanel(**state)
+
+    def select(self, category=None, tags=None, source=None, frequency=None,
+               metrics=None) -> "LazyPanel":
+        """Keep metrics matching every given filter.
+
+        category / source / frequency: a value or list (case-insensitive);
+        tags: a tag or list, matching metrics carrying ANY of them;
+        metrics: explicit metric ids.
+        """
+        def as_set(value):
+            if value is None:
+                return None
+            values = [value] if isinstance(value, str) else value
+            return {str(v).lower() for v in values}
+
+        wanted = {"category": as_set(category), "source": as_set(source),
+                  "frequency": as_set(frequency)}
+        tag_set, id_set = as_set(tags), as_set(metrics)
+
+        keep = []
+        for metric_id in self.metric_ids:
+            info = self.registry.get(metric_id, {})
+            if id_set is not None and metric_id.lower() not in id_set:
+                continue
+            if any(v is not None and str(info.get(k, "")).lower() not in v
+                   for k, v in wanted.items()):
+                continue
+            if tag_set is not None and not tag_set & set(str(info.get("tags", "")).lower().split()):
+                continue
+            keep.append(metric_id)
+        return self._derive(metric_ids=keep)
+
+    def between(self, start=None, end=None) -> "LazyPanel":
+        """Restrict to [start, end]; partial dates ('2025') cover the whole period."""
+        start = pd.Period(start).start_time if isinstance(start, str) else start
+        end = pd.Period(end).end_time if isinstance(end, str) else end
+        return self._derive(start=pd.Timestamp(start) if start is not None else None,
+                            end=pd.Timestamp(end) if end is not None else None)
+
+    def _locate(self, metric_id):
+        """(store file, column name) holding a metric, or None."""
+        if self.panel_file is not None:
+            return self.panel_file, metric_id
+        path = store_path(metric_id, self.store_dir)
+        return (path, None) if path.exists() else None
+
+    def _read(self, metric_id):
+        """Dates and values of one metric inside the date range (copies)."""
+        path, column = self._locate(metric_id)
+        dates, values, columns = read_store_file(path)
+        if column is None:
+            column = "value" if "value" in columns else ("Close" if "Close" in columns else columns[0])
+        elif column not in columns:
+            return None
+
+        lo, hi = 0, len(dates)
+        if self.start is not None:
+            lo = np.searchsorted(dates, np.datetime64(self.start, "ns"), side="left")
+        if self.end is not None:
+            hi = np.searchsorted(dates, np.datetime64(self.end, "ns"), side="right")
+        return np.array(dates[lo:hi]), np.array(values[columns.index(column), lo:hi])
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the query as a date × metric DataFrame (union of dates)."""
+        slices = {}
+        for metric_id in self.metric_ids:
+            located = self._locate(metric_id) is not None
+            data = self._read(metric_id) if located else None
+            if data is None:
+                print(f"⚠ {metric_id} not in store, skipping")
+                continue
+            slices[metric_id] = data
+
+        if not slices:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="date"))
+
+        dates = np.unique(np.concatenate([d for d, _ in slices.values()]))
+        out = np.full((len(dates), len(slices)), np.nan)
+        for j, (d, v) in enumerate(slices.values()):
+            out[np.searchsorted(dates, d), j] = v
+        return pd.DataFrame(out, index=pd.DatetimeIndex(dates, name="date"),
+                            columns=list(slices))
+
+    def __repr__(self):
+        return (f"LazyPanel({len(self.metric_ids)} metrics, "
+                f"{self.start or '...'} → {self.end or '...'})")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    status = build_store()
+    converted = sum(s == "converted" for s in status.values())
+    print(f"✔ Store: {converted} converted, {len(status) - converted} fresh "
+          f"in {time.perf_counter() - start:.2f} s → {DATA_STORE}")
+
+    start = time.perf_counter()
+    universe = load_universe()
+    rows = sum(len(dates) for dates, _, _ in universe.values())
+    print(f"✔ Loaded {len(universe)} metrics ({rows:,} rows) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
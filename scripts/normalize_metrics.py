@@ -1,8 +1,16 @@
 import os
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import numpy as np
 
+try:
+    from io_utils import is_fresh, read_series, store_path
+except ImportError:
+    is_fresh = None
+
 # =========================================
 # PATHS
 # =========================================
@@ -10,8 +18,7 @@ BASE_DIR = r"C:\Users\rudde\VCF_Research"
 REGISTRY_PATH = os.path.join(BASE_DIR, "registry", "vcf_metric_registry.json")
 RAW_DIR = os.path.join(BASE_DIR, "data_raw")
 CLEAN_DIR = os.path.join(BASE_DIR, "data_clean")
-
-os.makedirs(CLEAN_DIR, exist_ok=True)
+STORE_NAME = "data_store"   # columnar cache (io_utils.py), a sibling of the raw dir
 
 
 # =========================================
@@ -66,101 +73,236 @@ def infer_growth_periods(freq: str) -> int:
 
 
 # =========================================
-# NORMALIZATION LOGIC PER METRIC
+# RECIPE ENGINE
 # =========================================
-def normalize_metric(metric_id: str, info: dict) -> pd.DataFrame:
-    """Load raw metric from CSV, normalize, and return DataFrame with
-    columns: ['value', 'norm'] indexed by date.
-    """
-    raw_path = os.path.join(RAW_DIR, f"{metric_id}.csv")
+# Each registry metric maps to a recipe key (recipe, window). Metrics that
+# share a key are stacked column-wise and normalized by ONE 2-D operation.
+# Columns are aligned on the observation axis (row i = i-th observation of
+# each metric), so rolling windows and growth periods still count each
+# metric's own observations, exactly like the old per-metric loop.
+# Dates are aligned once, when the combined panel is assembled.
+
+def recipe_key(info: dict) -> tuple:
+    """(recipe, window) for a registry entry."""
+    norm_type = info.get("normalization", "zscore")
+    freq = info.get("frequency", "Daily")
+
+    if norm_type == "growth_positive":
+        return ("growth_positive", infer_growth_periods(freq))
+    if norm_type == "zscore_rolling":
+        return ("zscore_rolling", infer_window(freq))
+    # zscore, inverse_zscore and unknown recipes: plain z-score
+    # (inversion comes from the metric's direction)
+    return ("zscore", None)
+
+
+def store_dir_for(raw_dir: str) -> str:
+    """Columnar store built from raw_dir: <raw_dir>/../data_store."""
+    return os.path.join(os.path.dirname(os.path.abspath(raw_dir)), STORE_NAME)
+
+
+def load_raw_metric(metric_id: str, raw_dir: str = None):
+    """Load a raw metric CSV as a clean, date-sorted float Series (or None)."""
+    raw_dir = raw_dir or RAW_DIR
+    raw_path = os.path.join(raw_dir, f"{metric_id}.csv")
     if not os.path.exists(raw_path):
         print(f"❌ Raw file missing for {metric_id}: {raw_path}")
-        return pd.DataFrame()
+        return None
+
+    # Memory-mapped columnar copy, if built from this exact CSV
+    store_dir = store_dir_for(raw_dir)
+    if is_fresh is not None and is_fresh(raw_path, store_path(metric_id, store_dir)):
+        series = read_series(metric_id, store_dir=store_dir)
+        if series.name == "value":
+            return series.dropna()
 
     df = pd.read_csv(raw_path)
     # Expecting 'date' and 'value' columns
     if "date" not in df.columns or "value" not in df.columns:
         print(f"❌ Unexpected columns in {metric_id}: {df.columns.tolist()}")
-        return pd.DataFrame()
+        return None
 
     df["date"] = pd.to_datetime(df["date"], errors="coerce")
     df = df.dropna(subset=["date"])
     df = df.set_index("date").sort_index()
-    df = df[["value"]].copy()
-    df["value"] = pd.to_numeric(df["value"], errors="coerce")
-    df = df.dropna(subset=["value"])
+    value = pd.to_numeric(df["value"], errors="coerce").dropna()
+    return value.rename("value")
 
-    norm_type = info.get("normalization", "zscore")
-    freq = info.get("frequency", "Daily")
-    direction = info.get("direction", "+")
 
-    norm = None
+def _load_timed(metric_id: str, raw_dir: str):
+    """Process-pool worker: (metric_id, Series or None, seconds)."""
+    start = time.perf_counter()
+    series = load_raw_metric(metric_id, raw_dir)
+    return metric_id, series, time.perf_counter() - start
 
-    # ---- Different normalization types ----
-    if norm_type == "growth_positive":
+
+def load_raw_metrics(metric_ids, max_workers=None, raw_dir: str = None) -> dict:
+    """Parse raw metric CSVs concurrently in a process pool.
+
+    Reports progress and per-metric parse time as files complete.
+    Returns {metric_id: Series or None}. max_workers=1 parses serially.
+    """
+    metric_ids = list(metric_ids)
+    raw_dir = raw_dir or RAW_DIR
+    raw, total = {}, len(metric_ids)
+
+    def report(done, metric_id, series, seconds):
+        rows = 0 if series is None else len(series)
+        print(f"   [{done}/{total}] parsed {metric_id}: {rows} rows in {seconds * 1000:.0f} ms")
+
+    if max_workers == 1:
+        for done, metric_id in enumerate(metric_ids, start=1):
+            _, raw[metric_id], seconds = _load_timed(metric_id, raw_dir)
+            report(done, metric_id, raw[metric_id], seconds)
+        return raw
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(_load_timed, metric_id, raw_dir) for metric_id in metric_ids]
+        for done, future in enumerate(as_completed(futures), start=1):
+            metric_id, series, seconds = future.result()
+            raw[metric_id] = series
+            report(done, metric_id, series, seconds)
+    return raw
+
+
+def stack_observations(series_list) -> np.ndarray:
+    """(max_len × n) array; column j holds series j's observations, NaN-padded."""
+    out = np.full((max(len(s) for s in series_list), len(series_list)), np.nan)
+    for j, s in enumerate(series_list):
+        out[:len(s), j] = s.values
+    return out
+
+
+def zscore_2d(values: np.ndarray) -> np.ndarray:
+    """Column-wise z-score (ddof=0); constant columns become NaN."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = np.nanmean(values, axis=0)
+        sigma = np.nanstd(values, axis=0)
+        z = (values - mu) / sigma
+    z[:, (sigma == 0) | np.isnan(sigma)] = np.nan
+    return z
+
+
+def rolling_zscore_2d(values: np.ndarray, window: int) -> np.ndarray:
+    """Column-wise rolling z-score (ddof=0), NaN until a full window."""
+    rolling = pd.DataFrame(values).rolling(window)
+    mean = rolling.mean().to_numpy()
+    std = rolling.std(ddof=0).to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (values - mean) / std
+
+
+def growth_2d(values: np.ndarray, periods: int) -> np.ndarray:
+    """Column-wise percentage change over `periods` observations."""
+    growth = np.full(values.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth[periods:] = values[periods:] / values[:-periods] - 1.0
+    return growth
+
+
+def apply_recipe(recipe: str, window, values: np.ndarray):
+    """Run one recipe on a stacked group. Returns (value, norm) arrays."""
+    if recipe == "growth_positive":
         # Convert to YoY-like growth, then z-score that growth
-        periods = infer_growth_periods(freq)
-        growth = df["value"].pct_change(periods=periods)
-        norm = zscore(growth)
-        df["value"] = growth
+        growth = growth_2d(values, window)
+        return growth, zscore_2d(growth)
+    if recipe == "zscore_rolling":
+        return values, rolling_zscore_2d(values, window)
+    return values, zscore_2d(values)
 
-    elif norm_type == "zscore_rolling":
-        window = infer_window(freq)
-        norm = rolling_zscore(df["value"], window=window)
 
-    elif norm_type in ("zscore", "inverse_zscore"):
-        norm = zscore(df["value"])
+def normalize_metrics(registry: dict, raw=None) -> dict:
+    """Normalize every registry metric, one vectorized call per recipe group.
 
-    else:
-        # Fallback: simple z-score
-        norm = zscore(df["value"])
+    Returns {metric_id: DataFrame[['value', 'norm']]} in registry order,
+    skipping metrics with no raw data. `raw` may supply pre-loaded Series.
+    """
+    if raw is None:
+        raw = {metric_id: load_raw_metric(metric_id) for metric_id in registry}
+
+    groups = {}
+    for metric_id, info in registry.items():
+        series = raw.get(metric_id)
+        if series is None or series.empty:
+            continue
+        groups.setdefault(recipe_key(info), []).append(metric_id)
+
+    results = {}
+    for (recipe, window), metric_ids in groups.items():
+        start = time.perf_counter()
+        series_list = [raw[m] for m in metric_ids]
+        value, norm = apply_recipe(recipe, window, stack_observations(series_list))
+
+        # Direction handling:
+        # "+" means higher = more "risk-on" (leave as is)
+        # "-" means higher = more "risk-off" (flip sign so VCF sees it consistently)
+        signs = np.array([-1.0 if registry[m].get("direction", "+") == "-" else 1.0
+                          for m in metric_ids])
+        norm *= signs
+
+        for j, (metric_id, series) in enumerate(zip(metric_ids, series_list)):
+            n = len(series)
+            results[metric_id] = pd.DataFrame(
+                {"value": value[:n, j], "norm": norm[:n, j]}, index=series.index)
+
+        print(f"📐 {recipe} (window={window}): {len(metric_ids)} metrics "
+              f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    return {m: results[m] for m in registry if m in results}
 
-    # Direction handling:
-    # "+" means higher = more "risk-on" (leave as is)
-    # "-" means higher = more "risk-off" (flip sign so VCF sees it consistently)
-    if direction == "-":
-        norm = -norm
 
-    df["norm"] = norm
+def assemble_panel(results: dict) -> pd.DataFrame:
+    """Outer-join the norm columns on the union of dates in a single scatter."""
+    dates = pd.DatetimeIndex(np.unique(np.concatenate(
+        [df.index.values for df in results.values()])), name="date")
+    panel = np.full((len(dates), len(results)), np.nan)
+    for j, df in enumerate(results.values()):
+        panel[dates.get_indexer(df.index), j] = df["norm"].values
+    return pd.DataFrame(panel, index=dates, columns=list(results))
 
-    return df
+
+# =========================================
+# NORMALIZATION LOGIC PER METRIC
+# =========================================
+def normalize_metric(metric_id: str, info: dict) -> pd.DataFrame:
+    """Load raw metric from CSV, normalize, and return DataFrame with
+    columns: ['value', 'norm'] indexed by date.
+    """
+    results = normalize_metrics({metric_id: info})
+    return results.get(metric_id, pd.DataFrame())
 
 
 # =========================================
 # MAIN: NORMALIZE ALL METRICS & BUILD PANEL
 # =========================================
-def normalize_all_metrics():
+def normalize_all_metrics(max_workers=None):
     registry = load_registry()
+    os.makedirs(CLEAN_DIR, exist_ok=True)
     print("\n🔧 Starting normalization engine...")
     print("✔ Metrics in registry:", len(registry))
 
-    panel = None
-
-    for metric_id, info in registry.items():
-        display_name = info.get("display_name", metric_id)
-        print(f"\n📐 Normalizing {metric_id}: {display_name}")
+    start = time.perf_counter()
+    raw = load_raw_metrics(registry, max_workers=max_workers)
+    print(f"✔ Parsed {len(raw)} raw files in {time.perf_counter() - start:.2f} s")
 
-        df_norm = normalize_metric(metric_id, info)
+    start = time.perf_counter()
+    results = normalize_metrics(registry, raw)
+    print(f"✔ Normalized {len(results)} metrics in {time.perf_counter() - start:.2f} s")
 
-        if df_norm.empty:
+    for metric_id in registry:
+        if metric_id not in results:
             print(f"⚠ No data after normalization for {metric_id}, skipping.")
-            continue
 
+    for metric_id, df_norm in results.items():
         # Save individual normalized series
         out_path = os.path.join(CLEAN_DIR, f"{metric_id}_normalized.csv")
         df_norm.to_csv(out_path)
         print(f"✔ Saved normalized metric to: {out_path} ({len(df_norm)} rows)")
 
-        # Build combined panel of norm values
-        series_norm = df_norm["norm"].rename(metric_id)
-
-        if panel is None:
-            panel = series_norm.to_frame()
-        else:
-            panel = panel.join(series_norm, how="outer")
-
-    if panel is not None:
-        panel = panel.sort_index()
+    if results:
+        start = time.perf_counter()
+        panel = assemble_panel(results)
+        print(f"✔ Assembled panel in {(time.perf_counter() - start) * 1000:.0f} ms")
         panel_out = os.path.join(CLEAN_DIR, "normalized_panel.csv")
         panel.to_csv(panel_out)
         print(f"\n🧱 Combined normalized panel saved to: {panel_out}")
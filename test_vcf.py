@@ -200,6 +200,1256 @@ except Exception as e:
     print(f"✗ Quick analysis failed: {e}")
     sys.exit(1)
 
+# Test 9: Ensemble EMD
+print("\n[TEST 9] Testing ensemble EMD (serial vs process pool, degenerate input)...")
+try:
+    import os
+    import warnings
+    
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code', 'math'))
+    from vcf_advanced_math import MultiScaleCoherence
+
+    t = np.arange(256)
+    signal = np.sin(2 * np.pi * t / 32) + 0.5 * np.sin(2 * np.pi * t / 7) + 0.01 * t
+    serial = MultiScaleCoherence.ensemble_empirical_mode_decomposition(
+        signal, max_imf=4, n_ensembles=8, n_jobs=1, seed=7)
+    pooled = MultiScaleCoherence.ensemble_empirical_mode_decomposition(
+        signal, max_imf=4, n_ensembles=8, n_jobs=2, seed=7)
+    assert len(serial) == len(pooled) and len(serial) > 1, "IMF count differs"
+    assert all(np.allclose(a, b, atol=1e-12) for a, b in zip(serial, pooled)), "Pool result differs"
+
+    # Fewer than 3 extrema: only the residual comes back, nothing raises
+    trend = MultiScaleCoherence._emd_fixed(np.arange(50.), 3)
+    assert not trend[:-1].any() and np.allclose(trend[-1], np.arange(50.))
+    for short in (np.arange(12.), np.full(12, 3.0), np.random.randn(12)):
+        imfs = MultiScaleCoherence.ensemble_empirical_mode_decomposition(
+            short, max_imf=3, n_ensembles=4, n_jobs=1, seed=0)
+        assert len(imfs) >= 1 and all(imf.shape == short.shape for imf in imfs)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        scales = MultiScaleCoherence.scale_coherence(np.arange(12.), np.random.randn(12), 3,
+                                                     method='eemd', n_ensembles=4, n_jobs=1, seed=0)
+    assert len(scales) >= 1
+
+    print(f"✓ EEMD is reproducible across n_jobs and handles short/monotone input: {len(serial)} IMFs")
+except Exception as e:
+    print(f"✗ Ensemble EMD failed: {e}")
+    sys.exit(1)
+
+# Test 10: Geometry panel stress index on forward-filled (flat) columns
+print("\n[TEST 10] Testing the rolling-correlation stress index on flat windows...")
+try:
+    import ast
+    from scipy.signal import hilbert
+    import vcf_geometry_panel
+    
+    # Per-date reference loops from the archived core-math engine (the
+    # module itself creates folders on import, so only its compute_* run)
+    archive_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Stored', 'archive', 'claude',
+                                'claude-files', 'zips', 'documentation', 'VCF_MATH_ENGINE_PACKAGE',
+                                'vcf_core_math_engine.py')
+    with open(archive_path) as f:
+        archive_tree = ast.parse(f.read())
+    archive_tree.body = [node for node in archive_tree.body
+                         if isinstance(node, ast.FunctionDef) and node.name.startswith('compute_')]
+    archived = {'np': np, 'pd': pd, 'hilbert': hilbert}
+    exec(compile(archive_tree, archive_path, 'exec'), archived)
+    
+    # Monthly / quarterly series forward-filled onto business days
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2000-01-03', periods=320, freq='B')
+    flat_panel = pd.DataFrame(rng.standard_normal((320, 2)).cumsum(axis=0) * 0.3, index=days, columns=['a', 'b'])
+    flat_panel['monthly'] = pd.Series(rng.standard_normal(len(days[::21])), index=days[::21]).reindex(days).ffill()
+    flat_panel['quarterly'] = pd.Series(rng.standard_normal(len(days[::80])), index=days[::80]).reindex(days).ffill()
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        stress = vcf_geometry_panel.compute_stress_index(flat_panel)
+        reference = archived['compute_stress_index'](flat_panel)
+    assert np.allclose(stress, reference, atol=1e-9), \
+        f"Stress index differs on {(np.abs(stress - reference) > 1e-9).sum()} dates"
+    
+    engine = vcf_geometry_panel.RollingCorrelation(flat_panel.values)
+    assert (engine.std(63)[62:, 3] == 0).any(), "Flat quarterly windows should have exactly zero std"
+    
+    print(f"✓ Stress index matches the archived loop on forward-filled columns: {len(stress)} dates")
+except Exception as e:
+    print(f"✗ Flat-window stress index failed: {e}")
+    sys.exit(1)
+
+# Test 11: Geometry panel stage graph against the archived per-date functions
+print("\n[TEST 11] Testing the geometry panel against the archived engine...")
+try:
+    geometry_input = flat_panel.copy()
+    geometry_input['label'] = 'carried over'
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        geometry = vcf_geometry_panel.build_geometry_panel(geometry_input, verbose=False)
+        reference = {m: archived['compute_' + m](geometry_input)
+                     for m in ['theta', 'phi', 'divergence', 'resonance', 'stress_index', 'mrf']}
+        reference['mvss'] = archived['compute_mvss'](geometry_input, mrf=reference['mrf'])
+    
+    for metric in vcf_geometry_panel.GEOMETRY_METRICS:
+        assert np.allclose(geometry[metric].values, reference[metric], atol=1e-9), f"{metric} differs"
+    assert (geometry['label'] == 'carried over').all(), "Non-numeric columns should be carried over"
+    
+    # Block size only bounds memory; it must not change the statistics
+    values = geometry_input.select_dtypes(include=[np.number]).values
+    blocked = vcf_geometry_panel.RollingCorrelation(values, block_size=7)
+    single = vcf_geometry_panel.RollingCorrelation(values, block_size=len(values))
+    assert np.allclose(blocked.corr(63), single.corr(63), atol=1e-12, equal_nan=True)
+    assert np.allclose(blocked.corr_change(63, 15), single.corr_change(63, 15), atol=1e-12, equal_nan=True)
+    assert np.allclose(blocked.block_cov(63, 100, 110)[1], single.cov(63)[100:110], atol=1e-12)
+    
+    print(f"✓ All {len(vcf_geometry_panel.GEOMETRY_METRICS)} geometry stages match the archived engine")
+except Exception as e:
+    print(f"✗ Geometry panel equivalence failed: {e}")
+    sys.exit(1)
+
+# Test 12: Vectorized panel normalization matches per-series transform
+print("\n[TEST 12] Testing panel dual-input normalization...")
+try:
+    normalizer = VCFNormalizer(ma_window=12, roc_window=3)
+    raw_panel = pd.DataFrame(market_data)
+    
+    panel_state = normalizer.batch_normalize(raw_panel, method='dual_input')
+    per_series = pd.concat(
+        [normalizer.dual_input_transform(raw_panel[c], c) for c in raw_panel.columns],
+        axis=1
+    )
+    
+    assert list(panel_state.columns) == list(per_series.columns), "Column order mismatch"
+    assert np.allclose(panel_state.values, per_series.values, atol=1e-10), "Value mismatch"
+    
+    print(f"✓ Panel normalization matches per-series transform: {panel_state.shape}")
+except Exception as e:
+    print(f"✗ Panel normalization failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 13] Testing rolling robust z-score kernel...")
+try:
+    normalizer = VCFNormalizer()
+    raw_panel = pd.DataFrame(market_data)
+    
+    def robust_z_single(x):
+        med = np.median(x)
+        mad = np.median(np.abs(x - med))
+        return 0.0 if mad < 1e-6 else (x[-1] - med) / (1.4826 * mad)
+    
+    for window in (12, 13):
+        panel_z = normalizer.batch_normalize(raw_panel, method='robust_zscore', window=window)
+        reference = raw_panel.rolling(window).apply(robust_z_single, raw=True)
+        assert np.allclose(panel_z.values, reference.values, atol=1e-10, equal_nan=True), \
+            f"Mismatch for window={window}"
+    
+    print(f"✓ Rolling robust z-score matches reference: {panel_z.shape}")
+except Exception as e:
+    print(f"✗ Rolling robust z-score failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 14] Testing streaming normalizer...")
+try:
+    import os
+    import tempfile
+    from vcf_normalization import StreamingNormalizer
+    
+    raw_panel = pd.DataFrame(market_data)
+    batch = VCFNormalizer(ma_window=12, roc_window=3).dual_input_panel(raw_panel)
+    
+    stream = StreamingNormalizer(list(raw_panel.columns), ma_window=12, roc_window=3)
+    stream.prime(raw_panel.iloc[:60])
+    
+    # Round-trip the state through disk before continuing
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stream_state.npz')
+        stream.save(path)
+        stream = StreamingNormalizer.load(path)
+    
+    rows = [stream.update(row.to_dict(), ts) for ts, row in raw_panel.iloc[60:].iterrows()]
+    streamed = pd.DataFrame(rows)
+    
+    assert list(streamed.columns) == list(batch.columns), "Column order mismatch"
+    assert np.allclose(streamed.values, batch.iloc[60:].values, rtol=1e-9), "Value mismatch"
+    assert isinstance(stream.last_timestamp, pd.Timestamp), "Timestamp not restored"
+
+    # A series that starts late must not poison its running sums
+    late_panel = raw_panel.copy()
+    late_panel.iloc[:5, 0] = np.nan
+    stream = StreamingNormalizer(list(late_panel.columns), ma_window=12, roc_window=3)
+    late_rows = pd.DataFrame([stream.update(row.to_dict(), ts) for ts, row in late_panel.iterrows()])
+    late = VCFNormalizer(ma_window=12, roc_window=3).dual_input_panel(late_panel.iloc[5:])
+    assert np.isfinite(late_rows.values).all(), "NaN leaked into the streamed rows"
+    assert np.allclose(late_rows.iloc[5:, :2].values, late.iloc[:, :2].values, rtol=1e-9), \
+        "Late-starting series mismatch"
+    assert np.allclose(late_rows.iloc[:, 2:].values, batch.iloc[:, 2:].values, rtol=1e-9)
+
+    print(f"✓ Streaming rows match batch normalization: {streamed.shape}")
+except Exception as e:
+    print(f"✗ Streaming normalizer failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 15] Testing rolling harmonic position...")
+try:
+    from vcf_normalization import SlidingHarmonic
+    
+    raw_panel = pd.DataFrame(market_data)
+    normalizer = VCFNormalizer()
+    rolling = normalizer.rolling_harmonic_position(raw_panel, window=24)
+    
+    # Causal: the last row equals a plain decomposition of the last window
+    last = normalizer.harmonic_normalize(raw_panel.iloc[-24:, 0])['harmonic_position'].iloc[-1]
+    assert np.isclose(rolling.iloc[-1, 0], last, atol=1e-10), "Rolling mode not causal"
+    
+    sliding = SlidingHarmonic(list(raw_panel.columns), window=24)
+    rows = pd.DataFrame([sliding.update(row.to_dict(), ts) for ts, row in raw_panel.iterrows()])
+    assert np.allclose(rows.values, rolling.values, atol=1e-8, equal_nan=True), "Sliding DFT mismatch"
+    
+    print(f"✓ Sliding DFT matches rolling harmonic position: {rows.shape}")
+except Exception as e:
+    print(f"✗ Rolling harmonic position failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 16] Testing multi-scale feature bank...")
+try:
+    raw_panel = pd.DataFrame(market_data)
+    bank = VCFNormalizer().feature_bank(raw_panel, ma_windows=[3, 12], roc_windows=[1, 6])
+    
+    assert bank.shape == (len(raw_panel), raw_panel.shape[1] * 4), "Unexpected bank shape"
+    assert bank.values.flags['C_CONTIGUOUS'], "Bank not contiguous"
+    
+    single = VCFNormalizer(ma_window=12, roc_window=6).dual_input_panel(raw_panel)
+    assert np.allclose(bank.xs(('position', 12), axis=1, level=['signal', 'window']).values,
+                       single.filter(like='_position').values, atol=1e-10), "Position mismatch"
+    assert np.allclose(bank.xs(('momentum', 6), axis=1, level=['signal', 'window']).values,
+                       single.filter(like='_momentum').values, atol=1e-10), "Momentum mismatch"
+    
+    print(f"✓ Feature bank matches single-scale normalizers: {bank.shape}")
+except Exception as e:
+    print(f"✗ Feature bank failed: {e}")
+    sys.exit(1)
+
+# Test 17: Raw metric loading in a process pool
+print("\n[TEST 17] Testing raw metric loading (serial vs process pool)...")
+try:
+    import io
+    import contextlib
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+    import normalize_metrics
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'data_raw')
+        os.makedirs(raw_dir)
+        month_ends = pd.date_range('2015-01-31', periods=60, freq='M')
+        for metric_id in ('CPI_US', 'UNRATE_US'):
+            values = np.round(100 + np.random.randn(60).cumsum(), 4).astype(object)
+            values[7] = ''   # missing observation
+            pd.DataFrame({'date': month_ends[::-1].strftime('%Y-%m-%d'), 'value': values}) \
+                .to_csv(os.path.join(raw_dir, f'{metric_id}.csv'), index=False)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            serial = normalize_metrics.load_raw_metrics(['CPI_US', 'UNRATE_US', 'MISSING'], max_workers=1,
+                                                        raw_dir=raw_dir)
+            pooled = normalize_metrics.load_raw_metrics(['CPI_US', 'UNRATE_US', 'MISSING'], max_workers=2,
+                                                        raw_dir=raw_dir)
+
+        assert serial['MISSING'] is None and pooled['MISSING'] is None, "Missing file should load as None"
+        for metric_id in ('CPI_US', 'UNRATE_US'):
+            series = serial[metric_id]
+            assert len(series) == 59 and series.index.is_monotonic_increasing
+            pd.testing.assert_series_equal(series, pooled[metric_id], check_freq=False)
+
+    print(f"✓ Process-pool loads match serial loads from the given raw dir")
+except Exception as e:
+    print(f"✗ Raw metric loading failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 18] Testing HP trend filter...")
+try:
+    raw_panel = pd.DataFrame(market_data)
+    normalizer = VCFNormalizer()
+    
+    two_sided = normalizer.hp_trend(raw_panel, lamb=1600)
+    n = len(raw_panel)
+    D = np.diff(np.eye(n), 2, axis=0)
+    dense = np.linalg.solve(np.eye(n) + 1600 * D.T @ D, raw_panel.values)
+    assert np.allclose(two_sided.values, dense, atol=1e-8), "Banded solve mismatch"
+    
+    # Causal trend at t = endpoint of the two-sided trend on data up to t
+    causal = normalizer.hp_trend(raw_panel, lamb=1600, causal=True)
+    expanding = normalizer.hp_trend(raw_panel.iloc[:60], lamb=1600)
+    assert np.allclose(causal.iloc[59].values, expanding.iloc[-1].values, atol=1e-8), \
+        "Causal trend mismatch"
+    
+    print(f"✓ HP trend (two-sided and causal) works: {causal.shape}")
+except Exception as e:
+    print(f"✗ HP trend failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 19] Testing as-of alignment of mixed frequencies...")
+try:
+    from vcf_normalization import align_asof
+    
+    days = pd.bdate_range('2000-01-03', periods=500)
+    quarters = pd.date_range('2000-01-01', periods=8, freq='QS')
+    mixed = {
+        'Yield': pd.Series(np.linspace(4.0, 5.0, len(days)), index=days),
+        'GDP': pd.Series(np.arange(1.0, 9.0), index=quarters),
+    }
+    aligned = align_asof(mixed, release_lags={'GDP': 30})
+    
+    assert aligned.index.equals(days), "Calendar should follow the daily series"
+    assert np.isnan(aligned.loc['2000-01-28', 'GDP']), "Look-ahead before release"
+    assert aligned.loc['2000-01-31', 'GDP'] == 1.0, "Q1 value not released on time"
+    assert aligned.loc['2000-04-28', 'GDP'] == 1.0, "Q2 value used before release"
+    assert aligned.loc['2000-05-01', 'GDP'] == 2.0, "Q2 value not carried forward"
+    
+    state = create_state_matrix(mixed, release_lags={'GDP': 30})
+    assert state.index[0] == pd.Timestamp('2000-01-31'), "State matrix starts before release"
+    
+    print(f"✓ As-of alignment works without look-ahead: {state.shape}")
+except Exception as e:
+    print(f"✗ As-of alignment failed: {e}")
+    sys.exit(1)
+
+# Test 20: Raw metric loading through the columnar store
+print("\n[TEST 20] Testing raw metric loading from the columnar cache...")
+try:
+    import io_utils
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'data_raw')
+        os.makedirs(raw_dir)
+        month_ends = pd.date_range('2015-01-31', periods=60, freq='M')
+        for metric_id in ('CPI_US', 'UNRATE_US'):
+            values = np.round(100 + np.random.randn(60).cumsum(), 4).astype(object)
+            values[7] = ''   # missing observation
+            pd.DataFrame({'date': month_ends[::-1].strftime('%Y-%m-%d'), 'value': values}) \
+                .to_csv(os.path.join(raw_dir, f'{metric_id}.csv'), index=False)
+
+        store_reads = []
+        read_series = normalize_metrics.read_series
+        with contextlib.redirect_stdout(io.StringIO()):
+            from_csv = normalize_metrics.load_raw_metrics(['CPI_US', 'UNRATE_US'], max_workers=1,
+                                                          raw_dir=raw_dir)
+            io_utils.build_store(raw_dir, normalize_metrics.store_dir_for(raw_dir))
+            normalize_metrics.read_series = lambda *a, **kw: store_reads.append(a[0]) or read_series(*a, **kw)
+            try:
+                from_store = normalize_metrics.load_raw_metrics(['CPI_US', 'UNRATE_US'], max_workers=1,
+                                                                raw_dir=raw_dir)
+            finally:
+                normalize_metrics.read_series = read_series
+            pooled = normalize_metrics.load_raw_metrics(['CPI_US', 'UNRATE_US'], max_workers=2,
+                                                        raw_dir=raw_dir)
+
+        assert store_reads == ['CPI_US', 'UNRATE_US'], f"Columnar cache not used: {store_reads}"
+        for metric_id, series in from_csv.items():
+            for other in (from_store[metric_id], pooled[metric_id]):
+                pd.testing.assert_series_equal(series, other, check_freq=False)
+
+    print(f"✓ Cached and CSV loads return the same series (store next to the raw dir)")
+except Exception as e:
+    print(f"✗ Columnar raw loading failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 21] Testing incremental FRED refresh against a local server...")
+try:
+    import os
+    import json
+    import tempfile
+    import threading
+    import urllib.parse
+    from pathlib import Path
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code', 'shared'))
+    import data_loader
+    data_loader.HTTP_CACHE = None  # every refresh must reach the stand-in server
+    data_loader.VINTAGE_STORE = None
+    
+    history = {f'2020-{m:02d}-01': float(m) for m in range(1, 13)}
+    requests_seen = []
+    
+    class StandInFRED(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+            requests_seen.append(query)
+            start = query.get('observation_start', '0000')
+            obs = [{'date': d, 'value': str(v)} for d, v in sorted(history.items()) if d >= start]
+            body = json.dumps({'count': len(obs), 'observations': obs}).encode()
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInFRED)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    data_loader.FRED_API_URL = f'http://127.0.0.1:{server.server_port}/fred'
+    meta = {'source': 'FRED', 'ticker': 'TEST', 'frequency': 'Monthly'}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        first = data_loader.refresh_metric('TEST_US', meta, raw_dir=tmp)
+        assert first['mode'] == 'full' and first['rows'] == 12, f"Initial load: {first}"
+        
+        history['2021-01-01'] = 13.0
+        second = data_loader.refresh_metric('TEST_US', meta, raw_dir=tmp)
+        assert second == {**second, 'mode': 'append', 'rows': 1}, f"Append: {second}"
+        assert requests_seen[-1]['observation_start'] == '2020-07-01', "Overlap window not requested"
+        
+        history['2020-10-01'] = 99.0
+        third = data_loader.refresh_metric('TEST_US', meta, raw_dir=tmp)
+        assert third['mode'] == 'revised', f"Revision not detected: {third}"
+        
+        stored = pd.read_csv(Path(tmp) / 'TEST_US.csv', index_col='date')['value']
+        assert len(stored) == 13 and stored['2020-10-01'] == 99.0, "Stored data incorrect"
+    server.shutdown()
+    
+    print(f"✓ Incremental refresh appends and patches revisions: {len(requests_seen)} requests")
+except Exception as e:
+    print(f"✗ Incremental refresh failed: {e}")
+    sys.exit(1)
+
+print("\n[TEST 22] Testing concurrent fetching against mock FRED/Yahoo servers...")
+try:
+    hits = {'fred': 0, 'yahoo': 0, 'failed_once': set()}
+    
+    class MockProviders(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            if url.path.startswith('/fred'):
+                hits['fred'] += 1
+                ticker = query['series_id']
+                if ticker == 'FLAKY' and ticker not in hits['failed_once']:
+                    hits['failed_once'].add(ticker)
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                obs = [{'date': f'2021-{m:02d}-01', 'value': str(m)} for m in range(1, 7)]
+                body = {'count': len(obs), 'observations': obs}
+            else:
+                hits['yahoo'] += 1
+                days = pd.bdate_range('2024-01-02', periods=5)
+                body = {'chart': {'error': None, 'result': [{
+                    'meta': {'gmtoffset': -18000},
+                    'timestamp': [int(d.timestamp()) + 14 * 3600 for d in days],
+                    'indicators': {'quote': [{'close': [100.0, 101.0, None, 103.0, 104.0]}],
+                                   'adjclose': [{'adjclose': [99.0, 100.0, None, 102.0, 103.0]}]},
+                }]}}
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(payload)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProviders)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f'http://127.0.0.1:{server.server_port}'
+    data_loader.FRED_API_URL = f'{root}/fred'
+    data_loader.YAHOO_CHART_URL = f'{root}/chart'
+    data_loader.BACKOFF_SECONDS = 0.01
+    data_loader._LIMITERS = {p: data_loader.RateLimiter(100.0) for p in ('FRED', 'YAHOO')}
+    
+    registry = {f'M{i}': {'source': 'FRED', 'ticker': f'S{i}', 'frequency': 'Monthly'} for i in range(6)}
+    registry['FLAKY_US'] = {'source': 'FRED', 'ticker': 'FLAKY', 'frequency': 'Monthly'}
+    registry['SPY_US'] = {'source': 'Yahoo', 'ticker': 'SPY', 'frequency': 'Daily'}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        results = data_loader.load_all_metrics(max_workers=4, registry=registry, raw_dir=tmp)
+        assert all(isinstance(r, dict) and r['mode'] == 'full' for r in results.values()), results
+        assert 'FLAKY' in hits['failed_once'], "Retry path not exercised"
+        
+        spy = pd.read_csv(Path(tmp) / 'SPY_US.csv', index_col='date')['value']
+        assert spy.index[0] == '2024-01-02' and spy.iloc[0] == 99.0, "Yahoo parse incorrect"
+        assert not any(f.endswith('.tmp') for f in os.listdir(tmp)), "Temp files left behind"
+    server.shutdown()
+    
+    print(f"✓ Concurrent fetch with retries works: {len(results)} metrics, "
+          f"{hits['fred']} FRED / {hits['yahoo']} Yahoo requests")
+except Exception as e:
+    print(f"✗ Concurrent fetching failed: {e}")
+    sys.exit(1)
+
+# Test 23: Resumable FRED category crawl
+print("\n[TEST 23] Testing the resumable FRED category crawl against a local server...")
+try:
+    import csv
+    import asyncio
+    import importlib.util
+    
+    spec = importlib.util.spec_from_file_location(
+        'economic_indicators', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'economic-ndicators.py'))
+    economic_indicators = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(economic_indicators)
+    economic_indicators.HTTP_CACHE = None
+    
+    # Category tree and overlapping series lists; one page fails on first request
+    category_children = {0: [1, 2], 1: [3], 2: [], 3: []}
+    category_series = {0: range(0, 3), 1: range(2, 7), 2: range(5, 10), 3: range(10, 15)}
+    failures = {('2', '2')}
+    requests_served = []
+    
+    class StandInCatalog(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_served.append(self.path)
+            url = urllib.parse.urlparse(self.path)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            cid = int(query['category_id'])
+            if (query['category_id'], query.get('offset')) in failures:
+                failures.discard((query['category_id'], query.get('offset')))
+                self.send_response(404)
+                self.end_headers()
+                return
+            if url.path.endswith('/category/children'):
+                payload = {'categories': [{'id': c} for c in category_children[cid]]}
+            else:
+                ids = list(category_series[cid])
+                offset, limit = int(query['offset']), int(query['limit'])
+                payload = {'count': len(ids),
+                           'seriess': [{'id': f'S{i}', 'title': f'Series {i}'} for i in ids[offset:offset + limit]]}
+            body = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    catalog_server = ThreadingHTTPServer(('127.0.0.1', 0), StandInCatalog)
+    threading.Thread(target=catalog_server.serve_forever, daemon=True).start()
+    catalog_url = f'http://127.0.0.1:{catalog_server.server_port}/fred'
+    expected_series = {f'S{i}' for i in range(15)}
+    
+    def crawl(out_path, sink=None, cache=None):
+        crawler = economic_indicators.FredCatalogCrawler(
+            'test-key', out_path, base_url=catalog_url, concurrency=3, rate=1000.0, page_limit=2, sink=sink,
+            cache=cache)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(crawler.run())
+        return crawler
+    
+    def stored_codes(out_path):
+        with open(out_path, newline='', encoding='utf-8') as f:
+            return [row['series_code'] for row in csv.DictReader(f)]
+    
+    checkpoint_seconds = economic_indicators.CHECKPOINT_SECONDS
+    economic_indicators.CHECKPOINT_SECONDS = 0.0   # checkpoint after every category
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, 'fred_catalog.csv')
+        first = crawl(out_path)
+        assert first.failed == 1 and 2 not in first.done, "Failed category should stay unfinished"
+        assert os.path.exists(first.checkpoint_path), "Checkpoint should survive an incomplete crawl"
+        
+        # Rows written after the last checkpoint are dropped on resume
+        with open(out_path, 'a', encoding='utf-8') as f:
+            f.write('FRED,FRED,TORN,partial row\n')
+        
+        replayed = []
+        second = crawl(out_path, sink=replayed.extend)
+        codes = stored_codes(out_path)
+        assert second.done == set(category_children), f"Categories not finished: {second.done}"
+        assert set(codes) == expected_series and len(codes) == len(expected_series), \
+            f"Unexpected series set: {sorted(codes)}"
+        assert {row[2] for row in replayed} == expected_series, "Sink missed restored rows"
+        assert not os.path.exists(second.checkpoint_path), "Checkpoint should be removed"
+        
+        # A crawler given its own cache serves a repeat crawl without requests
+        cache = economic_indicators.HttpCache(os.path.join(tmp, 'http_cache.sqlite'))
+        crawl(os.path.join(tmp, 'cached.csv'), cache=cache)
+        served = len(requests_served)
+        crawl(os.path.join(tmp, 'cached_again.csv'), cache=cache)
+        cache.close()
+        assert len(requests_served) == served, "Cached responses should not reach the server"
+        assert set(stored_codes(os.path.join(tmp, 'cached_again.csv'))) == expected_series
+    economic_indicators.CHECKPOINT_SECONDS = checkpoint_seconds
+    
+    print(f"✓ FRED crawl resumes after a failed category: {len(expected_series)} unique series")
+except Exception as e:
+    print(f"✗ FRED category crawl failed: {e}")
+    sys.exit(1)
+
+# Test 24: Streaming master registry
+print("\n[TEST 24] Testing the streaming master registry with stand-in providers...")
+try:
+    import itertools
+    
+    def catalog_row(source, code):
+        return {'source': source, 'dataset': 'TEST', 'series_code': code, 'series_name': f'{source} {code}'}
+    
+    def alpha_pages():
+        yield [catalog_row('Alpha', 'A1'), catalog_row('Alpha', 'A2')]
+        yield [catalog_row('Alpha', 'A2'), catalog_row('Alpha', 'A3')]
+    
+    def beta_pages():
+        yield [catalog_row('Alpha', 'A3'), catalog_row('Beta', 'B1')]   # overlaps Alpha
+    
+    def broken_pages():
+        yield [catalog_row('Broken', 'X1')]
+        raise RuntimeError("provider went away")
+    
+    stand_in_providers = {'Alpha': (alpha_pages, 'alpha_catalog.csv'),
+                          'Beta': (beta_pages, 'beta_catalog.csv'),
+                          'Broken': (broken_pages, 'broken_catalog.csv')}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        economic_indicators.OUTPUT_DIR = tmp
+        economic_indicators.FRED_API_KEY = 'test-key'
+        economic_indicators.FRED_API_URL = catalog_url
+        
+        # A previous run left a complete Broken catalog and a master with its rows
+        previous_broken = pd.DataFrame([catalog_row('Broken', f'X{i}') for i in (1, 2, 3)],
+                                       columns=economic_indicators.CATALOG_COLUMNS)
+        previous_broken.to_csv(os.path.join(tmp, 'broken_catalog.csv'), index=False)
+        with open(os.path.join(tmp, 'broken_catalog.csv')) as f:
+            previous_broken_text = f.read()
+        pd.concat([previous_broken, pd.DataFrame([catalog_row('Alpha', 'A0')])]).to_csv(
+            os.path.join(tmp, 'vcf_data_registry_master.csv'), index=False)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            master_path = economic_indicators.build_registry(stand_in_providers)
+        
+        master = pd.read_csv(master_path)
+        assert not master.duplicated(['source', 'dataset', 'series_code']).any(), "Duplicate keys in master"
+        assert set(master['series_code']) == {'A1', 'A2', 'A3', 'B1', 'X1', 'X2', 'X3'} | expected_series, \
+            f"Unexpected master rows: {sorted(master['series_code'])}"
+        catalog_rows = {name: len(pd.read_csv(os.path.join(tmp, name)))
+                        for name in ('alpha_catalog.csv', 'beta_catalog.csv', 'fred_catalog.csv')}
+        assert catalog_rows == {'alpha_catalog.csv': 4, 'beta_catalog.csv': 2,
+                                'fred_catalog.csv': len(expected_series)}, catalog_rows
+        with open(os.path.join(tmp, 'broken_catalog.csv')) as f:
+            assert f.read() == previous_broken_text, "A failed provider must keep its previous catalog"
+        assert not [p for p in os.listdir(tmp) if p.endswith('.tmp')], "Temporary file left behind"
+        
+        # Without a previous catalog, the failed source's rows come from the previous master
+        os.remove(os.path.join(tmp, 'broken_catalog.csv'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            economic_indicators.build_registry(stand_in_providers, fred=False)
+        rebuilt = pd.read_csv(master_path)
+        assert set(rebuilt.loc[rebuilt['source'] == 'Broken', 'series_code']) == {'X1', 'X2', 'X3'}
+        assert not os.path.exists(os.path.join(tmp, 'broken_catalog.csv'))
+        
+        # A writer failure stops the providers and surfaces instead of hanging
+        def endless_pages():
+            for i in itertools.count():
+                yield [catalog_row('Endless', f'E{i}')]
+        
+        def poison_pages():
+            for _ in range(3 * economic_indicators.PAGE_QUEUE_SIZE):
+                yield [42]   # not a row: the writer raises
+        
+        outcome = {}
+        def run_failing():
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    economic_indicators.build_registry(
+                        {'Endless': (endless_pages, None), 'Poison': (poison_pages, 'poison.csv')}, fred=False)
+            except Exception as e:
+                outcome['error'] = e
+        
+        failing = threading.Thread(target=run_failing, daemon=True)
+        failing.start()
+        failing.join(timeout=30)
+        assert not failing.is_alive(), "build_registry hung after a writer failure"
+        assert 'error' in outcome, "Writer failure was not raised"
+        assert set(pd.read_csv(master_path)['series_code']) == set(rebuilt['series_code']), \
+            "A failed build must not replace the master"
+        assert not [p for p in os.listdir(tmp) if p.endswith('.tmp')], "Aborted build left a temporary file"
+    
+    print(f"✓ Master registry deduplicates across providers and survives provider/writer failures: "
+          f"{len(master)} rows")
+except Exception as e:
+    print(f"✗ Streaming master registry failed: {e}")
+    sys.exit(1)
+
+# Test 25: Catalog search index
+print("\n[TEST 25] Testing the indexed catalog search...")
+try:
+    import catalog_index
+
+    catalog_rows = [
+        ('FRED', 'FRED', 'CPIAUCSL', 'Consumer Price Index for All Urban Consumers', 'Monthly',
+         'Index 1982-1984=100', 'Prices paid by urban consumers.', 90),
+        ('FRED', 'FRED', 'CPILFESL', 'Consumer Price Index Less Food and Energy', 'Monthly',
+         'Index 1982-1984=100', 'Core consumer prices.', 70),
+        ('FRED', 'FRED', 'MORTGAGE30US', '30-Year Fixed Rate Mortgage Average', 'Weekly',
+         'Percent', 'Deflated by the consumer price index.', 80),
+        ('FRED', 'FRED', 'DGS10', 'Market Yield on 10-Year Treasury', 'Daily',
+         'Percent', 'Constant maturity yield.', 95),
+        ('OECD', 'PRICES', 'PRICES_CPI', 'Consumer price index (CPI)', 'Monthly', '', 'OECD CPI dataflow.', None),
+    ]
+    catalog_df = pd.DataFrame([r[:7] + ('', 'True', json.dumps({'popularity': r[7]} if r[7] else {}))
+                               for r in catalog_rows],
+                              columns=catalog_index.COLUMNS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        master_csv = Path(tmp) / 'master.csv'
+        db_path = Path(tmp) / 'catalog.sqlite'
+        catalog_df.to_csv(master_csv, index=False)
+        assert catalog_index.build_catalog_index(master_csv, db_path) == len(catalog_rows)
+        assert catalog_index.build_catalog_index(master_csv, db_path) == -1, "Fresh index rebuilt"
+
+        catalog = catalog_index.CatalogIndex(db_path)
+        hits = catalog.search('consumer price index')
+        assert set(hits['series_code'][:3]) == {'PRICES_CPI', 'CPIAUCSL', 'CPILFESL'}, hits
+        assert hits['score'][:3].is_monotonic_increasing, "Title matches not ranked"
+        assert hits['series_code'].iloc[-1] == 'MORTGAGE30US' and pd.isna(hits['score'].iloc[-1]), \
+            "Notes-only match should follow title matches"
+
+        hits = catalog.search('consumer price', source='fred', units=['index 1982-1984=100'])
+        assert set(hits['series_code']) == {'CPIAUCSL', 'CPILFESL'}, "Filters not applied"
+        assert catalog.search('S&P (500)').empty, "Punctuation must not break the query"
+        assert list(catalog.search(frequency='Percent')['series_code']) == []
+        assert list(catalog.search(units='percent')['series_code']) == ['DGS10', 'MORTGAGE30US'], \
+            "Filter-only results should be most popular first"
+
+        registry_path = Path(tmp) / 'registry.json'
+        registry_path.write_text(json.dumps({'DGS10_US': {'source': 'FRED', 'ticker': 'DGS10'}}))
+        added = catalog.add_to_registry(catalog.search('treasury yield').head(1), category='Liquidity',
+                                        registry_path=registry_path)
+        assert added == [], "Series already in the registry must be skipped"
+        added = catalog.add_to_registry(hits.head(1), category='Macro', tags='inflation macro',
+                                        registry_path=registry_path, metric_ids=['CPI_URBAN_US'])
+        entry = json.loads(registry_path.read_text())['CPI_URBAN_US']
+        assert entry['ticker'] == 'CPIAUCSL' and entry['release_lag_days'] == 45, entry
+        catalog.close()
+
+    print(f"✓ Catalog search works: ranked matches, filters, registry additions")
+except Exception as e:
+    print(f"✗ Catalog search failed: {e}")
+    sys.exit(1)
+
+# Test 26: HTTP response cache
+print("\n[TEST 26] Testing the conditional-request HTTP cache...")
+try:
+    import http_cache
+    
+    served = {'etag': '"v1"', 'value': '1.5', 'full': 0, 'not_modified': 0}
+    
+    class ETagFRED(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get('If-None-Match') == served['etag']:
+                served['not_modified'] += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            served['full'] += 1
+            body = json.dumps({'count': 1, 'observations': [{'date': '2024-01-01', 'value': served['value']}]})
+            self.send_response(200)
+            self.send_header('ETag', served['etag'])
+            self.end_headers()
+            self.wfile.write(body.encode())
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ETagFRED)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    data_loader.FRED_API_URL = f'http://127.0.0.1:{server.server_port}/fred'
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / 'http.sqlite'
+        data_loader.HTTP_CACHE = http_cache.HttpCache(cache_path)
+        first = data_loader.fetch_fred_series('TEST')
+        second = data_loader.fetch_fred_series('TEST')
+        assert served['full'] == 1 and data_loader.HTTP_CACHE.stats()['hits'] == 1, "Fresh reply not reused"
+        assert second['value'].equals(first['value']), "Cached reply differs"
+        data_loader.HTTP_CACHE.close()
+        
+        # Expired entries are revalidated: 304 keeps the body, a new ETag replaces it
+        data_loader.HTTP_CACHE = http_cache.HttpCache(cache_path, ttls={'fred': 0})
+        assert data_loader.fetch_fred_series('TEST')['value'].iloc[0] == 1.5
+        served.update(etag='"v2"', value='2.5')
+        assert data_loader.fetch_fred_series('TEST')['value'].iloc[0] == 2.5
+        stats = data_loader.HTTP_CACHE.stats()
+        assert served['not_modified'] == 1 and stats['revalidated'] == 1 and stats['misses'] == 1, stats
+        data_loader.HTTP_CACHE.close()
+        
+        # Least recently used replies are evicted first; credentials never reach the key
+        lru = http_cache.HttpCache(Path(tmp) / 'lru.sqlite', max_bytes=250)
+        send = lambda headers: (200, {}, b'x' * 100)
+        for name in ('a', 'b', 'a', 'c'):
+            lru.fetch(f'http://host/{name}?api_key=SECRET', send)
+        assert lru.lookup('http://host/a') is not None and lru.lookup('http://host/b') is None
+        assert lru.stats()['evictions'] == 1 and lru.stats()['entries'] == 2, lru.stats()
+        assert http_cache.cache_key('http://h/p?b=2&api_key=K', {'a': 1}) == 'http://h/p?a=1&b=2'
+        lru.close()
+    data_loader.HTTP_CACHE = None
+    server.shutdown()
+    
+    print(f"✓ HTTP cache works: fresh hits, 304 revalidation, LRU eviction")
+except Exception as e:
+    print(f"✗ HTTP cache failed: {e}")
+    sys.exit(1)
+
+# Test 27: Point-in-time vintage store
+print("\n[TEST 27] Testing the point-in-time vintage store...")
+try:
+    import vintage_store
+    
+    # ALFRED-style history: Q1 first printed 1.0, revised to 1.2; Q2 printed 2.0
+    alfred = [('2020-01-01', '1.0', '2020-04-29', '2020-05-28'),
+              ('2020-01-01', '1.2', '2020-05-28', '9999-12-31'),
+              ('2020-04-01', '2.0', '2020-07-30', '9999-12-31')]
+    
+    class StandInALFRED(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+            assert query['realtime_end'] == '9999-12-31'
+            obs = [dict(zip(('date', 'value', 'realtime_start', 'realtime_end'), row)) for row in alfred]
+            body = json.dumps({'count': len(obs), 'observations': obs}).encode()
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInALFRED)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    data_loader.FRED_API_URL = f'http://127.0.0.1:{server.server_port}/fred'
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = vintage_store.VintageStore(Path(tmp) / 'vintages')
+        result = data_loader.backfill_vintage('GDP_US', {'source': 'FRED', 'ticker': 'GDP'}, store)
+        assert result == {'mode': 'alfred', 'records': 3}, result
+        assert data_loader.backfill_vintage('GDP_US', {'source': 'FRED', 'ticker': 'GDP'}, store)['records'] == 0
+        
+        assert store.series_as_of('GDP_US', '2020-04-28').empty, "Value visible before its release"
+        assert store.series_as_of('GDP_US', '2020-05-01').tolist() == [1.0], "First print not served"
+        assert store.series_as_of('GDP_US', '2020-08-01').tolist() == [1.2, 2.0], "Revision not applied"
+        
+        # Release-lag approximation for a source without vintages
+        raw = Path(tmp) / 'raw'
+        raw.mkdir()
+        pd.DataFrame({'date': ['2020-03-31', '2020-06-30'], 'value': [10.0, 11.0]}) \
+            .to_csv(raw / 'SPY_US.csv', index=False)
+        data_loader.backfill_vintage('SPY_US', {'source': 'Yahoo', 'release_lag_days': 1}, store, raw)
+        
+        panel = store.panel_as_of('2020-07-15', calendar=pd.date_range('2020-01-31', '2020-12-31', freq='M'))
+        assert list(panel.columns) == ['GDP_US', 'SPY_US'] and panel.index[-1] == pd.Timestamp('2020-06-30')
+        assert panel['GDP_US'].tolist() == [1.2] * 6, "Q2 GDP was not released until July 30"
+        assert pd.isna(panel['SPY_US'].iloc[1]) and panel['SPY_US'].iloc[-1] == 11.0, panel
+        
+        # Snapshots log only changed observations; the old vintage stays queryable
+        spy = pd.Series([10.0, 11.5], index=pd.to_datetime(['2020-03-31', '2020-06-30']))
+        assert store.record_snapshot('SPY_US', spy, as_of='2020-09-01') == 1
+        assert store.series_as_of('SPY_US', '2020-08-31').iloc[-1] == 11.0
+        assert store.series_as_of('SPY_US', '2020-09-01').iloc[-1] == 11.5
+        
+        # A torn trailing segment is ignored and replaced by the next append
+        with open(store.path('SPY_US'), 'ab') as f:
+            f.write(vintage_store.MAGIC + b'\x09' + b'\x00' * 10)
+        assert len(store.index('SPY_US')) == 3
+        assert store.record_snapshot('SPY_US', spy * 2, as_of='2020-10-01') == 2
+        assert store.compact('SPY_US') == 5 and store.series_as_of('SPY_US', '2020-09-15').iloc[-1] == 11.5
+    server.shutdown()
+    
+    print(f"✓ Vintage store works: ALFRED backfill, as-of panels, snapshot revisions")
+except Exception as e:
+    print(f"✗ Vintage store failed: {e}")
+    sys.exit(1)
+
+# Test 28: Content-hash build graph
+print("\n[TEST 28] Testing the content-hash pipeline build graph...")
+try:
+    import io
+    import warnings
+    import contextlib
+    
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+    import build_graph
+    
+    graph_registry = {
+        'GDP_US': {'source': 'FRED', 'category': 'Macro', 'frequency': 'Monthly',
+                   'normalization': 'growth_positive', 'direction': '+'},
+        'M2_US': {'source': 'FRED', 'category': 'Liquidity', 'frequency': 'Monthly',
+                  'normalization': 'zscore_rolling', 'direction': '+'},
+        'VIX_US': {'source': 'CBOE', 'category': 'Volatility', 'frequency': 'Monthly',
+                   'normalization': 'zscore', 'direction': '-'},
+        'SPY_US': {'source': 'Yahoo', 'category': 'Equities', 'frequency': 'Monthly',
+                   'normalization': 'zscore_rolling', 'direction': '+'},
+    }
+    
+    def build(base):
+        graph = build_graph.pipeline_graph(base)
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            status = graph.run(max_workers=4)
+        assert not graph.errors, graph.errors
+        return {name for name, s in status.items() if s == 'built'}
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        (base / 'registry').mkdir()
+        (base / 'data_raw').mkdir()
+        (base / 'registry' / 'vcf_metric_registry.json').write_text(json.dumps(graph_registry))
+        month_ends = pd.date_range('2010-01-31', periods=120, freq='M')
+        for i, metric_id in enumerate(graph_registry):
+            pd.DataFrame({'date': month_ends.strftime('%Y-%m-%d'),
+                          'value': 100 + np.random.randn(120).cumsum()}) \
+                .to_csv(base / 'data_raw' / f'{metric_id}.csv', index=False)
+        
+        assert len(build(base)) == 8, "First build should run every stage"
+        assert (base / 'vcf_output' / 'regimes.csv').exists() and (base / 'geometry').exists()
+        assert build(base) == set(), "Nothing changed, nothing should rebuild"
+        
+        os.utime(base / 'data_raw' / 'GDP_US.csv', ns=(1, 1))
+        assert build(base) == set(), "A new mtime alone must not trigger a rebuild"
+        
+        with open(base / 'data_raw' / 'SPY_US.csv', 'a') as f:
+            f.write('2020-01-31,123.0\n')
+        rebuilt = build(base)
+        assert rebuilt == {'normalize:SPY_US', 'normalized_panel', 'geometry'}, rebuilt
+        
+        batched = build_graph.normalize_metrics.normalize_metrics(
+            {'SPY_US': graph_registry['SPY_US']},
+            {'SPY_US': build_graph.normalize_metrics.load_raw_metric('SPY_US', str(base / 'data_raw'))})
+        single = pd.read_csv(base / 'data_clean' / 'SPY_US_normalized.csv', index_col=0, parse_dates=True)
+        assert np.allclose(single['norm'], batched['SPY_US']['norm'], equal_nan=True)
+    
+    print(f"✓ Build graph works: stale-only rebuilds, content-hash cutoff, per-metric tasks")
+except Exception as e:
+    print(f"✗ Build graph failed: {e}")
+    sys.exit(1)
+
+# Test 29: Band filter bank and batched band coherence
+print("\n[TEST 29] Testing the band filter bank and batched band coherence...")
+try:
+    from scipy.signal import butter, coherence
+    from vcf_advanced_math import BandFilterBank, HarmonicCoherence, _welch_coherence_tensor
+
+    rng = np.random.default_rng(3)
+    common = rng.standard_normal(600).cumsum()
+    band_panel = np.column_stack([common + rng.standard_normal(600),
+                                  0.5 * common + rng.standard_normal(600),
+                                  rng.standard_normal(600)])
+
+    # One tensor pass equals scipy's pairwise estimator
+    freqs, coh = _welch_coherence_tensor(band_panel)
+    f_ref, coh_ref = coherence(band_panel[:, 0], band_panel[:, 2], fs=1.0, nperseg=256)
+    assert np.allclose(freqs, f_ref) and np.allclose(coh[:, 0, 2], coh_ref, atol=1e-12), \
+        "Coherence tensor differs from scipy.signal.coherence"
+
+    # Band edges pick the filter type
+    bank = BandFilterBank(order=2)
+    for band, reference in [((0, 0.2), butter(2, 0.2, btype='lowpass', fs=1.0, output='sos')),
+                            ((0.1, 0.5), butter(2, 0.1, btype='highpass', fs=1.0, output='sos')),
+                            ((0.05, 0.2), butter(2, [0.05, 0.2], btype='bandpass', fs=1.0, output='sos'))]:
+        assert np.allclose(bank.design(band), reference), f"Wrong filter for band {band}"
+    try:
+        bank.design((0, 0.5))
+        raise AssertionError("A full-spectrum band should be rejected")
+    except ValueError:
+        pass
+
+    # Designs are cached per (band, fs, order) and reused across calls
+    bank.clear()
+    bands = {'fast': (0.1, 0.5), 'cycle': (0.02, 0.1), 'slow': (0, 0.02)}
+    first = HarmonicCoherence.band_coherence_matrices(band_panel, bands, filter_bank=bank)
+    designs = dict(bank._cache)
+    second = HarmonicCoherence.band_coherence_matrices(band_panel, bands, filter_bank=bank)
+    assert set(designs) == {(lo, hi, 1.0, 2) for lo, hi in bands.values()}, sorted(designs)
+    assert all(bank._cache[key] is sos for key, sos in designs.items()), "Filter designs were rebuilt"
+    assert all(np.array_equal(first[b]['mean_coherence'], second[b]['mean_coherence']) for b in bands)
+
+    pair = HarmonicCoherence.frequency_band_coherence(band_panel[:, 0], band_panel[:, 1], bands)
+    assert np.isclose(pair['cycle']['mean_coherence'], first['cycle']['mean_coherence'][0, 1])
+
+    print(f"✓ Coherence tensor matches scipy and filter designs are cached: {len(designs)} bands")
+except Exception as e:
+    print(f"✗ Band coherence failed: {e}")
+    sys.exit(1)
+
+# Test 30: Shared panel decompositions
+print("\n[TEST 30] Testing the shared panel decomposition cache...")
+try:
+    from sklearn.decomposition import PCA
+    import vcf_decomposition
+    from vcf_decomposition import decomposition_for, panel_fingerprint
+
+    vcf_decomposition.clear_decomposition_cache()
+    decomposition_panel = pd.DataFrame(market_data).iloc[:, :4].copy()
+
+    # Callers holding equal panels share one decomposition
+    first = decomposition_for(decomposition_panel)
+    assert decomposition_for(decomposition_panel.copy()) is first, "Equal panels should share a decomposition"
+
+    # Editing one cell changes the fingerprint and yields a fresh decomposition
+    before = panel_fingerprint(decomposition_panel)
+    decomposition_panel.iloc[10, 2] += 1.0
+    assert panel_fingerprint(decomposition_panel) != before, "Fingerprint ignored an edited cell"
+    edited = decomposition_for(decomposition_panel)
+    assert edited is not first and edited.values[10, 2] == decomposition_panel.iloc[10, 2]
+    assert not first.values.flags.writeable, "Cached snapshot should be read-only"
+
+    # Only the most recent panels are kept
+    for shift in range(vcf_decomposition._MAX_CACHED_PANELS):
+        decomposition_for(decomposition_panel + shift + 1)
+    assert decomposition_for(decomposition_panel) is not edited, "Oldest panel should be evicted"
+
+    # PCA scores equal sklearn's up to the sign of each component
+    scores = decomposition_for(decomposition_panel).pca_scores(3)
+    reference = PCA(n_components=3).fit_transform(decomposition_panel.values)
+    signs = np.sign((scores * reference).sum(axis=0))
+    assert np.allclose(scores, reference * signs, atol=1e-8), "PCA scores differ from sklearn"
+
+    print(f"✓ Decompositions are shared, invalidated on edit and match sklearn PCA: {scores.shape}")
+except Exception as e:
+    print(f"✗ Decomposition cache failed: {e}")
+    sys.exit(1)
+
+# Test 31: Grouped recipe normalization against the per-metric path
+print("\n[TEST 31] Testing grouped recipe normalization against per-metric normalization...")
+try:
+    def per_metric_reference(raw_dir, metric_id, info):
+        """The per-metric normalize_metric() the recipe groups replaced."""
+        df = pd.read_csv(os.path.join(raw_dir, f'{metric_id}.csv'))
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        df = df.dropna(subset=['date']).set_index('date').sort_index()[['value']].copy()
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        df = df.dropna(subset=['value'])
+        freq = info.get('frequency', 'Daily')
+        if info.get('normalization') == 'growth_positive':
+            df['value'] = df['value'].pct_change(periods=normalize_metrics.infer_growth_periods(freq))
+            norm = normalize_metrics.zscore(df['value'])
+        elif info.get('normalization') == 'zscore_rolling':
+            norm = normalize_metrics.rolling_zscore(df['value'], window=normalize_metrics.infer_window(freq))
+        else:
+            norm = normalize_metrics.zscore(df['value'])
+        df['norm'] = -norm if info.get('direction', '+') == '-' else norm
+        return df
+
+    recipe_registry = {
+        'SPX_LONG': {'normalization': 'zscore_rolling', 'frequency': 'Daily'},
+        'SPX_SHORT': {'normalization': 'zscore_rolling', 'frequency': 'Daily'},   # shorter than 252
+        'CPI_GROWTH': {'normalization': 'growth_positive', 'frequency': 'Monthly', 'direction': '-'},
+        'NEW_GROWTH': {'normalization': 'growth_positive', 'frequency': 'Monthly'},   # < 12 obs
+        'GDP_LEVEL': {'normalization': 'zscore', 'frequency': 'Quarterly'},
+        'SPREAD': {'normalization': 'inverse_zscore', 'frequency': 'Daily', 'direction': '-'},
+        'EMPTY': {'normalization': 'zscore', 'frequency': 'Daily'},   # every value missing
+        'FLAT': {'normalization': 'zscore', 'frequency': 'Monthly'},
+        'ODD': {'normalization': 'minmax', 'frequency': 'Monthly'},   # unknown -> z-score
+        'CLAIMS': {'normalization': 'zscore_rolling', 'frequency': 'Monthly'},
+    }
+    rng = np.random.default_rng(36)
+    recipe_dates = {
+        'SPX_LONG': pd.bdate_range('2018-01-01', periods=400),
+        'SPX_SHORT': pd.bdate_range('2019-06-03', periods=100),
+        'CPI_GROWTH': pd.date_range('2010-01-31', periods=90, freq='M'),
+        'NEW_GROWTH': pd.date_range('2020-01-31', periods=10, freq='M'),
+        'GDP_LEVEL': pd.date_range('2005-03-31', periods=40, freq='Q'),
+        'SPREAD': pd.bdate_range('2018-03-01', periods=300),
+        'EMPTY': pd.bdate_range('2018-01-01', periods=20),
+        'FLAT': pd.date_range('2015-01-31', periods=24, freq='M'),
+        'ODD': pd.date_range('2012-01-31', periods=50, freq='M'),
+        'CLAIMS': pd.date_range('2012-01-31', periods=80, freq='M'),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'data_raw')
+        os.makedirs(raw_dir)
+        for metric_id, dates in recipe_dates.items():
+            values = np.round(100 + rng.standard_normal(len(dates)).cumsum(), 4).astype(object)
+            if metric_id == 'EMPTY':
+                values[:] = ''
+            elif metric_id == 'FLAT':
+                values[:] = 5.0
+            else:
+                values[3] = ''   # one missing observation
+            pd.DataFrame({'date': dates[::-1].strftime('%Y-%m-%d'), 'value': values[::-1]}) \
+                .to_csv(os.path.join(raw_dir, f'{metric_id}.csv'), index=False)
+
+        reference = {m: per_metric_reference(raw_dir, m, info) for m, info in recipe_registry.items()}
+        raw_dir_default = normalize_metrics.RAW_DIR
+        with contextlib.redirect_stdout(io.StringIO()):
+            raw = normalize_metrics.load_raw_metrics(recipe_registry, max_workers=1, raw_dir=raw_dir)
+            grouped = normalize_metrics.normalize_metrics(recipe_registry, raw)
+            normalize_metrics.RAW_DIR = raw_dir
+            try:
+                single = {m: normalize_metrics.normalize_metric(m, info) for m, info in recipe_registry.items()}
+            finally:
+                normalize_metrics.RAW_DIR = raw_dir_default
+
+    assert list(grouped) == [m for m in recipe_registry if m != 'EMPTY'], list(grouped)
+    assert reference['EMPTY'].empty and single['EMPTY'].empty, "An all-NaN series should be skipped"
+    for metric_id in grouped:
+        for result in (grouped[metric_id], single[metric_id]):
+            pd.testing.assert_frame_equal(result, reference[metric_id], check_names=False,
+                                          check_freq=False, atol=1e-10)
+    assert grouped['SPX_SHORT']['norm'].isna().all() and grouped['NEW_GROWTH']['norm'].isna().all()
+    assert grouped['FLAT']['norm'].isna().all()
+
+    # The single-scatter panel equals the old outer-join loop
+    joined = None
+    for metric_id, df in reference.items():
+        if not df.empty:
+            column = df['norm'].rename(metric_id).to_frame()
+            joined = column if joined is None else joined.join(column, how='outer')
+    pd.testing.assert_frame_equal(normalize_metrics.assemble_panel(grouped), joined.sort_index(),
+                                  check_names=False, check_freq=False, atol=1e-10)
+
+    print(f"✓ Recipe groups match per-metric normalization for {len(grouped)} metrics")
+except Exception as e:
+    print(f"✗ Grouped recipe normalization failed: {e}")
+    sys.exit(1)
+
+# Test 32: Macro panel period buckets against resample().last()
+print("\n[TEST 32] Testing macro panel period buckets against resample().last()...")
+try:
+    import build_macro_panel
+
+    rng = np.random.default_rng(40)
+    daily_dates = pd.bdate_range('2020-01-01', periods=300)
+    daily = pd.Series(rng.standard_normal(300), index=daily_dates)
+    daily.iloc[50:80] = np.nan        # a month without values
+    daily.iloc[120] = np.nan          # NaN as a period's last observation
+    daily = daily.drop(daily_dates[150:200])   # dates missing altogether
+    monthly_dates = pd.date_range('2019-11-30', periods=14, freq='M')
+    monthly = pd.Series(rng.standard_normal(14), index=monthly_dates)
+    monthly.iloc[4] = np.nan
+    monthly = monthly.drop(monthly_dates[6:8])
+
+    for freq in ('M', 'W', 'Q'):
+        bucketed = build_macro_panel.bucket_panel({'daily': daily, 'monthly': monthly}, freq)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            expected = daily.resample(freq).last().rename('daily').to_frame().join(
+                monthly.resample(freq).last().rename('monthly'), how='outer').dropna(how='all')
+        pd.testing.assert_frame_equal(bucketed, expected, check_names=False, check_freq=False)
+
+    print(f"✓ Period buckets match resample().last() with an outer join for M/W/Q")
+except Exception as e:
+    print(f"✗ Macro panel buckets failed: {e}")
+    sys.exit(1)
+
+# Test 33: Columnar store round trip
+print("\n[TEST 33] Testing the columnar store round trip (build, memory-map, freshness)...")
+try:
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'data_raw')
+        store_dir = os.path.join(tmp, 'data_store')
+        os.makedirs(raw_dir)
+
+        # date,value layout: unsorted, one missing value, one unparseable date
+        plain_path = os.path.join(raw_dir, 'UNRATE.csv')
+        with open(plain_path, 'w') as f:
+            f.write('date,value\n2020-03-01,4.4\n2020-01-01,3.6\nnot a date,9.9\n2020-02-01,\n2020-04-01,14.8\n')
+        # yfinance export with a ticker row under the header
+        yahoo_path = os.path.join(raw_dir, 'sp500.csv')
+        with open(yahoo_path, 'w') as f:
+            f.write('date,Close,High,Low,Open,Volume\n,^GSPC,^GSPC,^GSPC,^GSPC,^GSPC\n'
+                    '2020-01-02,3257.85,3258.14,3235.53,3244.67,3458250000\n'
+                    '2020-01-03,3234.85,3246.15,3222.34,3226.36,3461290000\n')
+        # header only
+        with open(os.path.join(raw_dir, 'NEW.csv'), 'w') as f:
+            f.write('date,value\n')
+
+        assert io_utils.build_store(raw_dir, store_dir) == {'NEW': 'converted', 'UNRATE': 'converted',
+                                                            'sp500': 'converted'}
+        assert io_utils.build_store(raw_dir, store_dir) == {'NEW': 'fresh', 'UNRATE': 'fresh',
+                                                            'sp500': 'fresh'}
+        assert not [p for p in os.listdir(store_dir) if p.endswith('.tmp')], "Temporary file left behind"
+
+        # Memory-mapped reads equal the parsed CSV
+        plain = pd.read_csv(plain_path)
+        plain['date'] = pd.to_datetime(plain['date'], errors='coerce')
+        plain = plain.dropna(subset=['date']).set_index('date').sort_index()['value']
+        stored = io_utils.read_series('UNRATE', store_dir=store_dir)
+        pd.testing.assert_series_equal(stored, plain, check_freq=False)
+        dates, values, columns = io_utils.read_store_file(io_utils.store_path('UNRATE', store_dir))
+        assert isinstance(values, np.memmap) and not values.flags.writeable, "Store should be a read-only map"
+        assert columns == ['value'] and np.isnan(values[0, 1]), "Missing value should stay NaN"
+
+        close = pd.read_csv(yahoo_path, skiprows=[1], index_col='date', parse_dates=True)['Close']
+        pd.testing.assert_series_equal(io_utils.read_series('sp500', store_dir=store_dir), close,
+                                       check_names=False, check_freq=False)
+        assert io_utils.read_store_file(io_utils.store_path('sp500', store_dir))[2] == \
+            ['Close', 'High', 'Low', 'Open', 'Volume']
+        assert io_utils.read_series('NEW', store_dir=store_dir).empty
+
+        # Touching the CSV (same size, new mtime) makes its copy stale
+        store_file = io_utils.store_path('UNRATE', store_dir)
+        assert io_utils.is_fresh(plain_path, store_file)
+        stat = os.stat(plain_path)
+        os.utime(plain_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert not io_utils.is_fresh(plain_path, store_file), "Touched CSV should make the store stale"
+        assert io_utils.build_store(raw_dir, store_dir)['UNRATE'] == 'converted'
+        assert io_utils.is_fresh(plain_path, store_file)
+
+    print(f"✓ Store files round-trip plain and yfinance CSVs and go stale when the CSV changes")
+except Exception as e:
+    print(f"✗ Columnar store round trip failed: {e}")
+    sys.exit(1)
+
+# Test 34: Lazy registry-backed panel
+print("\n[TEST 34] Testing the lazy registry-backed panel against an eager concat...")
+try:
+    lazy_registry = {
+        'FEDFUNDS': {'category': 'Rates', 'tags': 'rates policy', 'source': 'FRED', 'frequency': 'Monthly'},
+        'DGS10': {'category': 'Rates', 'tags': 'rates curve', 'source': 'FRED', 'frequency': 'Daily'},
+        'M2': {'category': 'Liquidity', 'tags': 'money', 'source': 'FRED', 'frequency': 'Monthly'},
+        'SPY': {'category': 'Equity', 'tags': 'risk', 'source': 'Yahoo', 'frequency': 'Daily'},
+        'GHOST': {'category': 'Rates', 'tags': 'rates', 'source': 'FRED', 'frequency': 'Daily'},   # no file
+    }
+    lazy_dates = {'FEDFUNDS': pd.date_range('2015-01-01', periods=96, freq='MS'),
+                  'DGS10': pd.bdate_range('2019-07-01', periods=600),   # starts inside the range
+                  'M2': pd.date_range('2016-01-01', periods=90, freq='MS'),
+                  'SPY': pd.bdate_range('2017-01-02', periods=1500)}
+    rng = np.random.default_rng(42)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_dir = os.path.join(tmp, 'data_raw')
+        store_dir = os.path.join(tmp, 'data_store')
+        os.makedirs(raw_dir)
+        for metric_id, dates in lazy_dates.items():
+            values = np.round(rng.standard_normal(len(dates)).cumsum(), 4).astype(object)
+            values[5] = ''
+            pd.DataFrame({'date': dates.strftime('%Y-%m-%d'), 'value': values}) \
+                .to_csv(os.path.join(raw_dir, f'{metric_id}.csv'), index=False)
+        io_utils.build_store(raw_dir, store_dir)
+
+        def eager(metric_ids, start=None, end=None):
+            frame = pd.concat([pd.read_csv(os.path.join(raw_dir, f'{m}.csv'), index_col='date',
+                                           parse_dates=True)['value'].rename(m) for m in metric_ids], axis=1)
+            return frame.loc[start:end]
+
+        panel = io_utils.LazyPanel(lazy_registry, store_dir=store_dir)
+        assert panel.select(category='rates').metric_ids == ['FEDFUNDS', 'DGS10', 'GHOST']
+        assert panel.select(tags=['curve', 'money']).metric_ids == ['DGS10', 'M2']
+        assert panel.select(source='yahoo').metric_ids == ['SPY']
+        assert panel.select(frequency=['MONTHLY']).select(tags='rates').metric_ids == ['FEDFUNDS']
+        assert panel.select(metrics=['spy', 'M2']).metric_ids == ['M2', 'SPY']
+
+        # Partial dates cover whole periods; DGS10 starts after the range does
+        query = panel.select(tags='rates').between('2019', '2020-06')
+        assert query.start == pd.Timestamp('2019-01-01')
+        assert query.end == pd.Timestamp('2020-06-30 23:59:59.999999999')
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            lazy = query.to_frame()
+        assert 'GHOST' in log.getvalue(), "A metric without a store file should be reported"
+        pd.testing.assert_frame_equal(lazy, eager(['FEDFUNDS', 'DGS10'], '2019-01-01', '2020-06-30'),
+                                      check_names=False, check_freq=False)
+        assert lazy['DGS10'].first_valid_index() == lazy_dates['DGS10'][0]
+
+        pd.testing.assert_frame_equal(panel.select(category=['equity', 'liquidity']).to_frame(),
+                                      eager(['M2', 'SPY']), check_names=False, check_freq=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            early = panel.select(source='FRED').between(end='2016-03-01').to_frame()
+        pd.testing.assert_frame_equal(early, eager(['FEDFUNDS', 'DGS10', 'M2'], end='2016-03-01'),
+                                      check_names=False, check_freq=False)
+        assert panel.select(tags='none').to_frame().empty
+
+    print(f"✓ Lazy panel selections and date ranges match an eager concat: {lazy.shape}")
+except Exception as e:
+    print(f"✗ Lazy panel failed: {e}")
+    sys.exit(1)
+
 # Summary
 print("\n" + "=" * 70)
 print("ALL TESTS PASSED ✓")
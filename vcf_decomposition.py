@@ -0,0 +1,187 @@
+"""
+VCF Decomposition Cache
+=======================
+
+Shared linear-algebra decompositions of a market panel.
+
+PCA projections, explained-variance tables and Dynamic Mode Decomposition
+all start from the same few factorizations of the (T × N) panel. Computing
+them separately means re-centering and re-running an SVD for every call.
+This module computes each factorization once per panel and serves every
+consumer from it.
+
+Mathematical Framework:
+----------------------
+Centered panel: X̃ = X - μ,  thin SVD X̃ = U Σ Vᵀ
+
+- Covariance eigenvalues:  λᵢ = σᵢ² / (T - 1)   (same as eigh(np.cov(X)))
+- Principal axes:          rows of Vᵀ
+- PCA scores:              U Σ
+
+Snapshot matrix (DMD): X₁ = [x₀ … x_{T-2}]  (N × T-1, uncentered)
+- Reduced basis:           thin SVD X₁ = U_r Σ_r V_rᵀ
+
+Caching:
+--------
+Decompositions are keyed by a content fingerprint of the panel (values,
+index and columns). Editing the panel changes its fingerprint, so the next
+lookup computes fresh factorizations instead of serving stale ones.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import svd
+
+
+def panel_fingerprint(panel: pd.DataFrame) -> str:
+    """
+    Content hash of a panel's values, index and columns.
+
+    Parameters:
+    -----------
+    panel : pd.DataFrame
+        Market panel
+
+    Returns:
+    --------
+    str: hex digest that changes whenever the panel changes
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(panel.shape).encode())
+    h.update(np.ascontiguousarray(panel.values, dtype=float).tobytes())
+    h.update(pd.util.hash_pandas_object(panel.index, index=False).values.tobytes())
+    h.update(repr(list(panel.columns)).encode())
+    return h.hexdigest()
+
+
+class PanelDecomposition:
+    """
+    Lazily computed, cached factorizations of one panel.
+
+    Holds a read-only snapshot of the panel values, so cached results can
+    never drift from the data they were computed on. Use decomposition_for()
+    to get the instance matching a panel's current content.
+    """
+
+    def __init__(self, panel: pd.DataFrame):
+        """
+        Parameters:
+        -----------
+        panel : pd.DataFrame
+            (T × N) panel; rows are time, columns are series
+        """
+        self.values = np.array(panel.values, dtype=float)
+        self.values.flags.writeable = False
+        self.shape = self.values.shape
+        self._cache = {}
+
+    def centered_svd(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Thin SVD of the column-centered panel.
+
+        Returns:
+        --------
+        mean : (N,) column means
+        U : (T, K) left singular vectors, K = min(T, N)
+        s : (K,) singular values, descending
+        Vt : (K, N) principal axes
+
+        Sign convention: the largest-magnitude loading of each axis is
+        positive, so results are deterministic across runs.
+        """
+        if 'centered_svd' not in self._cache:
+            X = self.values
+            mean = X.mean(axis=0)
+            U, s, Vt = svd(X - mean, full_matrices=False)
+
+            signs = np.sign(Vt[np.arange(len(Vt)), np.argmax(np.abs(Vt), axis=1)])
+            signs[signs == 0] = 1.0
+            U *= signs
+            Vt *= signs[:, None]
+
+            self._cache['centered_svd'] = (mean, U, s, Vt)
+        return self._cache['centered_svd']
+
+    def covariance_eigenvalues(self) -> np.ndarray:
+        """
+        Eigenvalues of the sample covariance matrix, descending.
+
+        Returns:
+        --------
+        np.ndarray of length N (zero-padded when T ≤ N)
+        """
+        _, _, s, _ = self.centered_svd()
+        n_time, n_series = self.shape
+        eigenvalues = np.zeros(n_series)
+        eigenvalues[:len(s)] = s ** 2 / max(n_time - 1, 1)
+        return eigenvalues
+
+    def pca_scores(self, n_components: int) -> np.ndarray:
+        """
+        Projection of the centered panel onto the first principal axes.
+
+        Returns:
+        --------
+        np.ndarray: (T × n_components) scores U Σ
+        """
+        _, U, s, _ = self.centered_svd()
+        return U[:, :n_components] * s[:n_components]
+
+    def snapshot_svd(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Thin SVD of the DMD snapshot matrix X₁ = X[:-1]ᵀ (uncentered).
+
+        Returns:
+        --------
+        U : (N, K) reduced spatial basis
+        s : (K,) singular values
+        Vt : (K, T-1) temporal right singular vectors
+        """
+        if 'snapshot_svd' not in self._cache:
+            X1 = self.values[:-1].T
+            self._cache['snapshot_svd'] = svd(X1, full_matrices=False)
+        return self._cache['snapshot_svd']
+
+
+_DECOMPOSITIONS = OrderedDict()
+_MAX_CACHED_PANELS = 8
+
+
+def decomposition_for(panel: pd.DataFrame) -> PanelDecomposition:
+    """
+    Shared PanelDecomposition for a panel.
+
+    Panels with identical content share one decomposition, so e.g. a PCA
+    projection and an explained-variance table of the same state matrix
+    run a single SVD. The most recent panels are kept (small LRU).
+
+    Parameters:
+    -----------
+    panel : pd.DataFrame
+        Market panel
+
+    Returns:
+    --------
+    PanelDecomposition
+    """
+    key = panel_fingerprint(panel)
+    decomposition = _DECOMPOSITIONS.get(key)
+
+    if decomposition is None:
+        decomposition = PanelDecomposition(panel)
+        _DECOMPOSITIONS[key] = decomposition
+        if len(_DECOMPOSITIONS) > _MAX_CACHED_PANELS:
+            _DECOMPOSITIONS.popitem(last=False)
+    else:
+        _DECOMPOSITIONS.move_to_end(key)
+
+    return decomposition
+
+
+def clear_decomposition_cache():
+    """Drop every cached decomposition."""
+    _DECOMPOSITIONS.clear()
@@ -36,6 +36,8 @@ from scipy.stats import zscore
 from sklearn.decomposition import PCA
 from typing import Tuple, Optional, Dict, List
 
+from vcf_decomposition import PanelDecomposition, decomposition_for
+
 
 class GeometricAnalyzer:
     """
@@ -306,9 +308,10 @@ class GeometricAnalyzer:
         if len(clean_data) < n_components:
             raise ValueError("Not enough data for PCA")
         
-        # Fit PCA
-        pca = PCA(n_components=n_components)
-        projected_values = pca.fit_transform(clean_data.values)
+        # Project using the shared (cached) centered SVD of this panel
+        decomposition = decomposition_for(clean_data)
+        projected_values = decomposition.pca_scores(n_components)
+        pca = self._pca_model(decomposition, n_components)
         
         # Create DataFrame
         projected = pd.DataFrame(
@@ -319,6 +322,34 @@ class GeometricAnalyzer:
         
         return projected, pca
     
+    @staticmethod
+    def _pca_model(decomposition: PanelDecomposition,
+                   n_components: int) -> PCA:
+        """
+        Build a fitted sklearn PCA from a cached decomposition.
+        
+        Lets callers keep using explained_variance_ratio_, components_,
+        transform(), etc. without sklearn re-running the SVD.
+        """
+        mean, _, s, Vt = decomposition.centered_svd()
+        eigenvalues = decomposition.covariance_eigenvalues()
+        n_samples, n_features = decomposition.shape
+        
+        pca = PCA(n_components=n_components)
+        pca.mean_ = mean
+        pca.components_ = Vt[:n_components]
+        pca.singular_values_ = s[:n_components]
+        pca.explained_variance_ = eigenvalues[:n_components]
+        pca.explained_variance_ratio_ = eigenvalues[:n_components] / eigenvalues.sum()
+        pca.n_components_ = n_components
+        pca.n_samples_ = n_samples
+        pca.n_features_in_ = n_features
+        
+        remaining = eigenvalues[n_components:min(n_samples, n_features)]
+        pca.noise_variance_ = remaining.mean() if len(remaining) else 0.0
+        
+        return pca
+    
     def manifold_curvature(self, state_matrix: pd.DataFrame,
                           window: int = 12) -> pd.Series:
         """
@@ -26,11 +26,277 @@ Academic References:
 - Takens' embedding theorem for phase space reconstruction
 """
 
+import json
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 from scipy import signal
-from scipy.fft import fft, fftfreq, ifft
-from typing import Tuple, Optional, Dict
+from scipy.fft import rfft, irfft
+from scipy.linalg import cholesky_banded, cho_solve_banded
+from typing import Tuple, Optional, Dict, List
+
+
+def _offset_cumsum(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative sums C[t] = Σ_{s<t} (x_s - x_0) of every column, C[0] = 0.
+    
+    Columns are shifted by their first value before summing so long
+    level series (prices, indices) don't lose precision in the running sum.
+    One array serves moving averages of any window (_rolling_mean_cumsum).
+    """
+    offset = values[:1]
+    csum = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(values - offset, axis=0, out=csum[1:])
+    return csum, offset
+
+
+def _rolling_mean_cumsum(csum: np.ndarray, offset: np.ndarray, window: int,
+                         scale: np.ndarray) -> np.ndarray:
+    """
+    Trailing moving average (min_periods=1) from an _offset_cumsum array:
+    MA[t] = (C[t+1] - C[max(0, t+1-w)]) / min(t+1, w)
+    
+    scale is max|x| per column, used to undo roundoff residue.
+    """
+    n_time = csum.shape[0] - 1
+    ma = np.empty_like(csum[1:])
+    head = min(window - 1, n_time)
+    
+    # Warm-up rows: expanding mean over the first t+1 values
+    counts = np.arange(1, head + 1).reshape((-1,) + (1,) * (csum.ndim - 1))
+    np.divide(csum[1:head + 1], counts, out=ma[:head])
+    
+    # Full windows: difference of the cumulative sums
+    np.subtract(csum[window:], csum[:n_time - window + 1], out=ma[head:])
+    ma[head:] /= window
+    
+    ma += offset
+    
+    # Undo roundoff residue where the true average is zero
+    ma[np.abs(ma) <= 1e-12 * scale] = 0.0
+    return ma
+
+
+def _rolling_mean_2d(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing moving average of every column, min_periods=1.
+    
+    Single cumulative-sum kernel over the whole (T × N) array.
+    """
+    csum, offset = _offset_cumsum(values)
+    scale = np.abs(values).max(axis=0, initial=0.0)
+    return _rolling_mean_cumsum(csum, offset, window, scale)
+
+
+def _rolling_robust_zscore_2d(values: np.ndarray, window: int,
+                              max_block: int = 2_000_000) -> np.ndarray:
+    """
+    Rolling robust z-score of every column (window median / MAD).
+    
+    Windows are strided views of the (T × N) array; medians and MADs are
+    found with introselect (np.partition, O(W) per window) on blocks of
+    windows, instead of one Python call and two full medians per row.
+    A window containing NaN gives NaN, like pandas rolling(window).
+    
+    max_block bounds the number of window elements materialized at once.
+    """
+    n_time, n_series = values.shape
+    out = np.full((n_time, n_series), np.nan)
+    if window < 2 or n_time < window:
+        return out
+    
+    # Windows with any NaN stay NaN
+    nan_count = np.zeros((n_time + 1, n_series))
+    np.cumsum(np.isnan(values), axis=0, out=nan_count[1:])
+    has_nan = (nan_count[window:] - nan_count[:-window]) > 0
+    
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+    mid = window // 2
+    kth = [mid - 1, mid] if window % 2 == 0 else [mid]
+    
+    def median(block):
+        block.partition(kth, axis=-1)
+        if window % 2 == 0:
+            return (block[..., mid - 1] + block[..., mid]) / 2
+        return block[..., mid].copy()
+    
+    step = max(1, max_block // (n_series * window))
+    for start in range(0, len(windows), step):
+        stop = min(start + step, len(windows))
+        block = np.array(windows[start:stop])          # (B, N, W) copy
+        
+        med = median(block)
+        np.subtract(block, med[..., None], out=block)
+        np.abs(block, out=block)
+        mad = median(block)
+        
+        last = values[start + window - 1:stop + window - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (last - med) / (1.4826 * mad)
+        z[mad < 1e-6] = 0.0
+        z[has_nan[start:stop]] = np.nan
+        
+        out[start + window - 1:stop + window - 1] = z
+    
+    return out
+
+
+def _harmonic_weights(spectrum: np.ndarray, n: int,
+                      n_components: int) -> np.ndarray:
+    """
+    Trend / cycle / noise weights for every rfft bin (last axis).
+    
+    Matches the two-sided masks of the original harmonic decomposition:
+    trend = bins with |f| < 2/n (DC and first harmonic), cycle = the
+    n_components strongest remaining bins of the two-sided power spectrum,
+    noise = the rest. A two-sided bin pair k, n-k maps to one rfft bin with
+    weight (M_k + M_{n-k}) / 2, so Re(ifft(M·X)) == irfft(w·X).
+    
+    Returns:
+    --------
+    np.ndarray of shape (3,) + spectrum.shape: trend, cycle, noise weights
+    """
+    n_r = spectrum.shape[-1]
+    weights = np.zeros((3,) + spectrum.shape)
+    weights[0, ..., :2] = 1.0
+    
+    # Two-sided power: bin n-k mirrors bin k; trend bins are never cycles
+    power = np.abs(spectrum) ** 2
+    power[..., :2] = -1.0
+    two_sided = np.concatenate([power, power[..., n - n_r:0:-1]], axis=-1)
+    
+    n_components = min(n_components, n)
+    top = np.argpartition(two_sided, n - n_components, axis=-1)[..., n - n_components:]
+    selected = np.zeros(two_sided.shape)
+    np.put_along_axis(selected, top, 1.0, axis=-1)
+    selected[..., :2] = 0.0
+    if n > 2:
+        selected[..., n - 1] = 0.0
+    
+    mirror = (-np.arange(n_r)) % n
+    weights[1] = (selected[..., :n_r] + selected[..., mirror]) / 2
+    weights[2] = 1.0 - weights[0] - weights[1]
+    return weights
+
+
+def _harmonic_last_sample(spectrum: np.ndarray, weights: np.ndarray,
+                          n: int) -> np.ndarray:
+    """
+    Value of each weighted reconstruction at the last sample (t = n-1).
+    
+    x(n-1) = (1/n) Σ_k c_k Re(w_k X_k e^{-2πik/n}),  c_k = 2 except for
+    DC and Nyquist - the closing point of irfft without the inverse FFT.
+    """
+    n_r = spectrum.shape[-1]
+    factor = np.full(n_r, 2.0)
+    factor[0] = 1.0
+    if n % 2 == 0:
+        factor[-1] = 1.0
+    rotated = spectrum * np.exp(-2j * np.pi * np.arange(n_r) / n)
+    return (weights * rotated.real * factor).sum(axis=-1) / n
+
+
+# Ravn–Uhlig smoothing parameters: λ = 1600 · (periods per year / 4)^4
+HP_LAMBDA = {
+    'daily': 1600.0 * (252 / 4) ** 4,
+    'weekly': 1600.0 * (52 / 4) ** 4,
+    'monthly': 129600.0,
+    'quarterly': 1600.0,
+    'annual': 6.25,
+}
+
+
+@lru_cache(maxsize=8)
+def _whittaker_factor(n_time: int, lamb: float, order: int) -> np.ndarray:
+    """
+    Banded Cholesky factor of (I + λ DᵀD), D = order-th difference matrix.
+    
+    Stored in upper banded form (order+1 × T); HP filter is order=2
+    (pentadiagonal). Cached so every column and repeated call reuses it.
+    """
+    coef = np.diff(np.eye(order + 1), order, axis=0)[0]     # e.g. [1, -2, 1]
+    n_rows = n_time - order
+    
+    # ab[order - k, r + k] = (DᵀD)[r, r + k]
+    ab = np.zeros((order + 1, n_time))
+    for k in range(order + 1):
+        for a in range(order + 1 - k):
+            ab[order - k, a + k:a + k + n_rows] += lamb * coef[a] * coef[a + k]
+    ab[order] += 1.0
+    
+    factor = cholesky_banded(ab, lower=False)
+    factor.flags.writeable = False
+    return factor
+
+
+def _whittaker_trend_2d(values: np.ndarray, lamb: float, order: int = 2) -> np.ndarray:
+    """
+    Two-sided Whittaker/HP trend of every column:
+    argmin_τ Σ(y - τ)² + λ Σ(Δ^order τ)²  →  (I + λ DᵀD) τ = y
+    
+    One banded Cholesky solve for all columns, O(T·N).
+    """
+    n_time = values.shape[0]
+    if n_time <= order:
+        return values.copy()
+    factor = _whittaker_factor(n_time, float(lamb), order)
+    return cho_solve_banded((factor, False), values)
+
+
+def _hp_kalman_gains(n_time: int, lamb: float) -> np.ndarray:
+    """
+    Kalman gains of the HP state-space model, shared by every column.
+    
+    Trend τ_t = 2τ_{t-1} - τ_{t-2} + η_t, y_t = τ_t + ε_t, var(ε)/var(η) = λ,
+    state [τ_t, τ_{t-1}], started exactly (diffuse) from the first two
+    observations. Gains don't depend on the data; once they converge the
+    steady-state value is reused.
+    """
+    gains = np.zeros((n_time, 2))
+    q = 1.0 / lamb
+    p00, p01, p11 = 1.0, 0.0, 1.0
+    
+    for t in range(2, n_time):
+        # Predict: P⁻ = F P Fᵀ + Q, F = [[2, -1], [1, 0]]
+        m00 = 4 * p00 - 4 * p01 + p11 + q
+        m01 = 2 * p00 - p01
+        m11 = p00
+        
+        # Update with R = 1
+        s = m00 + 1.0
+        k0, k1 = m00 / s, m01 / s
+        p00, p01, p11 = m00 - k0 * m00, m01 - k0 * m01, m11 - k1 * m01
+        gains[t] = k0, k1
+        
+        if abs(k0 - gains[t - 1, 0]) < 1e-15 and abs(k1 - gains[t - 1, 1]) < 1e-15:
+            gains[t + 1:] = k0, k1
+            break
+    
+    return gains
+
+
+def _hp_causal_trend_2d(values: np.ndarray, lamb: float) -> np.ndarray:
+    """
+    One-sided HP trend of every column (Kalman filter, τ_{t|t}).
+    
+    Row t equals the last point of the two-sided HP trend of rows 0..t,
+    so no future data is used.
+    """
+    n_time = values.shape[0]
+    trend = values.copy()
+    if n_time <= 2:
+        return trend
+    
+    gains = _hp_kalman_gains(n_time, float(lamb))
+    level, lagged = values[1].copy(), values[0].copy()
+    for t in range(2, n_time):
+        predicted = 2 * level - lagged
+        innovation = values[t] - predicted
+        level, lagged = predicted + gains[t, 0] * innovation, level + gains[t, 1] * innovation
+        trend[t] = level
+    
+    return trend
 
 
 class VCFNormalizer:
@@ -116,6 +382,196 @@ class VCFNormalizer:
         
         return result
     
+    def dual_input_panel(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Dual-input transform of every column in one vectorized pass.
+        
+        Same output as calling dual_input_transform() per column and
+        concatenating, but the moving averages come from one cumulative-sum
+        kernel over the 2-D array, momentum from one shifted division, and
+        both are written into a single preallocated interleaved array.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a raw financial time series
+            
+        Returns:
+        --------
+        pd.DataFrame with columns {name}_position, {name}_momentum per series
+        """
+        cols, values = self._prepare_panel(df)
+        n_time, n_series = values.shape
+        k = self.roc_window
+        
+        out = np.empty((n_time, 2 * n_series))
+        position = out[:, 0::2]
+        momentum = out[:, 1::2]
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # POSITION: ratio to moving average
+            np.divide(values, _rolling_mean_2d(values, self.ma_window), out=position)
+            
+            # MOMENTUM: rate of change over roc_window
+            momentum[:k] = np.nan
+            np.divide(values[k:], values[:-k], out=momentum[k:])
+            momentum[k:] -= 1.0
+        
+        # Same edge-case handling as the per-series path
+        position[~np.isfinite(position)] = 1.0
+        momentum[~np.isfinite(momentum)] = 0.0
+        
+        names = [f'{col}_{signal}' for col in cols for signal in ('position', 'momentum')]
+        return pd.DataFrame(out, index=df.index, columns=names)
+    
+    def feature_bank(self, df: pd.DataFrame,
+                     ma_windows=(3, 6, 12, 24, 36),
+                     roc_windows=None) -> pd.DataFrame:
+        """
+        Multi-scale dual-input features of every column in one pass.
+        
+        Position for each MA window and momentum for each ROC window, all
+        computed from one shared cumulative-sum array, so adding horizons
+        costs one subtraction each instead of another rolling pass.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a raw financial time series
+        ma_windows : sequence of int
+            Moving-average windows for position
+        roc_windows : sequence of int, optional
+            Rate-of-change windows for momentum (default: ma_windows)
+            
+        Returns:
+        --------
+        pd.DataFrame with MultiIndex columns (series, signal, window),
+        backed by one C-contiguous (T × series·features) array.
+        Each (series, 'position', w) column equals dual_input_transform()
+        with ma_window=w; likewise for momentum and roc_window.
+        """
+        ma_windows = list(ma_windows)
+        roc_windows = ma_windows if roc_windows is None else list(roc_windows)
+        if min(ma_windows + roc_windows) < 1:
+            raise ValueError("Windows must be >= 1")
+        
+        cols, values = self._prepare_panel(df)
+        n_time, n_series = values.shape
+        n_features = len(ma_windows) + len(roc_windows)
+        
+        # (T, series, features) view of the contiguous output block
+        out = np.empty((n_time, n_series * n_features))
+        bank = out.reshape(n_time, n_series, n_features)
+        
+        csum, offset = _offset_cumsum(values)
+        scale = np.abs(values).max(axis=0, initial=0.0)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for i, window in enumerate(ma_windows):
+                bank[:, :, i] = values / _rolling_mean_cumsum(csum, offset, window, scale)
+            
+            for i, k in enumerate(roc_windows, start=len(ma_windows)):
+                bank[:k, :, i] = np.nan
+                bank[k:, :, i] = values[k:] / values[:-k] - 1.0
+        
+        # Same edge-case handling as dual_input_transform
+        position = bank[:, :, :len(ma_windows)]
+        momentum = bank[:, :, len(ma_windows):]
+        position[~np.isfinite(position)] = 1.0
+        momentum[~np.isfinite(momentum)] = 0.0
+        
+        features = ([('position', w) for w in ma_windows] +
+                    [('momentum', k) for k in roc_windows])
+        columns = pd.MultiIndex.from_tuples(
+            [(col, sig, w) for col in cols for sig, w in features],
+            names=['series', 'signal', 'window'])
+        return pd.DataFrame(out, index=df.index, columns=columns, copy=False)
+    
+    def _prepare_panel(self, df: pd.DataFrame) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Apply the dual-input missing-data rule to a whole panel.
+        
+        Columns with >30% missing data are dropped with a warning; the rest
+        are forward/back filled.
+        
+        Returns:
+        --------
+        (kept column names, (T × N) float array)
+        """
+        missing = df.isna().mean()
+        for col in missing.index[missing > 0.3]:
+            print(f"Warning: Failed to normalize {col}: "
+                  f"Series {col} has >30% missing data")
+        cols = missing.index[missing <= 0.3]
+        
+        panel = df[cols]
+        if panel.isna().values.any():
+            panel = panel.ffill().bfill()
+        return cols, panel.to_numpy(dtype=float)
+    
+    def hp_trend(self, df: pd.DataFrame, lamb: float = HP_LAMBDA['monthly'],
+                 causal: bool = False, order: int = 2) -> pd.DataFrame:
+        """
+        Hodrick–Prescott / Whittaker trend of every column.
+        
+        Unlike zeroing FFT bins, the penalized fit has no wrap-around
+        leakage at the edges and needs no periodicity assumption.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a raw financial time series
+        lamb : float
+            Smoothing parameter (see HP_LAMBDA; default monthly 129600)
+        causal : bool
+            If True, one-sided trend from a Kalman recursion: row t only
+            uses data up to t (HP filter only, order=2)
+        order : int
+            Difference order of the penalty (2 = HP filter)
+            
+        Returns:
+        --------
+        pd.DataFrame of trends (columns with >30% missing data dropped)
+        
+        Mathematical Foundation:
+        -----------------------
+        τ = argmin Σ(y_t - τ_t)² + λ Σ(Δ^d τ_t)²  ⟺  (I + λ DᵀD) τ = y
+        
+        (I + λ DᵀD) is banded (pentadiagonal for d=2), so one banded
+        Cholesky factorization solves all columns in O(T·N).
+        """
+        if causal and order != 2:
+            raise ValueError("Causal trend is only available for the HP filter (order=2)")
+        
+        cols, values = self._prepare_panel(df)
+        if causal:
+            trend = _hp_causal_trend_2d(values, lamb)
+        else:
+            trend = _whittaker_trend_2d(values, lamb, order)
+        return pd.DataFrame(trend, index=df.index, columns=cols)
+    
+    def hp_position(self, df: pd.DataFrame, lamb: float = HP_LAMBDA['monthly'],
+                    causal: bool = False) -> pd.DataFrame:
+        """
+        Trend-relative position x(t) / τ(t) using the HP trend.
+        
+        Same role as the MA-ratio position in dual_input_transform, with
+        near-zero trends mapped to 1.0.
+        
+        Returns:
+        --------
+        pd.DataFrame with {name}_hp_position columns
+        """
+        trend = self.hp_trend(df, lamb=lamb, causal=causal)
+        values = df[trend.columns].ffill().bfill().to_numpy(dtype=float)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            position = values / trend.to_numpy()
+        position[~np.isfinite(position)] = 1.0
+        
+        return pd.DataFrame(position, index=df.index,
+                            columns=[f'{col}_hp_position' for col in trend.columns])
+    
     def harmonic_normalize(self, series: pd.Series, 
                           n_components: int = 5) -> pd.DataFrame:
         """
@@ -156,59 +612,116 @@ class VCFNormalizer:
         if len(clean_series) < 12:
             raise ValueError("Need at least 12 observations for harmonic analysis")
         
-        values = clean_series.values
-        n = len(values)
+        components = self.harmonic_panel(series.to_frame(), n_components)
         
-        # Compute FFT
-        fft_values = fft(values)
-        frequencies = fftfreq(n)
+        # Build result DataFrame (NaNs where original had NaNs)
+        result = pd.DataFrame({
+            'original': series,
+            'trend': components['trend'].iloc[:, 0],
+            'cycle': components['cycle'].iloc[:, 0],
+            'noise': components['noise'].iloc[:, 0],
+            'harmonic_position': components['harmonic_position'].iloc[:, 0]
+        }, index=series.index)
         
-        # Separate components by frequency
-        # Trend: lowest frequency component (including DC)
-        trend_mask = np.abs(frequencies) < (1.0 / (n / 2))  # Long cycles
+        return result
+    
+    def harmonic_panel(self, df: pd.DataFrame,
+                       n_components: int = 5) -> Dict[str, pd.DataFrame]:
+        """
+        Harmonic decomposition of every column at once.
         
-        # Cycle: keep top n_components mid-frequency components
-        power = np.abs(fft_values) ** 2
-        power[trend_mask] = 0  # Exclude trend from cycle
+        Same decomposition as harmonic_normalize(), but each group of
+        columns sharing a missing-data pattern gets one rfft along the time
+        axis, and trend, cycle and noise come from a single irfft of the
+        stacked (3 × bins × series) masked spectrum tensor.
         
-        # Find n_components strongest frequencies
-        top_indices = np.argsort(power)[-n_components:]
-        cycle_mask = np.zeros(n, dtype=bool)
-        cycle_mask[top_indices] = True
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a time series (≥12 observations)
+        n_components : int
+            Number of Fourier components to retain
+            
+        Returns:
+        --------
+        dict of DataFrames (same shape as df):
+            'trend', 'cycle', 'noise', 'harmonic_position'
+        """
+        valid = df.notna().to_numpy()
+        short = df.columns[valid.sum(axis=0) < 12]
+        if len(short):
+            raise ValueError(f"Need at least 12 observations for harmonic analysis: "
+                             f"{list(short)}")
         
-        # Reconstruct components
-        trend_fft = fft_values.copy()
-        trend_fft[~trend_mask] = 0
-        trend = np.real(ifft(trend_fft))
+        values = df.to_numpy(dtype=float)
+        names = ('trend', 'cycle', 'noise', 'harmonic_position')
+        out = {name: np.full(values.shape, np.nan) for name in names}
         
-        cycle_fft = fft_values.copy()
-        cycle_fft[~cycle_mask] = 0
-        cycle = np.real(ifft(cycle_fft))
+        # Columns with the same NaN pattern share one transform
+        groups = {}
+        for j in range(values.shape[1]):
+            groups.setdefault(valid[:, j].tobytes(), []).append(j)
         
-        # Noise is everything else
-        noise_fft = fft_values.copy()
-        noise_fft[trend_mask | cycle_mask] = 0
-        noise = np.real(ifft(noise_fft))
+        for cols in groups.values():
+            rows = valid[:, cols[0]]
+            block = values[np.ix_(rows, cols)]
+            n = len(block)
+            
+            spectrum = rfft(block.T, axis=-1)                 # (series, bins)
+            weights = _harmonic_weights(spectrum, n, n_components)
+            trend, cycle, noise = irfft(weights * spectrum, n=n, axis=-1)
+            
+            safe_trend = np.where(np.abs(trend) > 1e-6, trend, 1.0)
+            for name, comp in zip(names, (trend, cycle, noise, cycle / safe_trend)):
+                out[name][np.ix_(rows, cols)] = comp.T
         
-        # Create harmonic position: cycle/trend ratio
-        # This is analogous to our position metric but frequency-aware
-        harmonic_position = np.zeros(n)
-        safe_trend = np.where(np.abs(trend) > 1e-6, trend, 1.0)
-        harmonic_position = cycle / safe_trend
+        return {name: pd.DataFrame(out[name], index=df.index, columns=df.columns)
+                for name in names}
+    
+    def rolling_harmonic_position(self, df: pd.DataFrame, window: int,
+                                  n_components: int = 5,
+                                  max_block: int = 2_000_000) -> pd.DataFrame:
+        """
+        Causal harmonic position: cycle / trend of the trailing window.
         
-        # Build result DataFrame
-        result = pd.DataFrame({
-            'original': values,
-            'trend': trend,
-            'cycle': cycle,
-            'noise': noise,
-            'harmonic_position': harmonic_position
-        }, index=clean_series.index)
+        Row t is harmonic_normalize() of the window ending at t, read at
+        its last sample, so no future data leaks in. Windows are transformed
+        in blocks with one rfft each; use SlidingHarmonic to continue the
+        series one observation at a time.
         
-        # Reindex to original series index (will have NaNs where original had NaNs)
-        result = result.reindex(series.index)
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a time series
+        window : int
+            Trailing window length (≥12)
+        n_components : int
+            Number of Fourier components to retain
+            
+        Returns:
+        --------
+        pd.DataFrame (NaN until the first full window, and for windows
+        containing NaN)
+        """
+        if window < 12:
+            raise ValueError("Need at least 12 observations for harmonic analysis")
         
-        return result
+        values = df.to_numpy(dtype=float)
+        n_time, n_series = values.shape
+        out = np.full((n_time, n_series), np.nan)
+        
+        if n_time >= window:
+            windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+            step = max(1, max_block // (n_series * window))
+            for start in range(0, len(windows), step):
+                stop = min(start + step, len(windows))
+                spectrum = rfft(windows[start:stop], axis=-1)
+                weights = _harmonic_weights(spectrum, window, n_components)
+                trend, cycle, _ = _harmonic_last_sample(spectrum, weights, window)
+                out[start + window - 1:stop + window - 1] = (
+                    cycle / np.where(np.abs(trend) > 1e-6, trend, 1.0))
+        
+        return pd.DataFrame(out, index=df.index, columns=df.columns)
     
     def robust_zscore(self, series: pd.Series, 
                      window: Optional[int] = None) -> pd.Series:
@@ -237,17 +750,10 @@ class VCFNormalizer:
         and 1.4826 is the consistency constant for normal distribution
         """
         if window is not None:
-            # Rolling robust z-score
-            def robust_z_single(x):
-                if len(x) < 2:
-                    return np.nan
-                med = np.median(x)
-                mad = np.median(np.abs(x - med))
-                if mad < 1e-6:
-                    return 0.0
-                return (x.iloc[-1] - med) / (1.4826 * mad)
-            
-            return series.rolling(window=window).apply(robust_z_single, raw=False)
+            # Rolling robust z-score (sliding-window median/MAD kernel)
+            values = series.to_numpy(dtype=float).reshape(-1, 1)
+            z = _rolling_robust_zscore_2d(values, window)
+            return pd.Series(z[:, 0], index=series.index, name=series.name)
         else:
             # Global robust z-score
             med = series.median()
@@ -256,8 +762,31 @@ class VCFNormalizer:
                 return pd.Series(0.0, index=series.index)
             return (series - med) / (1.4826 * mad)
     
+    def robust_zscore_panel(self, df: pd.DataFrame,
+                            window: Optional[int] = None) -> pd.DataFrame:
+        """
+        Robust z-score of every column of a panel.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Each column is a time series
+        window : int, optional
+            If provided, rolling robust z-score over all columns at once
+            
+        Returns:
+        --------
+        pd.DataFrame of robust z-scores (same shape as df)
+        """
+        if window is None:
+            return df.apply(lambda x: self.robust_zscore(x), axis=0)
+        
+        z = _rolling_robust_zscore_2d(df.to_numpy(dtype=float), window)
+        return pd.DataFrame(z, index=df.index, columns=df.columns)
+    
     def batch_normalize(self, df: pd.DataFrame, 
-                       method: str = 'dual_input') -> pd.DataFrame:
+                       method: str = 'dual_input',
+                       window: Optional[int] = None) -> pd.DataFrame:
         """
         Normalize entire DataFrame of financial series.
         
@@ -268,39 +797,39 @@ class VCFNormalizer:
         method : str
             'dual_input' - position + momentum (RECOMMENDED)
             'harmonic' - Fourier decomposition
+            'hp' - position relative to the HP trend (monthly λ)
             'robust_zscore' - Median-based z-score
             'standard_zscore' - Traditional z-score (NOT RECOMMENDED)
+        window : int, optional
+            Rolling (causal) window for 'robust_zscore' and 'harmonic'
+            (default: full-sample)
             
         Returns:
         --------
         pd.DataFrame with normalized values
         """
         if method == 'dual_input':
-            # Apply dual-input to each column
-            results = []
-            for col in df.columns:
-                try:
-                    normalized = self.dual_input_transform(df[col], col)
-                    results.append(normalized)
-                except Exception as e:
-                    print(f"Warning: Failed to normalize {col}: {e}")
-                    continue
-            return pd.concat(results, axis=1)
+            return self.dual_input_panel(df)
         
         elif method == 'harmonic':
-            # Apply harmonic decomposition, return just harmonic_position
-            results = []
-            for col in df.columns:
-                try:
-                    decomp = self.harmonic_normalize(df[col])
-                    results.append(decomp['harmonic_position'].rename(f'{col}_harmonic'))
-                except Exception as e:
-                    print(f"Warning: Failed harmonic normalize {col}: {e}")
-                    continue
-            return pd.concat(results, axis=1)
+            # Harmonic decomposition of all columns, return just harmonic_position
+            counts = df.notna().sum()
+            for col in counts.index[counts < 12]:
+                print(f"Warning: Failed harmonic normalize {col}: "
+                      f"Need at least 12 observations for harmonic analysis")
+            panel = df[counts.index[counts >= 12]]
+            
+            if window is not None:
+                position = self.rolling_harmonic_position(panel, window)
+            else:
+                position = self.harmonic_panel(panel)['harmonic_position']
+            return position.add_suffix('_harmonic')
+        
+        elif method == 'hp':
+            return self.hp_position(df)
         
         elif method == 'robust_zscore':
-            return df.apply(lambda x: self.robust_zscore(x), axis=0)
+            return self.robust_zscore_panel(df, window=window)
         
         elif method == 'standard_zscore':
             # Traditional z-score (included for comparison, but not recommended)
@@ -310,8 +839,421 @@ class VCFNormalizer:
             raise ValueError(f"Unknown method: {method}")
 
 
+class StreamingNormalizer:
+    """
+    Incremental dual-input normalizer for live data.
+    
+    VCFNormalizer recomputes from the full history; this class keeps just
+    the state needed for the next row, so appending one observation costs
+    O(N) instead of re-normalizing decades of data:
+    
+    - MA: ring buffer of the last ma_window values + running sum and count
+      of the non-NaN values per series
+    - ROC: ring buffer of the last roc_window values per series
+    - Robust z-score (optional): ring buffer of the last zscore_window
+      values, median/MAD by selection over the window
+    
+    Missing observations carry the last value forward (ffill); a series with
+    no value yet is left out of the running sums until its first one. Once
+    primed with prime(history), rows emitted by update() equal the matching
+    rows of VCFNormalizer.dual_input_panel() run on the extended history.
+    
+    Example:
+    --------
+    >>> stream = StreamingNormalizer(['GDP', 'SP500'], ma_window=12)
+    >>> stream.prime(history_df)
+    >>> row = stream.update({'GDP': 27.9, 'SP500': 5120.0})
+    >>> stream.save('state.npz')            # resume later with load()
+    """
+    
+    _STATE_ARRAYS = ('ma_buffer', 'ma_sum', 'ma_count', 'roc_buffer', 'z_buffer',
+                     'last_value', 'max_abs')
+    
+    def __init__(self, series_names: List[str], ma_window: int = 12,
+                 roc_window: int = 1, zscore_window: Optional[int] = None):
+        """
+        Parameters:
+        -----------
+        series_names : list of str
+            Series in the order their columns appear in the state row
+        ma_window : int
+            Window for moving average (same meaning as VCFNormalizer)
+        roc_window : int
+            Window for rate of change (same meaning as VCFNormalizer)
+        zscore_window : int, optional
+            If provided, also emit a rolling robust z-score per series
+        """
+        if ma_window < 1 or roc_window < 1:
+            raise ValueError("ma_window and roc_window must be >= 1")
+        
+        self.series_names = list(series_names)
+        self.ma_window = ma_window
+        self.roc_window = roc_window
+        self.zscore_window = zscore_window
+        self._positions = {name: i for i, name in enumerate(self.series_names)}
+        
+        n_series = len(self.series_names)
+        self.ma_buffer = np.full((n_series, ma_window), np.nan)
+        self.ma_sum = np.zeros(n_series)
+        self.ma_count = np.zeros(n_series)
+        self.roc_buffer = np.full((n_series, roc_window), np.nan)
+        self.z_buffer = np.full((n_series, zscore_window or 0), np.nan)
+        self.last_value = np.full(n_series, np.nan)
+        self.max_abs = np.zeros(n_series)
+        self.n_updates = 0
+        self.last_timestamp = None
+    
+    @property
+    def columns(self) -> List[str]:
+        """Column names of the rows emitted by update()."""
+        signals = ['position', 'momentum']
+        if self.zscore_window:
+            signals.append('robust_z')
+        return [f'{name}_{sig}' for name in self.series_names for sig in signals]
+    
+    def prime(self, history: pd.DataFrame) -> pd.DataFrame:
+        """
+        Initialize the state from historical data.
+        
+        Parameters:
+        -----------
+        history : pd.DataFrame
+            Raw series (columns must include series_names), oldest first
+            
+        Returns:
+        --------
+        pd.DataFrame: batch-normalized history (VCFNormalizer.dual_input_panel)
+        """
+        panel = history[self.series_names].ffill().bfill()
+        values = panel.to_numpy(dtype=float)
+        for row in values:
+            self._push(row)
+        self.last_timestamp = history.index[-1] if len(history) else None
+        
+        normalizer = VCFNormalizer(ma_window=self.ma_window, roc_window=self.roc_window)
+        return normalizer.dual_input_panel(panel)
+    
+    def update(self, observations: Dict[str, float], timestamp=None) -> pd.Series:
+        """
+        Consume one observation per series and emit the new state row.
+        
+        Parameters:
+        -----------
+        observations : dict
+            {series_name: value}; missing or NaN values carry forward
+        timestamp : optional
+            Label for the emitted row
+            
+        Returns:
+        --------
+        pd.Series indexed by columns
+        """
+        unknown = set(observations) - set(self._positions)
+        if unknown:
+            raise ValueError(f"Unknown series: {sorted(unknown)}")
+        
+        row = np.full(len(self.series_names), np.nan)
+        for name, value in observations.items():
+            row[self._positions[name]] = value
+        row = np.where(np.isnan(row), self.last_value, row)
+        
+        self.last_timestamp = timestamp
+        return pd.Series(self._push(row), index=self.columns, name=timestamp)
+    
+    def _push(self, row: np.ndarray) -> np.ndarray:
+        """Advance every ring buffer by one row; return the state row."""
+        t = self.n_updates
+        w, k = self.ma_window, self.roc_window
+        
+        # MA: swap the oldest value out of the running sum (NaNs are skipped)
+        slot = t % w
+        oldest = self.ma_buffer[:, slot]
+        self.ma_sum += np.nan_to_num(row) - np.nan_to_num(oldest)
+        self.ma_count += ~np.isnan(row)
+        self.ma_count -= ~np.isnan(oldest)
+        self.ma_buffer[:, slot] = row
+        if slot == w - 1:
+            # Re-sum once per lap so the running sum can't drift
+            self.ma_sum = np.nansum(self.ma_buffer, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ma = self.ma_sum / self.ma_count
+        np.maximum(self.max_abs, np.abs(row), out=self.max_abs, where=~np.isnan(row))
+        ma[np.abs(ma) <= 1e-12 * self.max_abs] = 0.0
+        
+        # ROC: value k steps back is the slot about to be overwritten
+        previous = self.roc_buffer[:, t % k].copy()
+        self.roc_buffer[:, t % k] = row
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            position = row / ma
+            momentum = row / previous - 1.0
+        position[~np.isfinite(position)] = 1.0
+        momentum[~np.isfinite(momentum)] = 0.0
+        signals = [position, momentum]
+        
+        if self.zscore_window:
+            wz = self.zscore_window
+            self.z_buffer[:, t % wz] = row
+            z = np.full(len(row), np.nan)
+            if t + 1 >= wz and wz >= 2:
+                med = np.median(self.z_buffer, axis=1)
+                mad = np.median(np.abs(self.z_buffer - med[:, None]), axis=1)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    z = (row - med) / (1.4826 * mad)
+                z[mad < 1e-6] = 0.0
+                z[np.isnan(mad)] = np.nan
+            signals.append(z)
+        
+        self.last_value = row.copy()
+        self.n_updates += 1
+        return np.column_stack(signals).ravel()
+    
+    def save(self, path: str):
+        """
+        Write the normalizer state to a .npz file (no pickled objects).
+        
+        Parameters:
+        -----------
+        path : str
+            Output file path
+        """
+        config = {
+            'series_names': self.series_names,
+            'ma_window': self.ma_window,
+            'roc_window': self.roc_window,
+            'zscore_window': self.zscore_window,
+            'n_updates': self.n_updates,
+            'last_timestamp': None if self.last_timestamp is None else str(self.last_timestamp),
+        }
+        arrays = {name: getattr(self, name) for name in self._STATE_ARRAYS}
+        with open(path, 'wb') as f:
+            np.savez(f, config=np.array(json.dumps(config)), **arrays)
+    
+    @classmethod
+    def load(cls, path: str) -> 'StreamingNormalizer':
+        """
+        Restore a normalizer written by save().
+        
+        Parameters:
+        -----------
+        path : str
+            File written by save()
+            
+        Returns:
+        --------
+        StreamingNormalizer ready to continue with update()
+        """
+        with np.load(path, allow_pickle=False) as data:
+            config = json.loads(str(data['config']))
+            stream = cls(config['series_names'], ma_window=config['ma_window'],
+                         roc_window=config['roc_window'],
+                         zscore_window=config['zscore_window'])
+            for name in cls._STATE_ARRAYS:
+                setattr(stream, name, data[name].copy())
+        
+        stream.n_updates = config['n_updates']
+        last_timestamp = config['last_timestamp']
+        stream.last_timestamp = None if last_timestamp is None else pd.Timestamp(last_timestamp)
+        return stream
+
+
+class SlidingHarmonic:
+    """
+    Sliding-DFT harmonic position, updated one observation at a time.
+    
+    Keeps the half spectrum of the trailing window for every series. A new
+    value updates each bin in O(1):
+    
+        X_k ← (X_k - x_oldest + x_new) · e^{2πik/W}
+    
+    so each step costs O(N·W) instead of a full transform of the window.
+    Every `resync` steps the spectrum is recomputed from the window to
+    clear accumulated roundoff. Output matches
+    VCFNormalizer.rolling_harmonic_position().
+    """
+    
+    def __init__(self, series_names: List[str], window: int,
+                 n_components: int = 5, resync: Optional[int] = None):
+        """
+        Parameters:
+        -----------
+        series_names : list of str
+            Series in column order
+        window : int
+            Trailing window length (≥12)
+        n_components : int
+            Number of Fourier components to retain
+        resync : int, optional
+            Steps between exact recomputations (default: window)
+        """
+        if window < 12:
+            raise ValueError("Need at least 12 observations for harmonic analysis")
+        
+        self.series_names = list(series_names)
+        self.window = window
+        self.n_components = n_components
+        self.resync = resync or window
+        
+        n_series = len(self.series_names)
+        self.buffer = np.full((n_series, window), np.nan)
+        self.spectrum = None
+        self.n_updates = 0
+        self._twiddle = np.exp(2j * np.pi * np.arange(window // 2 + 1) / window)
+        self._since_sync = 0
+    
+    def prime(self, history: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fill the window from history and return its rolling harmonic position.
+        """
+        panel = history[self.series_names]
+        for row in panel.to_numpy(dtype=float)[-self.window:]:
+            self._push(row)
+        self.n_updates = len(panel)
+        if self.n_updates >= self.window:
+            self._sync()
+        return VCFNormalizer().rolling_harmonic_position(panel, self.window,
+                                                         self.n_components)
+    
+    def update(self, observations: Dict[str, float], timestamp=None) -> pd.Series:
+        """
+        Consume one observation per series and emit the harmonic position.
+        
+        Parameters:
+        -----------
+        observations : dict
+            {series_name: value} for every series
+        timestamp : optional
+            Label for the emitted row
+            
+        Returns:
+        --------
+        pd.Series of harmonic positions (NaN until the window is full)
+        """
+        row = np.array([observations.get(name, np.nan) for name in self.series_names],
+                       dtype=float)
+        oldest = self._push(row)
+        self.n_updates += 1
+        
+        result = np.full(len(row), np.nan)
+        if self.n_updates >= self.window:
+            if self.spectrum is None or self._since_sync >= self.resync:
+                self._sync()
+            else:
+                self.spectrum += (row - oldest)[:, None]
+                self.spectrum *= self._twiddle
+                self._since_sync += 1
+                
+                # A NaN poisons its bins until it leaves the window
+                has_nan = np.isnan(self.buffer).any(axis=1)
+                recovered = self._has_nan & ~has_nan
+                if recovered.any():
+                    self.spectrum[recovered] = rfft(self.buffer[recovered], axis=-1)
+                self._has_nan = has_nan
+            
+            weights = _harmonic_weights(self.spectrum, self.window, self.n_components)
+            trend, cycle, _ = _harmonic_last_sample(self.spectrum, weights, self.window)
+            result = cycle / np.where(np.abs(trend) > 1e-6, trend, 1.0)
+        
+        return pd.Series(result, index=self.series_names, name=timestamp)
+    
+    def _push(self, row: np.ndarray) -> np.ndarray:
+        """Shift the window left by one; return the value that fell out."""
+        oldest = self.buffer[:, 0].copy()
+        self.buffer[:, :-1] = self.buffer[:, 1:]
+        self.buffer[:, -1] = row
+        return oldest
+    
+    def _sync(self):
+        """Exact spectrum of the current window."""
+        self.spectrum = rfft(self.buffer, axis=-1)
+        self._has_nan = np.isnan(self.buffer).any(axis=1)
+        self._since_sync = 0
+
+
+def load_release_lags(registry_path: str) -> Dict[str, int]:
+    """
+    Release lags (days after the date stamp) from the metric registry.
+    
+    Parameters:
+    -----------
+    registry_path : str
+        Path to vcf_metric_registry.json
+        
+    Returns:
+    --------
+    dict mapping metric_id to release_lag_days (0 when not recorded)
+    """
+    with open(registry_path, 'r') as f:
+        registry = json.load(f)
+    return {metric_id: int(info.get('release_lag_days', 0))
+            for metric_id, info in registry.items()}
+
+
+def align_asof(market_data: Dict[str, pd.Series],
+               calendar=None,
+               release_lags: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    Map mixed-frequency series onto one target calendar without look-ahead.
+    
+    Each calendar date takes the latest observation of each series that
+    had been RELEASED by then (date stamp + release lag). Uses one
+    vectorized searchsorted per series into a preallocated array, so the
+    sparse union index of all series is never built.
+    
+    Parameters:
+    -----------
+    market_data : dict
+        Dictionary mapping source names to time series (DatetimeIndex)
+    calendar : DatetimeIndex or str, optional
+        Target dates, or a pandas frequency ('B', 'W-FRI', 'M', ...) spanning
+        the available data. Default: index of the series with the most
+        observations (e.g. the trading-day calendar of a daily series).
+    release_lags : dict, optional
+        {name: days or pd.Timedelta} publication delay after the date stamp
+        (see load_release_lags). Default 0.
+        
+    Returns:
+    --------
+    pd.DataFrame on the calendar (NaN before a series' first release)
+    """
+    release_lags = release_lags or {}
+    names = list(market_data)
+    available, values = {}, {}
+    
+    for name in names:
+        series = market_data[name].dropna()
+        if not series.index.is_monotonic_increasing:
+            series = series.sort_index(kind='stable')
+        
+        lag = release_lags.get(name, 0)
+        if not isinstance(lag, pd.Timedelta):
+            lag = pd.Timedelta(days=lag)
+        available[name] = (series.index + lag).values if lag else series.index.values
+        values[name] = series.to_numpy(dtype=float)
+    
+    if calendar is None:
+        densest = max(names, key=lambda name: len(values[name]))
+        calendar = market_data[densest].dropna().index.sort_values()
+    elif isinstance(calendar, str):
+        start = max(dates[0] for dates in available.values() if len(dates))
+        end = max(dates[-1] for dates in available.values() if len(dates))
+        calendar = pd.date_range(start, end, freq=calendar)
+    
+    target = pd.DatetimeIndex(calendar).values
+    out = np.full((len(target), len(names)), np.nan)
+    for j, name in enumerate(names):
+        # Last observation released on or before each target date
+        pos = np.searchsorted(available[name], target, side='right') - 1
+        released = pos >= 0
+        out[released, j] = values[name][pos[released]]
+    
+    return pd.DataFrame(out, index=calendar, columns=names)
+
+
 def create_state_matrix(market_data: Dict[str, pd.Series],
-                       normalizer: Optional[VCFNormalizer] = None) -> pd.DataFrame:
+                       normalizer: Optional[VCFNormalizer] = None,
+                       calendar=None,
+                       release_lags: Optional[Dict[str, int]] = None) -> pd.DataFrame:
     """
     High-level function to create VCF state matrix from raw market data.
     
@@ -322,11 +1264,19 @@ def create_state_matrix(market_data: Dict[str, pd.Series],
         Example: {'GDP': series1, 'SP500': series2, ...}
     normalizer : VCFNormalizer, optional
         Custom normalizer instance. If None, uses default.
+    calendar : DatetimeIndex or str, optional
+        Target calendar for mixed-frequency data (see align_asof)
+    release_lags : dict, optional
+        Publication delay per source in days (see load_release_lags)
         
     Returns:
     --------
     pd.DataFrame ready for geometric analysis
     
+    Series on different calendars (or with release lags) are aligned as-of
+    and the state matrix starts once every source has been released, so
+    no value is back-filled from the future.
+    
     Example:
     --------
     >>> market_data = {
@@ -341,19 +1291,31 @@ def create_state_matrix(market_data: Dict[str, pd.Series],
     if normalizer is None:
         normalizer = VCFNormalizer()
     
-    # Convert dict to DataFrame
-    df = pd.DataFrame(market_data)
+    # Convert dict to DataFrame (as-of alignment for mixed calendars)
+    indexes = [series.index for series in market_data.values()]
+    same_calendar = all(index.equals(indexes[0]) for index in indexes[1:])
+    
+    if calendar is None and not release_lags and same_calendar:
+        df = pd.DataFrame(market_data)
+    else:
+        df = align_asof(market_data, calendar=calendar, release_lags=release_lags)
+        complete = df.notna().all(axis=1).to_numpy()
+        if complete.any():
+            df = df.iloc[complete.argmax():]
     
     # Apply dual-input normalization
     state = normalizer.batch_normalize(df, method='dual_input')
     
-    # Sort by date and handle any remaining NaNs
-    state = state.sort_index()
-    state = state.ffill().bfill()
-    
-    # Drop any rows/columns that are still all NaN
-    state = state.dropna(axis=1, how='all')
-    state = state.dropna(axis=0, how='all')
+    # Sort by date and handle any remaining NaNs (skip the copies when
+    # the dual-input output is already ordered and complete)
+    if not state.index.is_monotonic_increasing:
+        state = state.sort_index()
+    if state.isna().values.any():
+        state = state.ffill().bfill()
+        
+        # Drop any rows/columns that are still all NaN
+        state = state.dropna(axis=1, how='all')
+        state = state.dropna(axis=0, how='all')
     
     return state
 